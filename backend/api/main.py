@@ -6,9 +6,10 @@ from fastapi.responses import RedirectResponse, JSONResponse, HTMLResponse, Stre
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+import asyncio
 import os
 import httpx
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import secrets
 import logging
 from typing import Dict, Optional, List
@@ -22,13 +23,17 @@ from psycopg2.extras import Json
 
 from services.jwt import JWTManager
 from services.refresh_tokens import refresh_token_store
+from services.graph_groups import graph_groups_cache
+from services.graph_directory import graph_app_token, group_directory
+from services.revocation_feed import revocation_feed, decode_cursor
 from services.token_activity import token_activity_logger, TokenAction
 from services.app_registration import (
     app_store, RegisterAppRequest, UpdateAppRequest,
     AppResponse, AppRegistrationResponse, SetRoleMappingRequest,
-    registered_apps, app_role_mappings
+    registered_apps, app_role_mappings, encode_apps_cursor, decode_apps_cursor
 )
 from services.jwks import JWKSHandler
+from services.resource_filters import merge_rls_filters
 from services.endpoints import AppEndpointsRegistry, EndpointsUpdate
 from services.roles import RolesManager, RolesUpdate, RoleMappingsUpdate
 from services.policy import PolicyManager, PolicyDocument
@@ -40,9 +45,16 @@ from services.token_templates import TokenTemplateManager
 from services.api_keys import api_key_manager, APIKeyTTL
 from background.api_key_rotation import start_rotation_scheduler, rotation_scheduler
 from utils.paths import api_templates_path
-from libs.logging_config import setup_logging, get_logging_config, update_logging_config as apply_logging_update
-from services.log_reader import read_app_logs
+from libs.logging_config import setup_logging, get_logging_config, get_logging_stats, update_logging_config as apply_logging_update
+from services.log_reader import read_app_logs, search_app_logs
+from libs.metrics import registry as metrics_registry, token_validations
+from libs.tracing import install_httpx_tracing, tracer
+from libs.query_stats import query_stats
+from libs.profiler import ProfilerBusy, allocation_diff, sample_stacks
 from services.database import db_service
+from services.dashboard_stats import dashboard_stats
+from services.app_registry import app_registry
+from services.role_index import group_role_index
 from services.discovery_db import DiscoveryDatabase
 from api.a2a_endpoints import setup_a2a_endpoints
 
@@ -58,6 +70,9 @@ class TokenExchangeRequest(BaseModel):
     azure_access_token: Optional[str] = None
     azure_id_token: Optional[str] = None
 
+class BatchValidateRequest(BaseModel):
+    tokens: List[str]
+
 class RevokeTokenRequest(BaseModel):
     token: str
     token_type_hint: Optional[str] = "refresh_token"
@@ -146,6 +161,20 @@ try:
 except Exception:
     logging.getLogger(__name__).warning("Access log middleware not loaded")
 
+try:
+    from middleware.metrics import metrics_middleware
+    app.middleware("http")(metrics_middleware)
+except Exception:
+    logging.getLogger(__name__).warning("Metrics middleware not loaded")
+
+# Registered last so it wraps the others and its trace id reaches the access log
+try:
+    from middleware.tracing import tracing_middleware
+    app.middleware("http")(tracing_middleware)
+    install_httpx_tracing()
+except Exception:
+    logging.getLogger(__name__).warning("Tracing middleware not loaded")
+
 # Add custom Jinja2 filter for datetime conversion
 
 def datetime_filter(timestamp):
@@ -189,9 +218,17 @@ def get_session(session_id: str) -> dict:
     return sessions.get(session_id, {})
 
 # Well-known and public key endpoints for local dev and discovery
+JWKS_MAX_AGE_SECONDS = int(os.getenv('JWKS_MAX_AGE_SECONDS', '300'))
+
 @app.get('/.well-known/jwks.json')
-async def get_jwks():
-    return JSONResponse(jwks_handler.get_jwks())
+async def get_jwks(if_none_match: Optional[str] = Header(None)):
+    # ETag + max-age let resource servers cache keys and revalidate cheaply
+    jwks = jwks_handler.get_jwks()
+    etag = '"' + hashlib.sha256(json.dumps(jwks, sort_keys=True).encode()).hexdigest()[:32] + '"'
+    headers = {'ETag': etag, 'Cache-Control': f'public, max-age={JWKS_MAX_AGE_SECONDS}'}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(jwks, headers=headers)
 
 @app.get('/.well-known/openid-configuration')
 async def get_openid_configuration(request: Request):
@@ -204,6 +241,15 @@ async def get_public_key():
     pem = jwt_manager.public_pem.decode('utf-8') if isinstance(jwt_manager.public_pem, bytes) else (jwt_manager.public_pem or '')
     return PlainTextResponse(pem, media_type='text/plain')
 
+@app.get('/metrics')
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    # Prometheus scrape target; set METRICS_TOKEN to require "Authorization: Bearer <token>"
+    expected = os.getenv('METRICS_TOKEN')
+    if expected and not secrets.compare_digest(authorization or '', f'Bearer {expected}'):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics_registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 
 def set_session(session_id: str, data: dict):
     sessions[session_id] = data
@@ -218,6 +264,7 @@ def validate_api_key_auth(authorization: str) -> tuple[bool, Optional[str], Opti
     logger.debug(f"Validating API key: {api_key[:20]}...")
     result = api_key_manager.validate_api_key(api_key)
     logger.debug(f"API key manager validation result: {result}")
+    token_validations.labels('api_key', 'valid' if result else 'invalid').inc()
     if not result:
         logger.debug(f"API key validation failed: api_key_manager returned None")
         return False, None, None
@@ -355,33 +402,13 @@ def generate_token_with_iam_claims(user_info: dict, client_id: Optional[str] = N
             else:
                 user_groups.append(str(g))
 
-    # Aggregate roles from v2 roles manager and v1 app role mappings
+    # Roles for every app, resolved through the group-to-role index built from app_role_mappings
     user_roles: dict[str, list[str]] = {}
     try:
-        v2_roles = roles_manager.get_user_roles(user_groups)
-        if isinstance(v2_roles, dict):
-            user_roles.update(v2_roles)
+        # Raw Graph groups carry ids as well as names; mappings may use either
+        user_roles.update(roles_manager.get_user_roles(groups_data if isinstance(groups_data, list) else user_groups))
     except Exception as e:
-        logger.warning(f"Error getting v2 user roles: {e}")
-
-    if client_id:
-        try:
-            app_roles = app_store.get_user_roles_for_app(client_id, user_groups)
-            if app_roles:
-                user_roles[client_id] = app_roles
-        except Exception as e:
-            logger.warning(f"Error getting app-specific roles for {client_id}: {e}")
-    else:
-        # Get apps from database instead of memory
-        db_apps = db_service.get_all_registered_apps()
-        for app in db_apps:
-            app_id = app['client_id']
-            try:
-                app_roles = app_store.get_user_roles_for_app(app_id, user_groups)
-                if app_roles:
-                    user_roles[app_id] = app_roles
-            except Exception as e:
-                logger.warning(f"Error getting roles for app {app_id}: {e}")
+        logger.warning(f"Error getting user roles: {e}")
 
     # Compute field-level permissions and RLS filters
     permissions: dict[str, list[str]] = {}
@@ -397,14 +424,8 @@ def generate_token_with_iam_claims(user_info: dict, client_id: Optional[str] = N
                 all_perms.add(p)
             # Get RLS filters directly from database
             role_rls = get_role_rls_filters_from_db(client_id, role_name)
-            # Merge RLS filters correctly - they have structure: {resource: {field: [filters]}}
-            for resource, fields in role_rls.items():
-                if resource not in all_rls:
-                    all_rls[resource] = {}
-                for field, filters in fields.items():
-                    if field not in all_rls[resource]:
-                        all_rls[resource][field] = []
-                    all_rls[resource][field].extend(filters)
+            # Merge RLS filters - they have structure: {resource: {field: [filters]}}
+            merge_rls_filters(all_rls, role_rls)
         if all_perms:
             permissions[client_id] = list(all_perms)
         if all_rls:
@@ -420,14 +441,8 @@ def generate_token_with_iam_claims(user_info: dict, client_id: Optional[str] = N
                     all_perms.add(p)
                 # Get RLS filters directly from database
                 role_rls = get_role_rls_filters_from_db(app_id, role_name)
-                # Merge RLS filters correctly - they have structure: {resource: {field: [filters]}}
-                for resource, fields in role_rls.items():
-                    if resource not in all_rls:
-                        all_rls[resource] = {}
-                    for field, filters in fields.items():
-                        if field not in all_rls[resource]:
-                            all_rls[resource][field] = []
-                        all_rls[resource][field].extend(filters)
+                # Merge RLS filters - they have structure: {resource: {field: [filters]}}
+                merge_rls_filters(all_rls, role_rls)
             if all_perms:
                 permissions[app_id] = list(all_perms)
             if all_rls:
@@ -508,7 +523,7 @@ oauth_relays: Dict[str, dict] = {}
 @app.get("/auth/login")
 async def cids_login(request: Request, client_id: str, app_redirect_uri: str, state: str):
     # Validate app and redirect uri
-    app_data = app_store.get_app(client_id)
+    app_data = app_registry.get(client_id) or app_store.get_app(client_id)
     if not app_data:
         raise HTTPException(status_code=404, detail="Unknown client_id")
     if not app_data.get('is_active', True):
@@ -592,15 +607,9 @@ async def token_endpoint(token_request: TokenRequest, request: Request):
         # SECURITY: Hash the refresh token for database lookup
         old_refresh_token_hash = hashlib.sha256(token_request.refresh_token.encode()).hexdigest()
 
-        # Check if refresh token has been revoked in database
-        if db_service.is_token_revoked(token_hash=old_refresh_token_hash):
-            logger.warning(f"Attempt to use revoked refresh token")
-            raise HTTPException(status_code=401, detail="Refresh token has been revoked")
-
-        # Validate and rotate the refresh token
-        user_info, new_refresh_token = refresh_token_store.validate_and_rotate(token_request.refresh_token)
-        if not user_info:
-            # If invalid, revoke it in database for security
+        def reject_refresh_token():
+            # Revoked, rotated, expired and unknown tokens all end here; the store
+            # has already revoked the whole family if a retired token was replayed
             db_service.revoke_token(
                 token_id=old_refresh_token_hash,  # Using hash as ID for refresh tokens
                 token_hash=old_refresh_token_hash,
@@ -608,24 +617,26 @@ async def token_endpoint(token_request: TokenRequest, request: Request):
                 reason='invalid_token_attempt'
             )
             raise HTTPException(status_code=401, detail="Invalid refresh token")
-        # Fetch fresh groups if we still have Azure access token stored
+
+        user_info = refresh_token_store.validate(token_request.refresh_token)
+        if not user_info:
+            reject_refresh_token()
+
+        # Fetch fresh groups if we still have Azure access token stored, before
+        # rotating so the new refresh token carries them too
+        updates = {}
         if 'azure_access_token' in user_info:
-            azure_access_token = user_info.get('azure_access_token')
-            user_groups = []
-            group_names = []
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                headers = {'Authorization': f'Bearer {azure_access_token}'}
-                try:
-                    groups_response = await client.get('https://graph.microsoft.com/v1.0/me/memberOf?$select=id,displayName', headers=headers)
-                    if groups_response.status_code == 200:
-                        groups_data = groups_response.json()
-                        for g in groups_data.get('value', []):
-                            if isinstance(g, dict):
-                                user_groups.append({'id': g.get('id', ''), 'displayName': g.get('displayName', f"Group {g.get('id', '')[:8]}...")})
-                                group_names.append(g.get('displayName', ''))
-                        user_info['groups'] = user_groups
-                except Exception:
-                    logger.exception("Refresh: Failed to fetch groups from Graph API")
+            user_groups = await graph_groups_cache.get_user_groups(user_info.get('sub'), user_info.get('azure_access_token'))
+            if user_groups is not None:
+                updates['groups'] = user_groups
+            else:
+                logger.warning("Refresh: Failed to fetch groups from Graph API, keeping previous groups")
+
+        # Validate again and rotate: a concurrent request may have rotated the
+        # token while groups were fetched, which counts as reuse
+        user_info, new_refresh_token = refresh_token_store.validate_and_rotate(token_request.refresh_token, updates=updates)
+        if not user_info:
+            reject_refresh_token()
 
         # SECURITY: Capture client IP and User-Agent for token binding on refresh
         client_ip = request.client.host if request.client else None
@@ -639,24 +650,9 @@ async def token_endpoint(token_request: TokenRequest, request: Request):
         now_utc = datetime.utcnow()
         expires_utc = now_utc + timedelta(minutes=10)
 
-        # SECURITY: Implement refresh token rotation in database
-        # 1. Deactivate the old refresh token
-        db_service.deactivate_refresh_token(old_refresh_token_hash)
-        logger.info(f"Old refresh token deactivated for rotation")
-
-        # 2. Save the new refresh token
-        new_refresh_token_hash = hashlib.sha256(new_refresh_token.encode()).hexdigest()
-        db_service.save_refresh_token(
-            token_hash=new_refresh_token_hash,
-            user_email=user_info.get('email'),
-            user_id=user_info.get('sub'),
-            expires_at=datetime.utcnow() + timedelta(days=30),
-            parent_token_hash=old_refresh_token_hash  # Link to previous token for audit trail
-        )
-        logger.info(f"New refresh token saved for user {user_info.get('email')} (rotation)")
-
-        # 3. Update refresh token usage count
-        db_service.update_refresh_token_usage(old_refresh_token_hash)
+        # SECURITY: Refresh token rotation is persisted by refresh_token_store
+        # (old token deactivated, new token saved with parent link, usage counted)
+        logger.info(f"Refresh token rotated for user {user_info.get('email')}")
 
         issued_tokens[token_id] = {
             'id': token_id,
@@ -729,36 +725,23 @@ async def exchange_code_for_token(exchange_request: TokenExchangeRequest, reques
         user_groups = []
         group_names = []
         if azure_access_token:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                headers = {'Authorization': f'Bearer {azure_access_token}'}
-                try:
-                    groups_response = await client.get('https://graph.microsoft.com/v1.0/me/memberOf?$select=id,displayName', headers=headers)
-                    if groups_response.status_code == 200:
-                        groups_data = groups_response.json()
-                        for g in groups_data.get('value', []):
-                            if isinstance(g, dict):
-                                user_groups.append({'id': g.get('id', ''), 'displayName': g.get('displayName', f"Group {g.get('id', '')[:8]}...")})
-                                group_names.append(g.get('displayName', ''))
-                    else:
-                        logger.warning(f"Failed to fetch groups from Graph API: {groups_response.status_code}")
-                        user_groups = claims.get('groups', [])
-                        group_names = user_groups if isinstance(user_groups, list) else []
-                except Exception as e:
-                    logger.error(f"Failed to fetch groups from Graph API: {e}")
-                    user_groups = claims.get('groups', [])
-                    group_names = user_groups if isinstance(user_groups, list) else []
+            graph_groups = await graph_groups_cache.get_user_groups(claims.get('sub'), azure_access_token)
+            if graph_groups is not None:
+                user_groups = graph_groups
+                group_names = [g.get('displayName', '') for g in graph_groups]
+            else:
+                user_groups = claims.get('groups', [])
+                group_names = user_groups if isinstance(user_groups, list) else []
         else:
             user_groups = claims.get('groups', [])
             group_names = user_groups if isinstance(user_groups, list) else []
         app_roles = []
         app_permissions = {}
         app_rls_filters = {}
-        # Get apps from database instead of memory
-        db_apps = db_service.get_all_registered_apps()
-        for app in db_apps:
-            client_id = app['client_id']
-            user_app_roles = app_store.get_user_roles_for_app(client_id, group_names)
-            logger.info(f"Roles for {client_id} with groups {group_names[:3]}: {user_app_roles}")
+        # Graph group dicts match mappings by object id as well as display name
+        roles_by_app = roles_manager.get_user_roles(user_groups if isinstance(user_groups, list) else [])
+        logger.info(f"Roles with groups {group_names[:3]}: {roles_by_app}")
+        for client_id, user_app_roles in roles_by_app.items():
             for role in user_app_roles:
                 if role not in app_roles:
                     app_roles.append(role)
@@ -771,14 +754,8 @@ async def exchange_code_for_token(exchange_request: TokenExchangeRequest, reques
                     all_perms.update(role_perms)
                     # Get RLS filters directly from database
                     role_rls = get_role_rls_filters_from_db(client_id, role_name)
-                    # Merge RLS filters correctly - they have structure: {resource: {field: [filters]}}
-                    for resource, fields in role_rls.items():
-                        if resource not in all_rls:
-                            all_rls[resource] = {}
-                        for field, filters in fields.items():
-                            if field not in all_rls[resource]:
-                                all_rls[resource][field] = []
-                            all_rls[resource][field].extend(filters)
+                    # Merge RLS filters - they have structure: {resource: {field: [filters]}}
+                    merge_rls_filters(all_rls, role_rls)
                 if all_perms:
                     app_permissions[client_id] = list(all_perms)
                 if all_rls:
@@ -864,6 +841,7 @@ async def exchange_code_for_token(exchange_request: TokenExchangeRequest, reques
             }
         )
         
+        # SECURITY: The store saves the initial refresh token to the database for tracking
         refresh_token = refresh_token_store.create_refresh_token({
             'user_id': claims.get('sub'),
             'email': user_email,
@@ -872,19 +850,7 @@ async def exchange_code_for_token(exchange_request: TokenExchangeRequest, reques
             'azure_access_token': azure_access_token,
             'groups': user_groups,
             'sub': claims.get('sub')
-        })
-
-        # SECURITY: Save initial refresh token to database for tracking
-        refresh_token_hash = hashlib.sha256(refresh_token.encode()).hexdigest()
-        db_service.save_refresh_token(
-            token_hash=refresh_token_hash,
-            user_email=user_email,
-            user_id=claims.get('sub'),
-            expires_at=datetime.utcnow() + timedelta(days=30),
-            client_ip=None,  # TODO: Get from request
-            user_agent=None,  # TODO: Get from request headers
-            parent_token_hash=None  # This is the initial token, no parent
-        )
+        }, client_ip=client_ip, user_agent=user_agent)
         logger.info(f"Initial refresh token saved to database for user {user_email}")
 
         token_activity_logger.log_activity(internal_token_id, TokenAction.CREATED, performed_by={'email': user_email, 'sub': claims.get('sub')}, details={'auth_method': 'oauth_code_exchange'})
@@ -1102,13 +1068,145 @@ async def validate_token_endpoint(request: Request):
         return JSONResponse({'valid': False, 'error': error or 'Invalid token'})
     client_id = data.get('client_id')
     if client_id:
-        app_data = app_store.get_app(client_id)
+        app_data = app_registry.get(client_id) or app_store.get_app(client_id)
         if not app_data:
             return JSONResponse({'valid': False, 'error': 'Invalid client_id'})
         if not app_data.get('is_active'):
             return JSONResponse({'valid': False, 'error': 'Application is not active'})
     return JSONResponse({'valid': True, 'claims': claims})
 
+VALIDATE_BATCH_MAX = int(os.getenv('VALIDATE_BATCH_MAX', '100'))
+
+@app.post("/auth/validate/batch")
+async def validate_token_batch(batch_request: BatchValidateRequest, x_api_key: Optional[str] = Header(None)):
+    """Validate many JWTs and API keys in one call (for gateways).
+
+    Duplicates are verified once, revocation is checked with a single database
+    query, and results are returned in request order. The caller must
+    authenticate with X-API-Key; like proxied /auth/validate calls, IP and
+    device binding are not enforced.
+    """
+    if not x_api_key:
+        raise HTTPException(status_code=401, detail="X-API-Key required")
+    caller_valid, caller_client_id, caller_metadata = validate_api_key_auth(f"Bearer {x_api_key}")
+    if not caller_valid:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    if len(batch_request.tokens) > VALIDATE_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {VALIDATE_BATCH_MAX} tokens per batch")
+
+    unique_tokens = list(dict.fromkeys(batch_request.tokens))
+    results: Dict[str, dict] = {}
+    jwt_claims: Dict[str, dict] = {}
+
+    for token in unique_tokens:
+        if token.startswith('cids_ak_'):
+            is_valid, app_client_id, metadata_dict = validate_api_key_auth(f"Bearer {token}")
+            if is_valid:
+                results[token] = {'valid': True, 'sub': metadata_dict.get('sub'), 'email': metadata_dict.get('email'), 'name': metadata_dict.get('name'), 'permissions': metadata_dict.get('permissions', []), 'app_client_id': app_client_id, 'auth_type': 'api_key'}
+            else:
+                results[token] = {'valid': False, 'error': 'Invalid API key'}
+            continue
+        is_valid, claims, error = jwt_manager.validate_token(token)
+        if not is_valid:
+            results[token] = {'valid': False, 'error': error or 'Invalid token'}
+        else:
+            jwt_claims[token] = claims
+
+    # One revocation lookup for the whole batch
+    token_ids = {t: (c.get('jti') or c.get('token_id')) for t, c in jwt_claims.items()}
+    revoked_ids = db_service.get_revoked_token_ids([tid for tid in token_ids.values() if tid])
+
+    allowed_ids = []
+    for token, claims in jwt_claims.items():
+        token_id = token_ids[token]
+        if token_id and (token_id in revoked_ids or issued_tokens.get(token_id, {}).get('revoked', False)):
+            results[token] = {'valid': False, 'error': 'Token has been revoked'}
+            continue
+        allowed_ids.append(token_id)
+        results[token] = {
+            'valid': True,
+            'claims': claims,
+            'sub': claims.get('sub'),
+            'email': claims.get('email'),
+            'name': claims.get('name'),
+            'groups': claims.get('groups', []),
+            'permissions': claims.get('permissions', {}),
+            'auth_type': 'jwt',
+            'proxy_service': caller_client_id,
+            'proxy_validation': True
+        }
+
+    # Binding checks were skipped for every token above; one audit record per
+    # batch, like the service_proxy_validation record of /auth/validate
+    db_service.log_activity(
+        activity_type='service_proxy_validation',
+        entity_type='token',
+        entity_name=f"Batch of {len(allowed_ids)} tokens",
+        details={
+            'service_id': caller_client_id,
+            'service_name': (caller_metadata or {}).get('name', 'Unknown Service'),
+            'token_ids': allowed_ids,
+            'batch_size': len(batch_request.tokens),
+            'action': 'allowed'
+        }
+    )
+
+    return JSONResponse({
+        'results': [results[token] for token in batch_request.tokens],
+        'count': len(batch_request.tokens),
+        'unique': len(unique_tokens)
+    })
+
+def check_service_access(authorization: Optional[str]) -> bool:
+    """Resource servers authenticate to the revocation feed with an API key; admins may read it too."""
+    if authorization and authorization.startswith('Bearer cids_ak_'):
+        is_valid, _, _ = validate_api_key_auth(authorization)
+        return is_valid
+    is_admin, _ = check_admin_access(authorization)
+    return is_admin
+
+@app.get("/auth/revocations")
+async def get_revocations(since: Optional[str] = None, limit: int = Query(1000, ge=1, le=10000), wait: int = Query(0, ge=0, le=60), authorization: Optional[str] = Header(None)):
+    """Delta feed of revoked access-token jtis. With wait>0 this long-polls until something new arrives."""
+    if not check_service_access(authorization):
+        raise HTTPException(status_code=403, detail="API key or admin access required")
+    try:
+        result = revocation_feed.fetch(since, limit)
+        if not result['revocations'] and wait:
+            await revocation_feed.wait_for_change(wait)
+            result = revocation_feed.fetch(since, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(result)
+
+
+async def _sse_revocation_stream(request: Request, since: Optional[str]):
+    cursor = since
+    while True:
+        if await request.is_disconnected():
+            break
+        result = revocation_feed.fetch(cursor, 1000)
+        if result['revocations']:
+            cursor = result['cursor']
+            yield f"id: {cursor}\nevent: revocations\ndata: {json.dumps(result['revocations'])}\n\n"
+            if result['has_more']:
+                continue
+        elif not await revocation_feed.wait_for_change(15):
+            yield ": keepalive\n\n"
+
+
+@app.get("/auth/revocations/stream")
+async def stream_revocations(request: Request, since: Optional[str] = None, authorization: Optional[str] = Header(None), last_event_id: Optional[str] = Header(None)):
+    """SSE variant of /auth/revocations; resumes from Last-Event-ID when reconnecting."""
+    if not check_service_access(authorization):
+        raise HTTPException(status_code=403, detail="API key or admin access required")
+    cursor = last_event_id or since
+    try:
+        decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(_sse_revocation_stream(request, cursor), media_type="text/event-stream")
+
 @app.get("/auth/whoami")
 async def whoami(authorization: Optional[str] = Header(None)):
     if not authorization or not authorization.startswith('Bearer '):
@@ -1160,7 +1258,7 @@ async def logout(authorization: Optional[str] = Header(None), refresh_token: Opt
                 issued_tokens[token_id]['revoked_reason'] = 'user_logout'
 
             # DATABASE revocation (permanent, survives restarts)
-            expires_at = datetime.fromtimestamp(claims.get('exp')) if claims.get('exp') else None
+            expires_at = datetime.fromtimestamp(claims.get('exp'), tz=timezone.utc) if claims.get('exp') else None
             db_service.revoke_token(
                 token_id=token_id,
                 token_type='access',
@@ -1171,6 +1269,7 @@ async def logout(authorization: Optional[str] = Header(None), refresh_token: Opt
                 ip_address=None,  # TODO: Get from request
                 expires_at=expires_at
             )
+            revocation_feed.notify()
 
             # Log token revocation
             token_activity_logger.log_activity(
@@ -1183,7 +1282,7 @@ async def logout(authorization: Optional[str] = Header(None), refresh_token: Opt
 
         # SECURITY: Also revoke the refresh token if provided
         if refresh_token:
-            # Store revoked refresh tokens (you'll need to implement refresh token tracking)
+            refresh_token_store.revoke_token(refresh_token)
             logger.info(f"Refresh token revoked on logout for user {user_email}")
 
         # Log logout activity
@@ -1210,16 +1309,24 @@ async def logout(authorization: Optional[str] = Header(None), refresh_token: Opt
 # ==============================
 
 @app.get("/auth/admin/apps")
-async def list_apps(authorization: Optional[str] = Header(None)):
+async def list_apps(limit: Optional[int] = Query(None, ge=1, le=500), cursor: Optional[str] = None,
+                    authorization: Optional[str] = Header(None)):
+    """All apps as a plain list, or with ``limit`` one keyset page: {"items", "next_cursor"}."""
     is_admin, _ = check_admin_access(authorization)
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
-    
-    # Get apps from Supabase instead of JSON file
-    apps = db_service.get_all_registered_apps()
-    
-    # Return as plain list of dicts; shapes match AppResponse
-    return JSONResponse(apps)
+
+    if limit is None:
+        # Return as plain list of dicts; shapes match AppResponse
+        return JSONResponse(db_service.get_all_registered_apps())
+
+    try:
+        after = decode_apps_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    apps, has_more = db_service.get_registered_apps_page(limit, after)
+    next_cursor = encode_apps_cursor(apps[-1]['created_at'], apps[-1]['client_id']) if has_more and apps else None
+    return JSONResponse({"items": apps, "next_cursor": next_cursor})
 
 @app.get("/auth/admin/apps/stats")
 async def get_apps_stats(authorization: Optional[str] = Header(None)):
@@ -1254,8 +1361,8 @@ async def get_dashboard_stats(authorization: Optional[str] = Header(None)):
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Get comprehensive stats from database
-    stats = db_service.get_dashboard_stats()
+    # Single-query snapshot, cached for DASHBOARD_STATS_TTL seconds
+    stats = dashboard_stats.get()
     
     return JSONResponse({
         "apps": {
@@ -1303,8 +1410,7 @@ async def get_app_admin(client_id: str, authorization: Optional[str] = Header(No
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Get app from Supabase
-    app_data = db_service.get_app_by_id(client_id)
+    app_data = app_registry.get(client_id)
     if not app_data:
         raise HTTPException(status_code=404, detail="App not found")
     return JSONResponse(app_data)
@@ -1354,6 +1460,8 @@ async def register_app_admin(request: RegisterAppRequest, authorization: Optiona
     
     if not db_service.create_app(app_data):
         raise HTTPException(status_code=500, detail="Failed to create app")
+    app_registry.invalidate()
+    dashboard_stats.invalidate()
     
     # Log app creation
     audit_logger.log_action(
@@ -1385,6 +1493,7 @@ async def register_app_admin(request: RegisterAppRequest, authorization: Optiona
             )
             api_key = new_key
             api_key_metadata = metadata.to_dict()
+            dashboard_stats.invalidate()
 
         except Exception:
             logger.exception("Failed to create initial API key")
@@ -1445,7 +1554,7 @@ async def a2a_token_exchange(request: A2ATokenRequest = Body(None), authorizatio
         raise HTTPException(status_code=401, detail="Invalid API key")
 
     # Build service identity for the app
-    app_info = registered_apps.get(app_client_id)
+    app_info = app_registry.get(app_client_id)
     app_name = app_info.get('name') if app_info else app_client_id
 
     # Fetch per-key metadata (validate again to get metadata and update usage)
@@ -1495,14 +1604,8 @@ async def a2a_token_exchange(request: A2ATokenRequest = Body(None), authorizatio
                 all_perms.add(p)
             # Get RLS filters directly from database
             role_rls = get_role_rls_filters_from_db(app_id, role_name)
-            # Merge RLS filters correctly - they have structure: {resource: {field: [filters]}}
-            for resource, fields in role_rls.items():
-                if resource not in all_rls:
-                    all_rls[resource] = {}
-                for field, filters in fields.items():
-                    if field not in all_rls[resource]:
-                        all_rls[resource][field] = []
-                    all_rls[resource][field].extend(filters)
+            # Merge RLS filters - they have structure: {resource: {field: [filters]}}
+            merge_rls_filters(all_rls, role_rls)
         if all_perms:
             permissions[app_id] = list(all_perms)
         if all_rls:
@@ -1569,7 +1672,7 @@ async def update_app_admin(client_id: str, request: UpdateAppRequest, authorizat
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Check if app exists
-    existing_app = db_service.get_app_by_id(client_id)
+    existing_app = app_registry.get(client_id)
     if not existing_app:
         raise HTTPException(status_code=404, detail="App not found")
     
@@ -1591,6 +1694,8 @@ async def update_app_admin(client_id: str, request: UpdateAppRequest, authorizat
     # Update in Supabase
     if not db_service.update_app(client_id, updates):
         raise HTTPException(status_code=500, detail="Failed to update app")
+    app_registry.invalidate()
+    dashboard_stats.invalidate()
     
     # Log activity for is_active changes
     if 'is_active' in updates:
@@ -1609,7 +1714,7 @@ async def update_app_admin(client_id: str, request: UpdateAppRequest, authorizat
         )
     
     # Return updated app
-    app_data = db_service.get_app_by_id(client_id)
+    app_data = app_registry.get(client_id)
     return JSONResponse(app_data)
 
 
@@ -1621,13 +1726,15 @@ async def delete_app_admin(client_id: str, authorization: Optional[str] = Header
         raise HTTPException(status_code=403, detail="Admin access required")
 
     # Check if app exists in Supabase
-    app_info = db_service.get_app_by_id(client_id)
+    app_info = app_registry.get(client_id)
     if not app_info:
         raise HTTPException(status_code=404, detail="App not found")
     
     # Delete from Supabase
     if not db_service.delete_app(client_id):
         raise HTTPException(status_code=500, detail="Failed to delete app")
+    app_registry.invalidate()
+    group_role_index.invalidate()
 
     # Log app deletion
     audit_logger.log_action(
@@ -1650,6 +1757,7 @@ async def delete_app_admin(client_id: str, authorization: Optional[str] = Header
 
     # 2. Delete app endpoints
     endpoints_registry.delete_app_endpoints(client_id)
+    dashboard_stats.invalidate()
 
     return JSONResponse({"message": "App has been permanently deleted"})
 
@@ -1704,7 +1812,7 @@ async def set_role_mappings_admin(client_id: str, request: SetRoleMappingRequest
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Check if app exists in database first
-    app_data = db_service.get_app_by_id(client_id)
+    app_data = app_registry.get(client_id)
     app_exists_in_db = app_data is not None
     
     if not app_exists_in_db:
@@ -1736,7 +1844,7 @@ async def get_role_mappings_admin(client_id: str, authorization: Optional[str] =
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Get app from database
-    app_data = db_service.get_app_by_id(client_id)
+    app_data = app_registry.get(client_id)
     if not app_data:
         # Fallback to JSON for legacy apps
         app_data = app_store.get_app(client_id)
@@ -1768,8 +1876,7 @@ async def get_a2a_connections_admin(authorization: Optional[str] = Header(None))
     permissions = db_service.get_all_a2a_permissions()
 
     # Get all registered apps
-    apps = db_service.get_all_registered_apps()
-    app_map = {app['client_id']: app for app in apps}
+    app_map = app_registry.snapshot().by_id
 
     # Enrich permissions with app details
     connections = []
@@ -1814,11 +1921,11 @@ async def create_a2a_permission_admin(request: A2APermissionRequest, authorizati
         raise HTTPException(status_code=403, detail="Admin access required")
 
     # Validate source and target apps exist
-    source_app = db_service.get_app_by_id(request.source_client_id) or app_store.get_app(request.source_client_id)
+    source_app = app_registry.get(request.source_client_id) or app_store.get_app(request.source_client_id)
     if not source_app:
         raise HTTPException(status_code=400, detail=f"Source app {request.source_client_id} not found")
 
-    target_app = db_service.get_app_by_id(request.target_client_id) or app_store.get_app(request.target_client_id)
+    target_app = app_registry.get(request.target_client_id) or app_store.get_app(request.target_client_id)
     if not target_app:
         raise HTTPException(status_code=400, detail=f"Target app {request.target_client_id} not found")
 
@@ -1915,25 +2022,12 @@ async def get_azure_groups_admin(authorization: Optional[str] = Header(None), se
     tenant_id, client_id, client_secret = ensure_azure_env()
     if not tenant_id or not client_id or not client_secret:
         raise HTTPException(status_code=500, detail="Azure credentials not configured")
-    # Prefer application token for tenant-wide group listing
-    app_token = None
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            token_resp = await client.post(
-                f"https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token",
-                data={
-                    'grant_type': 'client_credentials',
-                    'client_id': client_id,
-                    'client_secret': client_secret,
-                    'scope': 'https://graph.microsoft.com/.default'
-                }
-            )
-        if token_resp.status_code == 200:
-            app_token = token_resp.json().get('access_token')
-        else:
-            logger.warning(f"Graph app token fetch failed: {token_resp.status_code} {token_resp.text}")
-    except Exception:
-        logger.exception("Error fetching Graph app token")
+    # Prefer application token for tenant-wide group listing (cached until near expiry)
+    app_token = await graph_app_token.get_token()
+
+    # Serve from the locally mirrored directory when the app token can read groups
+    if app_token and await group_directory.ensure_synced():
+        return JSONResponse({"groups": group_directory.search(search, top)})
 
     # Fallback to last delegated token
     delegated_token = None
@@ -1999,6 +2093,7 @@ async def create_api_key_admin(client_id: str, request: CreateAPIKeyRequest, aut
         default_audience=request.default_audience,
         allowed_audiences=request.allowed_audiences,
     )
+    dashboard_stats.invalidate()
     return JSONResponse({
         "api_key": api_key,
         "metadata": {
@@ -2051,6 +2146,7 @@ async def revoke_api_key_admin(client_id: str, key_id: str, authorization: Optio
         raise HTTPException(status_code=403, detail="Admin access required")
     if not api_key_manager.revoke_api_key(client_id, key_id):
         raise HTTPException(status_code=404, detail="Key not found")
+    dashboard_stats.invalidate()
     return JSONResponse({"message": "API key revoked successfully"})
 
 @app.post("/auth/admin/apps/{client_id}/api-keys/{key_id}/rotate")
@@ -2061,6 +2157,7 @@ async def rotate_api_key_admin(client_id: str, key_id: str, authorization: Optio
     result = api_key_manager.rotate_api_key(client_id, key_id, created_by=claims.get('email', 'admin'), grace_period_hours=grace_period_hours)
     if not result:
         raise HTTPException(status_code=404, detail="Key not found")
+    dashboard_stats.invalidate()
     new_key, metadata = result
     return JSONResponse({
         "api_key": new_key,
@@ -2128,7 +2225,7 @@ async def trigger_discovery(client_id: str, authorization: Optional[str] = Heade
         raise HTTPException(status_code=403, detail="Admin access required")
     
     user_email = claims.get('email') if claims else None
-    app_data = db_service.get_app_by_id(client_id)
+    app_data = app_registry.get(client_id)
     app_name = app_data.get('name') if app_data else client_id
     
     # Insert activity_log entry with dis_ prefixed ID from UUID service
@@ -2244,6 +2341,8 @@ async def trigger_discovery(client_id: str, authorization: Optional[str] = Heade
                 client_id
             ))
             logger.info(f"[STEP 2] Updated registered_apps discovery fields for {client_id}, result: {update_app_result}")
+            app_registry.invalidate()
+            dashboard_stats.invalidate()
 
         # STEP 3: Save individual endpoints to discovery_endpoints
         
@@ -2819,6 +2918,7 @@ async def create_permission_role(client_id: str, authorization: Optional[str] =
         client_id, role_name, set(permissions), description, rls_filters, denied_perms_set,
         user_email=user_email, user_id=user_id, a2a_only=bool(a2a_only)
     )
+    dashboard_stats.invalidate()
     # Persist a2a_only flag in metadata
     try:
         permission_registry.role_metadata.setdefault(client_id, {}).setdefault(role_name, {})['a2a_only'] = bool(a2a_only)
@@ -3028,6 +3128,7 @@ async def update_permission_role(client_id: str, role_name: str, authorization:
             client_id, role_name, set(permissions), description, rls_filters, denied_perms_set,
             user_email=user_email, user_id=user_id
         )
+        dashboard_stats.invalidate()
     # Optionally update a2a_only flag
     if a2a_only is not None:
         try:
@@ -3102,6 +3203,8 @@ async def update_permission_role(client_id: str, role_name: str, authorization:
                 ))
                 
                 db.conn.commit()
+                group_role_index.invalidate()
+                dashboard_stats.invalidate()
                 logger.info(f"Successfully updated role {role_name} is_active to {is_active}")
                 
             # Reload role metadata from database to ensure consistency
@@ -3182,6 +3285,7 @@ async def delete_role(client_id: str, role_name: str, authorization: Optional[st
     user_email = claims.get('email', 'unknown')
     user_id = claims.get('sub', claims.get('oid', 'unknown'))
     permission_registry.delete_role(client_id, role_name, user_email, user_id)
+    dashboard_stats.invalidate()
     audit_logger.log_action(action=AuditAction.ROLE_DELETED, details={'app_client_id': client_id, 'role_name': role_name, 'deleted_by': user_email, 'user_id': user_id})
     return JSONResponse({"status": "success", "message": f"Role '{role_name}' deleted successfully"})
 
@@ -3454,6 +3558,20 @@ async def revoke_token_by_id(token_id: str, authorization: Optional[str] = Heade
     token_data = issued_tokens[token_id]
     token_data['revoked'] = True
     token_data['revoked_at'] = datetime.utcnow().isoformat() + 'Z'
+    # Persist by jti so /auth/validate and the revocation feed see it
+    is_valid, token_claims, _ = jwt_manager.validate_token(token_data.get('access_token', ''))
+    jti = (token_claims or {}).get('jti')
+    if is_valid and jti:
+        db_service.revoke_token(
+            token_id=jti,
+            token_type='access',
+            revoked_by=claims.get('email'),
+            reason='admin_revoked',
+            user_email=token_claims.get('email'),
+            user_id=token_claims.get('sub'),
+            expires_at=datetime.fromtimestamp(token_claims['exp'], tz=timezone.utc) if token_claims.get('exp') else None
+        )
+        revocation_feed.notify()
     token_activity_logger.log_activity(token_id=token_id, action=TokenAction.REVOKED, performed_by={'email': claims.get('email')}, details={'reason': 'admin_revoked'})
     return JSONResponse({'status': 'success', 'message': 'Token revoked successfully', 'token_id': token_id})
 
@@ -3541,11 +3659,83 @@ async def get_logging_configuration(authorization: Optional[str] = Header(None))
     return JSONResponse(get_logging_config())
 
 
+@app.get("/auth/admin/logging/stats")
+async def get_logging_statistics(authorization: Optional[str] = Header(None)):
+    is_admin, _ = check_admin_access(authorization)
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return JSONResponse(get_logging_stats())
+
+
+@app.get("/auth/admin/db/query-stats")
+async def get_db_query_stats(authorization: Optional[str] = Header(None), sort: str = "total_ms", limit: int = 50):
+    """Per-fingerprint SQL statistics: count, errors, rows, mean/p50/p99/max latency"""
+    is_admin, _ = check_admin_access(authorization)
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if sort not in ("total_ms", "mean_ms", "p50_ms", "p99_ms", "max_ms", "count", "errors", "rows", "rows_per_call"):
+        raise HTTPException(status_code=400, detail=f"Unsupported sort field: {sort}")
+    return JSONResponse({
+        "slow_query": dict(get_logging_config().get("slow_query", {})),
+        "queries": query_stats.top(sort, max(1, min(limit, 500))),
+    })
+
+
+@app.delete("/auth/admin/db/query-stats")
+async def reset_db_query_stats(authorization: Optional[str] = Header(None)):
+    is_admin, _ = check_admin_access(authorization)
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    query_stats.reset()
+    return JSONResponse({"status": "reset"})
+
+
+@app.get("/auth/admin/db/query-stats/{fingerprint}/explain")
+async def explain_db_query(fingerprint: str, authorization: Optional[str] = Header(None)):
+    """EXPLAIN the most recent execution of a fingerprint with its original parameters"""
+    is_admin, _ = check_admin_access(authorization)
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    stats = query_stats.get(fingerprint)
+    if not stats or not stats.last_sql:
+        raise HTTPException(status_code=404, detail="Unknown query fingerprint")
+    plan = db_service.explain_query(stats.last_sql, stats.last_params)
+    if plan is None:
+        raise HTTPException(status_code=400, detail="Only SELECT statements can be explained")
+    return JSONResponse({"fingerprint": fingerprint, "statement": stats.statement, "plan": plan.splitlines()})
+
+
+@app.get("/auth/admin/debug/profile")
+async def profile_worker(authorization: Optional[str] = Header(None), seconds: float = 10, mode: str = "cpu", format: str = "collapsed", interval_ms: float = 5, include_idle: bool = False, top: int = 25, nframes: int = 1):
+    """Profile this worker: mode=cpu samples stacks (collapsed or speedscope), mode=alloc diffs tracemalloc snapshots"""
+    is_admin, claims = check_admin_access(authorization)
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if mode not in ("cpu", "alloc"):
+        raise HTTPException(status_code=400, detail="mode must be 'cpu' or 'alloc'")
+    if format not in ("collapsed", "speedscope"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'speedscope'")
+    logger.info(f"Profiling worker pid={os.getpid()} mode={mode} seconds={seconds} requested by {claims.get('email')}")
+    loop = asyncio.get_running_loop()
+    try:
+        # Sample from a thread so the event loop keeps serving (and is itself sampled)
+        if mode == "alloc":
+            result = await loop.run_in_executor(None, lambda: allocation_diff(seconds, max(1, min(top, 200)), nframes))
+            return JSONResponse(result)
+        samples = await loop.run_in_executor(None, lambda: sample_stacks(seconds, max(1.0, interval_ms) / 1000, include_idle))
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "speedscope":
+        return JSONResponse(samples.speedscope(f"cids pid {os.getpid()}"), headers={"Content-Disposition": f'attachment; filename="profile-{os.getpid()}.speedscope.json"'})
+    return PlainTextResponse(samples.collapsed(), headers={"X-Profile-Samples": str(samples.sample_count)})
+
+
 class LoggingConfigUpdate(BaseModel):
     app: Optional[dict] = None
     audit: Optional[dict] = None
     token_activity: Optional[dict] = None
     access: Optional[dict] = None
+    slow_query: Optional[dict] = None
     privacy: Optional[dict] = None
 
 
@@ -3561,11 +3751,18 @@ async def update_logging_configuration(request: LoggingConfigUpdate, authorizati
 
 
 @app.get("/auth/admin/logs/app")
-async def get_app_logs(authorization: Optional[str] = Header(None), start: Optional[str] = None, end: Optional[str] = None, level: Optional[str] = None, logger_prefix: Optional[str] = None, q: Optional[str] = None, limit: int = 100):
+async def get_app_logs(authorization: Optional[str] = Header(None), start: Optional[str] = None, end: Optional[str] = None, level: Optional[str] = None, logger_prefix: Optional[str] = None, q: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None):
     is_admin, _ = check_admin_access(authorization)
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     levels = [s.strip() for s in (level or "").split(",") if s.strip()]
+    if q:
+        # Term/phrase search through the inverted index, paged by cursor
+        try:
+            result = search_app_logs(q, start=start, end=end, level=levels or None, logger_prefix=logger_prefix, limit=limit, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return JSONResponse({"items": result["items"], "count": len(result["items"]), "next_cursor": result["next_cursor"]})
     items = read_app_logs(start=start, end=end, level=levels or None, logger_prefix=logger_prefix, q=q, limit=limit)
     return JSONResponse({"items": items, "count": len(items)})
 
@@ -3702,261 +3899,165 @@ async def get_token_activity_logs(authorization: Optional[str] = Header(None), s
     is_admin, _ = check_admin_access(authorization)
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
-    # Read persisted JSONL files
+    # Read persisted JSONL files newest-first and stop at the limit
     from pathlib import Path
     from libs.logging_config import get_logging_config
-    import json
+    from libs.jsonl_reader import daily_files, iter_jsonl_reverse
+    from libs.log_store import parse_log_ts
 
     cfg = get_logging_config()
     dir_path = Path(cfg.get("token_activity", {}).get("path"))
+    limit = max(1, min(limit, 1000))
     items = []
 
-    def parse_ts(v: str):
-        try:
-            from datetime import datetime
-            if v.endswith('Z') and '.' not in v:
-                return datetime.strptime(v, "%Y-%m-%dT%H:%M:%SZ")
-            return datetime.strptime(v, "%Y-%m-%dT%H:%M:%S.%fZ")
-        except Exception:
-            return None
+    start_dt = parse_log_ts(start) if start else None
+    end_dt = parse_log_ts(end) if end else None
 
-    start_dt = parse_ts(start) if start else None
-    end_dt = parse_ts(end) if end else None
-
-    if dir_path.exists():
-        for p in sorted(dir_path.glob('token_activity_*.jsonl'), reverse=True):
-            try:
-                with p.open('r') as fh:
-                    for line in fh:
-                        if not line.strip():
-                            continue
-                        obj = json.loads(line)
-                        ts = parse_ts(obj.get('timestamp', ''))
-                        if start_dt and (not ts or ts < start_dt):
-                            continue
-                        if end_dt and (not ts or ts > end_dt):
-                            continue
-                        if action and obj.get('action') != action:
-                            continue
-                        if user_email and (obj.get('performed_by', {}) or {}).get('email') != user_email:
-                            continue
-                        if token_id and obj.get('token_id') != token_id:
-                            continue
-                        items.append(obj)
-            except Exception:
+    files = daily_files(dir_path, "token_activity_", start_dt.date() if start_dt else None, end_dt.date() if end_dt else None)
+    for obj in iter_jsonl_reverse(files):
+        if start_dt or end_dt:
+            ts = parse_log_ts(obj.get('timestamp', ''))
+            if start_dt and (not ts or ts < start_dt):
+                continue
+            if end_dt and (not ts or ts > end_dt):
                 continue
-    items.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-    return JSONResponse({"items": items[: max(1, min(limit, 1000))], "count": min(len(items), max(1, min(limit, 1000)))})
+        if action and obj.get('action') != action:
+            continue
+        if user_email and (obj.get('performed_by', {}) or {}).get('email') != user_email:
+            continue
+        if token_id and obj.get('token_id') != token_id:
+            continue
+        items.append(obj)
+        if len(items) >= limit:
+            break
+    return JSONResponse({"items": items, "count": len(items)})
 
 # ===============
 # Export endpoints
 # ===============
 
+def _export_response(records, format: str, fields, filename: str, accept_encoding: Optional[str]) -> StreamingResponse:
+    from services.log_export import export_chunks
+    compress = "gzip" in (accept_encoding or "").lower()
+    ext, media_type = ("csv", "text/csv") if format == "csv" else ("ndjson", "application/x-ndjson")
+    headers = {"Content-Disposition": f"attachment; filename={filename}.{ext}"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(export_chunks(records, format, fields, compress), media_type=media_type, headers=headers)
+
+
 @app.get("/auth/admin/logs/app/export")
-async def export_app_logs(authorization: Optional[str] = Header(None), format: str = "ndjson", limit: int = 50000):
+async def export_app_logs(authorization: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None), format: str = "ndjson", limit: Optional[int] = None):
     is_admin, _ = check_admin_access(authorization)
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
+    from libs.jsonl_reader import iter_jsonl_reverse
+    from services.log_export import APP_LOG_FIELDS, limited
+    from services.log_reader import app_log_store
 
-    items = read_app_logs(limit=min(max(1, limit), 50000))
-
-    if format == "csv":
-        import csv
-        from io import StringIO
-        buf = StringIO()
-        if items:
-            keys = sorted({k for item in items for k in item.keys()})
-            writer = csv.DictWriter(buf, fieldnames=keys)
-            writer.writeheader()
-            for it in items:
-                writer.writerow(it)
-        content = buf.getvalue()
-        return Response(content, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=app_logs.csv"})
-    else:
-        # ndjson
-        content = "\n".join(json.dumps(it) for it in items)
-        return Response(content + ("\n" if content else ""), media_type="application/x-ndjson", headers={"Content-Disposition": "attachment; filename=app_logs.ndjson"})
+    records = limited(iter_jsonl_reverse(app_log_store().segments()), limit)
+    return _export_response(records, format, APP_LOG_FIELDS, "app_logs", accept_encoding)
 
 
 @app.get("/auth/admin/logs/audit/export")
-async def export_audit_logs(authorization: Optional[str] = Header(None), format: str = "ndjson", limit: int = 50000):
+async def export_audit_logs(authorization: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None), format: str = "ndjson", limit: Optional[int] = None):
     is_admin, _ = check_admin_access(authorization)
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     from services.audit import audit_logger
-    items = audit_logger.query_audit_logs(limit=min(max(1, limit), 50000))
-    if format == "csv":
-        import csv
-        from io import StringIO
-        buf = StringIO()
-        if items:
-            keys = sorted({k for item in items for k in item.keys()})
-            writer = csv.DictWriter(buf, fieldnames=keys)
-            writer.writeheader()
-            for it in items:
-                writer.writerow(it)
-        return Response(buf.getvalue(), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=audit_logs.csv"})
-    else:
-        content = "\n".join(json.dumps(it) for it in items)
-        return Response(content + ("\n" if content else ""), media_type="application/x-ndjson", headers={"Content-Disposition": "attachment; filename=audit_logs.ndjson"})
+    from libs.jsonl_reader import daily_files, iter_jsonl_reverse
+    from services.log_export import AUDIT_LOG_FIELDS, limited
+
+    records = limited(iter_jsonl_reverse(daily_files(audit_logger.audit_dir, "audit_")), limit)
+    return _export_response(records, format, AUDIT_LOG_FIELDS, "audit_logs", accept_encoding)
 
 
 @app.get("/auth/admin/logs/token-activity/export")
-async def export_token_activity_logs(authorization: Optional[str] = Header(None), format: str = "ndjson", limit: int = 50000):
+async def export_token_activity_logs(authorization: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None), format: str = "ndjson", limit: Optional[int] = None):
     is_admin, _ = check_admin_access(authorization)
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
-    # Reuse reader
-    data = await get_token_activity_logs(authorization=authorization, limit=min(max(1, limit), 50000))
-    items = data.body if hasattr(data, 'body') else None
-    if hasattr(data, 'body'):
-        import json as _json
-        body = _json.loads(data.body)
-        items = body.get('items', [])
-    else:
-        items = []
-    if format == "csv":
-        import csv
-        from io import StringIO
-        buf = StringIO()
-        if items:
-            keys = sorted({k for item in items for k in item.keys()})
-            writer = csv.DictWriter(buf, fieldnames=keys)
-            writer.writeheader()
-            for it in items:
-                writer.writerow(it)
-        return Response(buf.getvalue(), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=token_activity.csv"})
-    else:
-        content = "\n".join(json.dumps(it) for it in items)
-        return Response(content + ("\n" if content else ""), media_type="application/x-ndjson", headers={"Content-Disposition": "attachment; filename=token_activity.ndjson"})
+    from pathlib import Path
+    from libs.logging_config import get_logging_config
+    from libs.jsonl_reader import daily_files, iter_jsonl_reverse
+    from services.log_export import TOKEN_ACTIVITY_FIELDS, limited
+
+    dir_path = Path(get_logging_config().get("token_activity", {}).get("path"))
+    records = limited(iter_jsonl_reverse(daily_files(dir_path, "token_activity_")), limit)
+    return _export_response(records, format, TOKEN_ACTIVITY_FIELDS, "token_activity", accept_encoding)
 
 
 # ===============
 # SSE live tails
 # ===============
 
-async def _sse_event_stream_app():
+async def _sse_log_tail(request: Request, tailer, last_event_id: Optional[str]):
     import asyncio
-    from pathlib import Path
-    from libs.logging_config import get_logging_config
 
-    cfg = get_logging_config()
-    path = Path(cfg.get("app", {}).get("file", {}).get("path", ""))
-    if not path.exists():
-        # yield a comment to keep connection open
-        yield f": no log file yet\n\n"
-    last_size = 0
-    while True:
-        try:
-            if path.exists():
-                size = path.stat().st_size
-                if size > last_size:
-                    with path.open('r') as fh:
-                        fh.seek(last_size)
-                        for line in fh:
-                            if line.strip():
-                                yield f"data: {line.strip()}\n\n"
-                    last_size = size
-        except Exception:
-            pass
-        await asyncio.sleep(1)
+    sub, replay = tailer.subscribe(last_event_id)
+    try:
+        if tailer.current_file() is None:
+            # yield a comment to keep connection open
+            yield f": no {tailer.name} log file yet\n\n"
+        for event_id, line in replay:
+            yield f"id: {event_id}\ndata: {line}\n\n"
+        while True:
+            try:
+                event_id, line = await asyncio.wait_for(sub.queue.get(), timeout=15)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            if event_id is None:
+                # This client fell behind and the tailer skipped events
+                yield f"event: dropped\ndata: {json.dumps({'count': int(line)})}\n\n"
+                continue
+            yield f"id: {event_id}\ndata: {line}\n\n"
+    finally:
+        tailer.unsubscribe(sub)
 
 
 @app.get("/auth/admin/logs/app/stream")
-async def stream_app_logs(authorization: Optional[str] = Header(None)):
+async def stream_app_logs(request: Request, authorization: Optional[str] = Header(None), last_event_id: Optional[str] = Header(None)):
     is_admin, _ = check_admin_access(authorization)
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
-    return StreamingResponse(_sse_event_stream_app(), media_type="text/event-stream")
-
-
-async def _sse_event_stream_audit():
-    import asyncio
-    from pathlib import Path
-    from libs.logging_config import get_logging_config
-
-    cfg = get_logging_config()
-    dir_path = Path(cfg.get("audit", {}).get("path", ""))
-    last_file = None
-    last_size = 0
-    while True:
-        try:
-            files = sorted(dir_path.glob('audit_*.jsonl')) if dir_path.exists() else []
-            current = files[-1] if files else None
-            if current is None:
-                yield f": no audit log file yet\n\n"
-                await asyncio.sleep(2)
-                continue
-            if last_file != current:
-                last_file = current
-                last_size = 0
-            size = current.stat().st_size
-            if size > last_size:
-                with current.open('r') as fh:
-                    fh.seek(last_size)
-                    for line in fh:
-                        if line.strip():
-                            yield f"data: {line.strip()}\n\n"
-                last_size = size
-        except Exception:
-            pass
-        await asyncio.sleep(1)
+    from services.log_tail import app_log_tailer
+    return StreamingResponse(_sse_log_tail(request, app_log_tailer, last_event_id), media_type="text/event-stream")
 
 
 @app.get("/auth/admin/logs/audit/stream")
-async def stream_audit_logs(authorization: Optional[str] = Header(None)):
+async def stream_audit_logs(request: Request, authorization: Optional[str] = Header(None), last_event_id: Optional[str] = Header(None)):
     is_admin, _ = check_admin_access(authorization)
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
-    return StreamingResponse(_sse_event_stream_audit(), media_type="text/event-stream")
-
-
-async def _sse_event_stream_token_activity():
-    import asyncio
-    from pathlib import Path
-    from libs.logging_config import get_logging_config
-
-    cfg = get_logging_config()
-    dir_path = Path(cfg.get("token_activity", {}).get("path", ""))
-    last_file = None
-    last_size = 0
-    while True:
-        try:
-            files = sorted(dir_path.glob('token_activity_*.jsonl')) if dir_path.exists() else []
-            current = files[-1] if files else None
-            if current is None:
-                yield f": no token activity log file yet\n\n"
-                await asyncio.sleep(2)
-                continue
-            if last_file != current:
-                last_file = current
-                last_size = 0
-            size = current.stat().st_size
-            if size > last_size:
-                with current.open('r') as fh:
-                    fh.seek(last_size)
-                    for line in fh:
-                        if line.strip():
-                            yield f"data: {line.strip()}\n\n"
-                last_size = size
-        except Exception:
-            pass
-        await asyncio.sleep(1)
+    from services.log_tail import audit_log_tailer
+    return StreamingResponse(_sse_log_tail(request, audit_log_tailer, last_event_id), media_type="text/event-stream")
 
 
 @app.get("/auth/admin/logs/token-activity/stream")
-async def stream_token_activity_logs(authorization: Optional[str] = Header(None)):
+async def stream_token_activity_logs(request: Request, authorization: Optional[str] = Header(None), last_event_id: Optional[str] = Header(None)):
     is_admin, _ = check_admin_access(authorization)
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
-    return StreamingResponse(_sse_event_stream_token_activity(), media_type="text/event-stream")
+    from services.log_tail import token_activity_tailer
+    return StreamingResponse(_sse_log_tail(request, token_activity_tailer, last_event_id), media_type="text/event-stream")
 
 
-async def get_app_logs(authorization: Optional[str] = Header(None), start: Optional[str] = None, end: Optional[str] = None, level: Optional[str] = None, logger_prefix: Optional[str] = None, q: Optional[str] = None, limit: int = 100):
+async def get_app_logs(authorization: Optional[str] = Header(None), start: Optional[str] = None, end: Optional[str] = None, level: Optional[str] = None, logger_prefix: Optional[str] = None, q: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None):
     is_admin, _ = check_admin_access(authorization)
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     levels = [s.strip() for s in (level or "").split(",") if s.strip()]
+    if q:
+        # Term/phrase search through the inverted index, paged by cursor
+        try:
+            result = search_app_logs(q, start=start, end=end, level=levels or None, logger_prefix=logger_prefix, limit=limit, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return JSONResponse({"items": result["items"], "count": len(result["items"]), "next_cursor": result["next_cursor"]})
     items = read_app_logs(start=start, end=end, level=levels or None, logger_prefix=logger_prefix, q=q, limit=limit)
     return JSONResponse({"items": items, "count": len(items)})
 
@@ -4289,3 +4390,13 @@ async def startup_event():
     await setup_a2a_endpoints(app, db_service, jwt_manager, check_admin_access)
     logger.info("A2A endpoints initialized")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled outbound HTTP clients and flush buffered log writers"""
+    from services.token_activity_persist import token_activity_sink
+    token_activity_sink.close()
+    await graph_groups_cache.close()
+    await group_directory.close()
+    await graph_app_token.close()
+    tracer.flush()
+
@@ -0,0 +1,110 @@
+"""Result files shared by the load and micro benchmarks.
+
+Results are JSON with sorted keys and one entry per scenario, tagged with the
+git commit they were measured on, so two runs can be diffed directly or
+compared with ``compare_results``.
+"""
+from __future__ import annotations
+
+import json
+import math
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max in milliseconds for latencies given in seconds."""
+    values = sorted(latencies)
+    return {
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round((values[-1] if values else 0.0) * 1000, 3),
+    }
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_ROOT,
+                             capture_output=True, text=True, timeout=5)
+        rev = out.stdout.strip() or "unknown"
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_ROOT,
+                               capture_output=True, text=True, timeout=5).stdout.strip()
+        return f"{rev}-dirty" if dirty else rev
+    except Exception:
+        return "unknown"
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "measured_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+    }
+
+
+def write_results(path: Path, kind: str, settings: Dict[str, Any], results: Dict[str, Dict[str, Any]]):
+    doc = {"kind": kind, "environment": environment(), "settings": settings, "results": results}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as f:
+        json.dump(doc, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    with path.open("r") as f:
+        return json.load(f)
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], metrics: Sequence[str],
+                    threshold: float = 0.10) -> List[str]:
+    """Side-by-side table of ``metrics`` per scenario; flags changes beyond ``threshold``.
+
+    Returns the table lines; scenarios that got worse are marked ``REGRESSION``.
+    Metrics ending in ``_per_s`` are better when higher, all others when lower.
+    """
+    lines = [f"baseline {baseline['environment']['commit']}  ->  current {current['environment']['commit']}"]
+    width = max([len(name) for name in current["results"]] + [8])
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        old, new = baseline["results"].get(name), current["results"].get(name)
+        if old is None or new is None:
+            lines.append(f"{name:<{width}}  {'only in current' if old is None else 'only in baseline'}")
+            continue
+        cells, flag = [], ""
+        for metric in metrics:
+            a, b = old.get(metric), new.get(metric)
+            if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+                continue
+            change = (b - a) / a if a else 0.0
+            cells.append(f"{metric} {a:g} -> {b:g} ({change:+.1%})")
+            worse = change < -threshold if metric.endswith("_per_s") else change > threshold
+            if worse:
+                flag = "  REGRESSION"
+        lines.append(f"{name:<{width}}  " + "  ".join(cells) + flag)
+    return lines
+
+
+def print_compare(baseline_path: str, current_path: str, metrics: Sequence[str], threshold: float) -> int:
+    lines = compare_results(load_results(Path(baseline_path)), load_results(Path(current_path)), metrics, threshold)
+    print("\n".join(lines))
+    return 1 if any(line.endswith("REGRESSION") for line in lines) else 0
+
+
+def exit_with(code: int):
+    sys.stdout.flush()
+    sys.exit(code)
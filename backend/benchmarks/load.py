@@ -0,0 +1,300 @@
+"""Load benchmark for the CIDS auth hot paths.
+
+Starts the FastAPI app under uvicorn against the configured Postgres (``DB_*``
+environment variables, as for the server), with Azure AD and Graph pointed at
+local stubs, then drives each scenario with a fixed number of concurrent
+closed-loop clients and records throughput and latency percentiles.
+
+    python -m benchmarks.load --concurrency 16 --duration 20 --out results/load.json
+    python -m benchmarks.load --compare results/load-main.json results/load.json
+
+Run from ``backend/``. Credentials are created up front: JWTs are signed with
+the key pair the benchmark hands to the server, refresh tokens and an API key
+are written through the regular services, for the first registered app (or
+``--client-id``). Use ``--base-url`` with ``--keys-dir`` to target a server
+that is already running.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import BACKEND_ROOT, exit_with, latency_summary, print_compare, write_results
+from benchmarks.stub_services import GROUPS, StubServices
+
+ADMIN_EMAIL = "bench-admin@example.com"
+USER_EMAIL = "bench-user@example.com"
+
+COMPARE_METRICS = ("throughput_per_s", "p50_ms", "p95_ms", "p99_ms")
+
+
+@dataclass
+class Credentials:
+    admin_token: str
+    user_token: str
+    api_key: str
+    refresh_tokens: List[str]
+
+
+@dataclass
+class Worker:
+    index: int
+    refresh_token: Optional[str] = None
+
+
+@dataclass
+class ScenarioResult:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        ok = len(self.latencies)
+        return dict(
+            requests=ok + self.errors,
+            errors=self.errors,
+            throughput_per_s=round(ok / self.elapsed, 2) if self.elapsed else 0.0,
+            statuses=dict(sorted(self.statuses.items())),
+            **latency_summary(self.latencies),
+        )
+
+
+# ---- scenarios: (method, path, request kwargs) for the next request of a worker ----
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+def _bearer(token: str) -> Dict[str, Any]:
+    return {"headers": {"Authorization": f"Bearer {token}"}}
+
+
+def validate_jwt(creds: Credentials, worker: Worker) -> Request:
+    return "GET", "/auth/validate", _bearer(creds.user_token)
+
+
+def validate_api_key(creds: Credentials, worker: Worker) -> Request:
+    return "GET", "/auth/validate", _bearer(creds.api_key)
+
+
+def refresh(creds: Credentials, worker: Worker) -> Request:
+    return "POST", "/auth/token", {"json": {"grant_type": "refresh_token", "refresh_token": worker.refresh_token}}
+
+
+def a2a_token(creds: Credentials, worker: Worker) -> Request:
+    return "POST", "/auth/token/a2a", dict(_bearer(creds.api_key), json={})
+
+
+def admin_apps(creds: Credentials, worker: Worker) -> Request:
+    return "GET", "/auth/admin/apps", _bearer(creds.admin_token)
+
+
+def admin_dashboard(creds: Credentials, worker: Worker) -> Request:
+    return "GET", "/auth/admin/dashboard/stats", _bearer(creds.admin_token)
+
+
+SCENARIOS: Dict[str, Callable[[Credentials, Worker], Request]] = {
+    "validate_jwt": validate_jwt,
+    "validate_api_key": validate_api_key,
+    "refresh": refresh,
+    "a2a_token": a2a_token,
+    "admin_apps": admin_apps,
+    "admin_dashboard": admin_dashboard,
+}
+
+
+# ---- setup ----
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def create_credentials(keys_dir: Path, client_id: Optional[str], refresh_count: int) -> Credentials:
+    """Sign JWTs with the server's key pair and write refresh tokens and an API key to the DB."""
+    from services.jwt import JWTManager
+    from services.database import db_service
+    from services.refresh_tokens import refresh_token_store
+    from services.api_keys import api_key_manager
+
+    jwt_manager = JWTManager(key_path=str(keys_dir))
+    admin = {"sub": "bench-admin", "email": ADMIN_EMAIL, "name": "Bench Admin", "groups": []}
+    user = {"sub": "bench-user", "email": USER_EMAIL, "name": "Bench User", "groups": GROUPS}
+
+    if client_id is None:
+        apps = [a for a in db_service.get_all_registered_apps() if a.get("is_active", True)]
+        if not apps:
+            raise SystemExit("No registered apps found; seed the database first or pass --client-id")
+        client_id = apps[0]["client_id"]
+    api_key, _ = api_key_manager.create_api_key(client_id, "load-benchmark", ["read"], created_by=ADMIN_EMAIL, ttl_days=1)
+
+    # One rotation chain per worker; the Graph stub answers the group refresh
+    refresh_tokens = [
+        refresh_token_store.create_refresh_token(dict(user, azure_access_token="stub-user-token"), lifetime_days=1)
+        for _ in range(refresh_count)
+    ]
+    return Credentials(
+        admin_token=jwt_manager.create_token(admin, 120),
+        user_token=jwt_manager.create_token(user, 120),
+        api_key=api_key,
+        refresh_tokens=refresh_tokens,
+    )
+
+
+def start_server(workdir: Path, port: int, stubs: StubServices) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": str(BACKEND_ROOT) + os.pathsep + env.get("PYTHONPATH", ""),
+        # ./keys under workdir is the key pair create_credentials signs with
+        "PERSIST_KEYS": "true",
+        "ADMIN_EMAILS": ADMIN_EMAIL,
+        "GRAPH_API_BASE_URL": stubs.base_url,
+        "AZURE_AUTHORITY_BASE_URL": stubs.base_url,
+        "AZURE_TENANT_ID": env.get("AZURE_TENANT_ID", "bench-tenant"),
+        "AZURE_CLIENT_ID": env.get("AZURE_CLIENT_ID", "bench-client"),
+        "AZURE_CLIENT_SECRET": env.get("AZURE_CLIENT_SECRET", "bench-secret"),
+        "LOG_LEVEL": env.get("LOG_LEVEL", "WARNING"),
+    })
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env,
+    )
+
+
+async def wait_ready(base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/.well-known/jwks.json")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"Server at {base_url} did not become ready within {timeout:.0f}s")
+
+
+# ---- driver ----
+
+async def run_scenario(client: httpx.AsyncClient, name: str, creds: Credentials, workers: List[Worker],
+                       duration: float, warmup: float) -> ScenarioResult:
+    build = SCENARIOS[name]
+    result = ScenarioResult()
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def loop(worker: Worker):
+        while True:
+            started = time.perf_counter()
+            if started >= deadline:
+                return
+            method, path, kwargs = build(creds, worker)
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = str(response.status_code)
+                ok = response.status_code < 400
+                if ok and name == "refresh":
+                    worker.refresh_token = response.json().get("refresh_token")
+            except httpx.HTTPError as e:
+                status, ok = type(e).__name__, False
+            finished = time.perf_counter()
+            if started < measure_from:
+                continue
+            result.statuses[status] = result.statuses.get(status, 0) + 1
+            if ok:
+                result.latencies.append(finished - started)
+            else:
+                result.errors += 1
+                if name == "refresh":
+                    # A broken rotation chain cannot recover; retire this worker
+                    return
+
+    await asyncio.gather(*(loop(w) for w in workers))
+    result.elapsed = duration
+    return result
+
+
+async def run(args) -> Dict[str, Dict[str, Any]]:
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    stubs = StubServices(delay_ms=args.stub_delay_ms).start()
+    server = None
+    workdir = tempfile.TemporaryDirectory(prefix="cids-bench-")
+    try:
+        if args.base_url:
+            base_url = args.base_url.rstrip("/")
+            keys_dir = Path(args.keys_dir or BACKEND_ROOT / "keys")
+        else:
+            keys_dir = Path(workdir.name) / "keys"
+            port = args.port or _free_port()
+            base_url = f"http://127.0.0.1:{port}"
+        creds = create_credentials(keys_dir, args.client_id, args.concurrency)
+        if not args.base_url:
+            server = start_server(Path(workdir.name), port, stubs)
+        await wait_ready(base_url)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+            for name in scenarios:
+                workers = [Worker(i, creds.refresh_tokens[i]) for i in range(args.concurrency)]
+                outcome = await run_scenario(client, name, creds, workers, args.duration, args.warmup)
+                results[name] = outcome.summary()
+                r = results[name]
+                print(f"{name:<18} {r['throughput_per_s']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f} ms  "
+                      f"p95 {r['p95_ms']:>8.2f} ms  p99 {r['p99_ms']:>8.2f} ms  errors {r['errors']}")
+        return results
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        stubs.stop()
+        workdir.cleanup()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenario names")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients per scenario")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--stub-delay-ms", type=float, default=0.0, help="latency added by the Azure/Graph stub")
+    parser.add_argument("--client-id", help="app whose API key the a2a/api_key scenarios use")
+    parser.add_argument("--base-url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--keys-dir", help="key pair of the running server (with --base-url)")
+    parser.add_argument("--port", type=int, help="port for the server started by the benchmark")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change flagged by --compare")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        exit_with(print_compare(args.compare[0], args.compare[1], COMPARE_METRICS, args.threshold))
+    results = asyncio.run(run(args))
+    if args.out:
+        settings = {k: getattr(args, k) for k in ("scenarios", "concurrency", "duration", "warmup", "stub_delay_ms")}
+        write_results(Path(args.out), "load", settings, results)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
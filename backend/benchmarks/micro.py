@@ -0,0 +1,222 @@
+"""Micro benchmarks for pure-Python hot functions.
+
+Each benchmark builds seeded synthetic input at several scales (10, 1k and 100k
+items by default), then times the function in calibrated loops: loops are
+doubled until one sample takes ``--min-time``, and ``--repeat`` samples are
+taken. The median time per call is what gets compared.
+
+    python -m benchmarks.micro                       # run everything, print table
+    python -m benchmarks.micro -k template --scales 10,1000
+    python -m benchmarks.micro --save-baseline       # store benchmarks/baselines/micro.json
+    python -m benchmarks.micro --check               # compare with the stored baseline
+
+Services are constructed without their ``__init__`` so no database, file or
+network access happens; only the attributes the timed method reads are set.
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import logging
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks import synthetic
+from benchmarks.common import compare_results, environment, exit_with, load_results, write_results
+
+BASELINE = Path(__file__).resolve().parent / "baselines" / "micro.json"
+DEFAULT_SCALES = (10, 1_000, 100_000)
+COMPARE_METRICS = ("median_us",)
+
+# name -> setup(scale, rng), which returns the zero-argument callable to time
+BENCHMARKS: Dict[str, Callable[[int, random.Random], Callable[[], Any]]] = {}
+
+
+def bench(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _bare(cls, **attrs):
+    """Instance of ``cls`` without running ``__init__`` (which would touch the DB)."""
+    obj = cls.__new__(cls)
+    for key, value in attrs.items():
+        setattr(obj, key, value)
+    return obj
+
+
+# ---- benchmarks: scale = number of templates / permissions / fields / endpoints ----
+
+@bench("token_templates.find_matching_template")
+def find_matching_template(scale: int, rng: random.Random):
+    from services.token_templates import TokenTemplateManager
+    groups = synthetic.group_names(rng, max(20, scale // 10))
+    manager = _bare(TokenTemplateManager, templates=synthetic.token_templates(rng, scale, groups))
+    user_groups = rng.sample(groups, k=10)
+    return lambda: manager.find_matching_template(user_groups)
+
+
+@bench("token_templates.apply_template")
+def apply_template(scale: int, rng: random.Random):
+    from services.token_templates import TokenTemplateManager
+    groups = synthetic.group_names(rng, max(20, scale // 10))
+    manager = _bare(TokenTemplateManager, templates=synthetic.token_templates(rng, scale, groups))
+    user_groups = rng.sample(groups, k=10)
+    claims = synthetic.token_claims(rng, user_groups)
+    return lambda: manager.apply_template(claims, user_groups)
+
+
+@bench("cids_auth.filter_fields")
+def filter_fields(scale: int, rng: random.Random):
+    from libs.cids_auth import CIDSAuth
+    auth = _bare(CIDSAuth, client_id="app-bench")
+    n_records, n_fields = synthetic.split_scale(scale, 100)
+    data = [synthetic.record(rng, n_fields) for _ in range(n_records)]
+    # Half of the fields granted explicitly, nested objects through a wildcard
+    permissions = [f"app-bench.employees.read.field_{i}" for i in range(0, n_fields, 2)]
+    permissions += [f"app-bench.employees_field_{i}.read.*" for i in range(9, n_fields, 10)]
+    return lambda: auth.filter_fields(data, permissions, "employees")
+
+
+@bench("permission_registry.check_permission")
+def check_permission(scale: int, rng: random.Random):
+    from services.permission_registry import PermissionRegistry
+    keys = synthetic.permission_keys(rng, "app-bench", scale)
+    roles = {f"role-{r}": set(keys[r::10]) for r in range(10)}
+    registry = _bare(PermissionRegistry, role_permissions={"app-bench": roles})
+    user_roles = ["role-1", "role-3", "role-7"]
+    # A miss walks every wildcard prefix, the worst case
+    missing = "app-bench.employees.read.not_granted"
+    return lambda: registry.check_permission("app-bench", user_roles, missing)
+
+
+@bench("endpoints.match_endpoint")
+def match_endpoint(scale: int, rng: random.Random):
+    from services.endpoints import AppEndpointsRegistry
+    n_apps, per_app = synthetic.split_scale(scale, 10)
+    registry = _bare(AppEndpointsRegistry, endpoints=synthetic.endpoints(rng, n_apps, per_app))
+    return lambda: registry.match_endpoint("GET", "/api/orders/3/items")
+
+
+@bench("discovery._generate_permissions")
+def generate_permissions(scale: int, rng: random.Random):
+    from schemas.discovery import DiscoveryResponse
+    from services.discovery import DiscoveryService
+    n_endpoints, fields = synthetic.split_scale(scale, max(1, scale // 20))
+    document = DiscoveryResponse(**synthetic.discovery_document(rng, "app-bench", n_endpoints, fields))
+    service = _bare(DiscoveryService)
+    return lambda: service._generate_permissions("app-bench", document)
+
+
+@bench("resource_filters.merge_rls_filters")
+def merge_rls(scale: int, rng: random.Random):
+    from services.resource_filters import merge_rls_filters
+    n_roles, per_role = synthetic.split_scale(scale, 10)
+    n_resources, fields = synthetic.split_scale(per_role, 10)
+    roles = synthetic.role_rls_filters(rng, n_roles, n_resources, fields)
+
+    def merge():
+        merged: Dict[str, Dict[str, List[Dict]]] = {}
+        for role_rls in roles:
+            merge_rls_filters(merged, role_rls)
+        return merged
+    return merge
+
+
+@bench("role_index.roles_for_groups")
+def roles_for_groups(scale: int, rng: random.Random):
+    from services.role_index import GroupRoleIndex, build_group_index
+    groups = synthetic.group_names(rng, max(20, scale // 10))
+    rows = [{'ad_group_name': rng.choice(groups), 'client_id': f"app-{i % 50}", 'role_name': f"role-{i}"}
+            for i in range(scale)]
+    built = build_group_index(rows)
+    index = _bare(GroupRoleIndex, index=lambda: built)
+    user_groups = rng.sample(groups, k=10)
+    return lambda: index.roles_for_groups(user_groups)
+
+
+# ---- runner ----
+
+def measure(func: Callable[[], Any], min_time: float, repeat: int) -> Dict[str, Any]:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 24:
+            break
+        loops *= 2
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return {
+        "loops": loops,
+        "median_us": round(statistics.median(samples) * 1e6, 3),
+        "min_us": round(min(samples) * 1e6, 3),
+        "stdev_us": round(statistics.stdev(samples) * 1e6, 3) if len(samples) > 1 else 0.0,
+    }
+
+
+def run(pattern: str, scales: List[int], min_time: float, repeat: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, setup in BENCHMARKS.items():
+        if not fnmatch.fnmatch(name, f"*{pattern}*"):
+            continue
+        for scale in scales:
+            func = setup(scale, random.Random(f"{seed}:{name}:{scale}"))
+            func()  # warm caches and lazy imports
+            key = f"{name}[{scale}]"
+            results[key] = measure(func, min_time, repeat)
+            r = results[key]
+            print(f"{key:<52} {r['median_us']:>14.3f} us  (min {r['min_us']:.3f}, stdev {r['stdev_us']:.3f}, loops {r['loops']})")
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--pattern", default="", help="only benchmarks whose name contains this")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES), help="comma-separated input sizes")
+    parser.add_argument("--min-time", type=float, default=0.1, help="minimum seconds per sample")
+    parser.add_argument("--repeat", type=int, default=7, help="samples per benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--save-baseline", action="store_true", help=f"store results as {BASELINE.name}")
+    parser.add_argument("--check", action="store_true", help="compare with the stored baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown flagged as a regression")
+    parser.add_argument("--keep-logging", action="store_true", help="leave logging enabled while timing")
+    args = parser.parse_args(argv)
+
+    if not args.keep_logging:
+        # apply_template and friends log per call; keep the output readable
+        logging.disable(logging.CRITICAL)
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    results = run(args.pattern, scales, args.min_time, args.repeat, args.seed)
+    settings = {"scales": scales, "min_time": args.min_time, "repeat": args.repeat, "seed": args.seed}
+    if args.out:
+        write_results(Path(args.out), "micro", settings, results)
+    if args.save_baseline:
+        write_results(BASELINE, "micro", settings, results)
+        print(f"Baseline written to {BASELINE}")
+    if args.check:
+        if not BASELINE.exists():
+            raise SystemExit(f"No baseline at {BASELINE}; run with --save-baseline first")
+        baseline = load_results(BASELINE)
+        # Only what was run this time; -k and --scales select a subset
+        baseline["results"] = {k: v for k, v in baseline["results"].items() if k in results}
+        current = {"environment": environment(), "results": results}
+        lines = compare_results(baseline, current, COMPARE_METRICS, args.threshold)
+        print("\n".join(lines))
+        exit_with(1 if any(line.endswith("REGRESSION") for line in lines) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+"""Deterministic synthetic data for scale testing.
+
+Seeds the ``cids`` schema with apps, roles, AD group mappings, permissions,
+RLS filters, API keys, discovery history/endpoints/permissions, and large
+``activity_log`` and ``revoked_tokens`` tables, all through ``COPY``.
+
+    python -m benchmarks.seed --apps 2000 --activity 5000000 --revoked 2000000 --reset
+    python -m benchmarks.seed --apps 200 --discovery-dir /tmp/discovery --skip-db
+
+Every table draws from its own ``random.Random`` derived from ``--seed``, and
+timestamps are offsets from ``--anchor``. The same seed and anchor therefore
+produce the same rows, and changing one volume does not reshuffle the others.
+The anchor defaults to the start of the current UTC day so the "last 24 hours"
+style queries see data.
+
+Synthetic rows are recognisable: client ids and token ids start with
+``syn_`` and users are ``@synthetic.example``. ``--reset`` deletes exactly
+those rows before seeding.
+
+With ``--discovery-dir`` one ``/discovery`` document per app is written (the
+``test-Apps/sample-app`` shape), and each app's ``discovery_endpoint`` points
+at ``--discovery-base-url``. ``python -m benchmarks.stub_services
+--discovery-dir ...`` serves them.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from benchmarks import synthetic
+
+PREFIX = "syn_"
+LIKE_PREFIX = r"syn\_%"
+USER_DOMAIN = "synthetic.example"
+
+ACTIVITY_TYPES = (
+    ("token.validated", 40), ("token.issued", 20), ("token.refreshed", 15), ("login", 10),
+    ("api_key.used", 8), ("logout", 3), ("role.update", 1), ("permission.update", 1),
+    ("discovery_run", 1), ("app.update", 1),
+)
+REVOKE_REASONS = ("logout", "rotation", "admin_revoked", "security_breach")
+RLS_OPERATORS = ("=", "IN", "LIKE")
+
+
+# ---- COPY ----
+
+def _copy_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, separators=(",", ":"), sort_keys=True)
+    text = str(value)
+    if any(c in text for c in "\\\t\n\r"):
+        text = text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return text
+
+
+def copy_rows(cursor, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]], batch_size: int) -> int:
+    """Stream ``rows`` into ``table`` with ``COPY ... FROM STDIN`` in batches."""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    count = 0
+    buffer = io.StringIO()
+    pending = 0
+    for row in rows:
+        buffer.write("\t".join(_copy_value(v) for v in row))
+        buffer.write("\n")
+        pending += 1
+        if pending >= batch_size:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            count += pending
+            buffer, pending = io.StringIO(), 0
+    if pending:
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+        count += pending
+    return count
+
+
+# ---- model ----
+
+@dataclass
+class Role:
+    role_id: str
+    name: str
+    groups: List[str]
+    a2a_only: bool
+
+
+@dataclass
+class App:
+    client_id: str
+    name: str
+    created_at: datetime
+    is_active: bool
+    discovered: bool
+    roles: List[Role] = field(default_factory=list)
+    # resource -> action -> flattened field descriptors (the discovered_permissions shape)
+    resources: Dict[str, Dict[str, List[Dict[str, Any]]]] = field(default_factory=dict)
+    document: Optional[Dict[str, Any]] = None
+
+
+class Seeder:
+    def __init__(self, args):
+        self.args = args
+        self.anchor: datetime = args.anchor
+        self.apps: List[App] = []
+
+    def rng(self, table: str) -> random.Random:
+        return random.Random(f"{self.args.seed}:{table}")
+
+    def ago(self, rng: random.Random, days: float) -> datetime:
+        return self.anchor - timedelta(seconds=rng.random() * days * 86400)
+
+    def user(self, rng: random.Random) -> Tuple[str, str]:
+        n = rng.randrange(self.args.users)
+        return f"user{n:07d}@{USER_DOMAIN}", f"{PREFIX}user_{n:07d}"
+
+    # -- in-memory catalogue shared by the small tables --
+
+    def build_apps(self):
+        args = self.args
+        rng = self.rng("apps")
+        groups = [f"{PREFIX}grp_{i:06d}" for i in range(args.groups)]
+        per_app_groups = args.roles_per_app * args.groups_per_role
+        if per_app_groups > len(groups):
+            raise SystemExit(f"--groups must be at least roles-per-app x groups-per-role ({per_app_groups}); "
+                             "app_role_mappings is unique per (client_id, ad_group_name)")
+        for a in range(args.apps):
+            app = App(
+                client_id=f"{PREFIX}app_{a:06d}",
+                name=f"Synthetic App {a}",
+                created_at=self.ago(rng, 365),
+                is_active=rng.random() > 0.05,
+                discovered=rng.random() < args.discovered_ratio,
+            )
+            app_groups = rng.sample(groups, per_app_groups)
+            for r in range(args.roles_per_app):
+                app.roles.append(Role(
+                    role_id=f"rol_{PREFIX}{a:06d}_{r:03d}",
+                    name=f"role_{r}",
+                    groups=app_groups[r * args.groups_per_role:(r + 1) * args.groups_per_role],
+                    a2a_only=r == args.roles_per_app - 1 and rng.random() < 0.2,
+                ))
+            if app.discovered:
+                doc_rng = random.Random(f"{args.seed}:discovery:{app.client_id}")
+                app.document = synthetic.discovery_document(doc_rng, app.client_id, args.endpoints_per_app,
+                                                            args.fields_per_endpoint)
+                app.document["description"] = f"Synthetic application {a}"
+                app.resources = _resources(app.document)
+            self.apps.append(app)
+
+    # -- row generators, one per table --
+
+    def registered_apps(self) -> Iterator[tuple]:
+        base = self.args.discovery_base_url.rstrip("/")
+        for app in self.apps:
+            discovered_at = app.created_at + (self.anchor - app.created_at) / 2 if app.discovered else None
+            yield (app.client_id, app.name, f"Generated by benchmarks.seed (seed {self.args.seed})",
+                   [f"https://{app.client_id}.{USER_DOMAIN}/callback"], f"owner@{USER_DOMAIN}", app.is_active,
+                   app.created_at, app.created_at, f"{base}/apps/{app.client_id}/discovery", True,
+                   discovered_at, "completed" if app.discovered else None, "1" if app.discovered else None)
+
+    def role_metadata(self) -> Iterator[tuple]:
+        for app in self.apps:
+            for role in app.roles:
+                yield (role.role_id, app.client_id, role.name, f"Synthetic {role.name} for {app.name}",
+                       role.a2a_only, True, app.created_at)
+
+    def app_role_mappings(self) -> Iterator[tuple]:
+        for app in self.apps:
+            for role in app.roles:
+                for group in role.groups:
+                    yield (f"map_{PREFIX}{hashlib.md5(f'{app.client_id}:{group}'.encode()).hexdigest()[:12]}",
+                           app.client_id, group, role.name, role.role_id, app.created_at, app.created_at)
+
+    def _role_grants(self, rng: random.Random, app: App) -> Iterator[Tuple[Role, str, str, List[Dict], Dict]]:
+        """(role, resource, action, fields, rls) for every permission row, RLS included."""
+        for role in app.roles:
+            resources = sorted(app.resources)
+            for resource in rng.sample(resources, min(len(resources), self.args.resources_per_role)):
+                for action, fields in sorted(app.resources[resource].items()):
+                    granted = [f for f in fields if rng.random() < 0.6]
+                    rls: Dict[str, List[Dict[str, Any]]] = {}
+                    # Row filters apply to top-level columns
+                    columns = [f for f in granted if f["field_path"] == f["field_name"]]
+                    for f in rng.sample(columns, min(len(columns), self.args.rls_per_grant)):
+                        op = rng.choice(RLS_OPERATORS)
+                        rls[f["field_path"]] = [{"filter": f"{f['field_path']} {op} '{synthetic.word(rng, 6)}'",
+                                                 "operator": "AND", "priority": 0}]
+                    yield role, resource, action, granted, rls
+
+    def permissions_and_filters(self) -> Tuple[List[tuple], List[tuple]]:
+        rng = self.rng("permissions")
+        permissions, filters = [], []
+        for app in self.apps:
+            for role, resource, action, fields, rls in self._role_grants(rng, app):
+                per_id = f"PER_{PREFIX}{rng.getrandbits(48):012x}"
+                permissions.append((role.role_id, resource, action, [f["field_path"] for f in fields],
+                                    rls, per_id, app.created_at, app.created_at))
+                for field_name, conditions in rls.items():
+                    for condition in conditions:
+                        filters.append((f"{PREFIX}{rng.getrandbits(64):016x}", app.client_id, role.name, resource,
+                                        field_name, condition["filter"], True, f"seed@{USER_DOMAIN}",
+                                        f"seed@{USER_DOMAIN}", f"RLS filter for {role.name} on {resource}.{field_name}",
+                                        condition["operator"], condition["priority"], {}))
+        # rls_filters is unique per (client, role, resource, field) among active rows
+        unique = {(r[1], r[2], r[3], r[4]): r for r in filters}
+        return permissions, list(unique.values())
+
+    def api_keys(self) -> Iterator[tuple]:
+        rng = self.rng("api_keys")
+        for app in self.apps:
+            for k in range(self.args.api_keys_per_app):
+                key_id = f"{PREFIX}{rng.getrandbits(128):032x}"
+                created = self.ago(rng, 180)
+                expires = created + timedelta(days=rng.choice((30, 90, 365)))
+                yield (app.client_id, key_id, hashlib.sha256(key_id.encode()).hexdigest(), f"key {k}",
+                       expires, f"owner@{USER_DOMAIN}", rng.random() > 0.1, f"log_{key_id[len(PREFIX):][:16]}",
+                       created)
+
+    def discovery_tables(self) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+        history, endpoints, permissions = [], [], []
+        for app in self.apps:
+            if not app.discovered:
+                continue
+            doc = app.document
+            discovery_id = f"dis_{PREFIX}{app.client_id[len(PREFIX):]}"
+            discovered_at = app.created_at + (self.anchor - app.created_at) / 2
+            # discovery_version is the per-app run number (compared as ::int), not the document version
+            history.append((discovery_id, app.client_id, discovered_at, "1", doc["app_name"],
+                            doc["description"], self.args.discovery_base_url, len(doc["endpoints"]), doc,
+                            "completed", f"seed@{USER_DOMAIN}"))
+            for ep in doc["endpoints"]:
+                resource, action = _resource_action(ep)
+                endpoints.append((discovery_id, ep["method"], ep["path"], ep["operation_id"], ep["description"],
+                                  resource, action, [], ep.get("response_fields") or {}, discovered_at))
+            for resource, actions in sorted(app.resources.items()):
+                for action, fields in sorted(actions.items()):
+                    categories = {"base": [f for f in fields if not (f["is_pii"] or f["is_phi"] or f["is_sensitive"])]}
+                    for flag, category in (("is_pii", "pii"), ("is_phi", "phi"), ("is_sensitive", "sensitive")):
+                        flagged = [f for f in fields if f[flag]]
+                        if flagged:
+                            categories[category] = flagged
+                    for category, selected in categories.items():
+                        permissions.append((f"per_{PREFIX}{hashlib.md5(f'{app.client_id}:{resource}:{action}:{category}'.encode()).hexdigest()[:16]}",
+                                            discovery_id, app.client_id, resource, action, category, None,
+                                            f"{action.capitalize()} {category} {resource} data", selected, discovered_at))
+        return history, endpoints, permissions
+
+    def activity_log(self) -> Iterator[tuple]:
+        rng = self.rng("activity_log")
+        types = [t for t, _ in ACTIVITY_TYPES]
+        weights = [w for _, w in ACTIVITY_TYPES]
+        clients = [a.client_id for a in self.apps] or [f"{PREFIX}app_none"]
+        for i in range(self.args.activity):
+            activity_type = rng.choices(types, weights)[0]
+            email, user_id = self.user(rng)
+            client_id = rng.choice(clients)
+            failed = rng.random() < 0.03
+            yield (f"log_{PREFIX}{i:010d}", activity_type, "app", client_id, client_id, email, user_id,
+                   {"client_id": client_id, "seq": i}, "failure" if failed else "success",
+                   "synthetic failure" if failed else None, _ip(rng), "benchmarks.seed",
+                   self.ago(rng, self.args.days))
+
+    def revoked_tokens(self) -> Iterator[tuple]:
+        rng = self.rng("revoked_tokens")
+        for i in range(self.args.revoked):
+            email, user_id = self.user(rng)
+            refresh = rng.random() < 0.3
+            revoked_at = self.ago(rng, self.args.days)
+            issued = revoked_at - timedelta(seconds=rng.random() * (7 * 86400 if refresh else 3600))
+            expires = issued + timedelta(days=7) if refresh else issued + timedelta(hours=1)
+            token_id = f"{PREFIX}{rng.getrandbits(128):032x}"
+            yield (token_id, "refresh" if refresh else "access", revoked_at,
+                   email if rng.random() < 0.8 else f"admin@{USER_DOMAIN}", rng.choice(REVOKE_REASONS), email,
+                   user_id, _ip(rng), expires, hashlib.sha256(token_id.encode()).hexdigest() if refresh else None)
+
+    # -- writers --
+
+    def write_discovery_documents(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        for app in self.apps:
+            if app.document is not None:
+                with (directory / f"{app.client_id}.json").open("w") as f:
+                    json.dump(app.document, f, indent=2, sort_keys=True)
+        print(f"Wrote {sum(1 for a in self.apps if a.document)} discovery documents to {directory}")
+
+    def load(self, conn):
+        batch = self.args.batch_size
+        cursor = conn.cursor()
+        if self.args.reset:
+            reset(cursor)
+        permissions, filters = self.permissions_and_filters()
+        history, endpoints, discovered = self.discovery_tables()
+        tables = [
+            ("cids.registered_apps", ("client_id", "name", "description", "redirect_uris", "owner_email", "is_active",
+                                      "created_at", "updated_at", "discovery_endpoint", "allow_discovery",
+                                      "last_discovery_at", "discovery_status", "discovery_version"),
+             self.registered_apps()),
+            ("cids.role_metadata", ("role_id", "client_id", "role_name", "description", "a2a_only", "is_active",
+                                    "created_at"), self.role_metadata()),
+            ("cids.app_role_mappings", ("mapping_uuid", "client_id", "ad_group_name", "role_name", "rol_id",
+                                        "created_at", "updated_at"), self.app_role_mappings()),
+            ("cids.permissions", ("role_id", "resource", "action", "fields", "resource_filters", "per_id",
+                                  "created_at", "updated_at"), permissions),
+            ("cids.rls_filters", ("rls_id", "client_id", "role_name", "resource", "field_name", "filter_condition",
+                                  "is_active", "created_by", "updated_by", "description", "filter_operator",
+                                  "priority", "metadata"), filters),
+            ("cids.api_keys", ("client_id", "key_id", "key_hash", "name", "expires_at", "created_by", "is_active",
+                               "log_id", "created_at"), self.api_keys()),
+            ("cids.discovery_history", ("discovery_id", "client_id", "discovery_timestamp", "discovery_version",
+                                        "app_name", "app_description", "base_url", "endpoints_count",
+                                        "discovery_data", "status", "discovered_by"), history),
+            ("cids.discovery_endpoints", ("discovery_id", "method", "path", "operation_id", "description",
+                                          "resource", "action", "parameters", "response_fields", "created_at"),
+             endpoints),
+            ("cids.discovered_permissions", ("permission_id", "discovery_id", "client_id", "resource", "action",
+                                             "category", "field_name", "description", "available_fields",
+                                             "discovered_at"), discovered),
+            ("cids.activity_log", ("activity_id", "activity_type", "entity_type", "entity_id", "entity_name",
+                                   "user_email", "user_id", "details", "status", "error_message", "ip_address",
+                                   "user_agent", "timestamp"), self.activity_log()),
+            ("cids.revoked_tokens", ("token_id", "token_type", "revoked_at", "revoked_by", "revoked_reason",
+                                     "user_email", "user_id", "ip_address", "expires_at", "token_hash"),
+             self.revoked_tokens()),
+        ]
+        try:
+            for table, columns, rows in tables:
+                started = time.perf_counter()
+                count = copy_rows(cursor, table, columns, rows, batch)
+                print(f"{table:<30} {count:>12,} rows  {time.perf_counter() - started:8.1f}s")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        # Fresh planner statistics, otherwise the first benchmark runs see empty tables
+        conn.autocommit = True
+        for table, _, _ in tables:
+            cursor.execute(f"ANALYZE {table}")
+        cursor.close()
+
+
+def reset(cursor):
+    """Delete rows written by a previous run (and only those)."""
+    statements = [
+        ("cids.permissions", "role_id IN (SELECT role_id FROM cids.role_metadata WHERE client_id LIKE %s)"),
+        ("cids.rls_filters", "client_id LIKE %s"),
+        ("cids.app_role_mappings", "client_id LIKE %s"),
+        ("cids.discovered_permissions", "client_id LIKE %s"),
+        ("cids.discovery_endpoints", "discovery_id IN (SELECT discovery_id FROM cids.discovery_history WHERE client_id LIKE %s)"),
+        ("cids.discovery_history", "client_id LIKE %s"),
+        ("cids.api_keys", "client_id LIKE %s"),
+        ("cids.role_metadata", "client_id LIKE %s"),
+        ("cids.registered_apps", "client_id LIKE %s"),
+        ("cids.activity_log", "activity_id LIKE %s"),
+        ("cids.revoked_tokens", "token_id LIKE %s"),
+    ]
+    for table, where in statements:
+        value = f"log\\_{LIKE_PREFIX}" if table == "cids.activity_log" else LIKE_PREFIX
+        cursor.execute(f"DELETE FROM {table} WHERE {where}", (value,))
+        print(f"reset {table:<30} {cursor.rowcount:>12,} rows")
+
+
+# ---- helpers ----
+
+def _resource_action(endpoint: Dict[str, Any]) -> Tuple[str, str]:
+    from schemas.discovery import extract_action_from_method, extract_resource_from_path
+    path = endpoint["path"]
+    return (extract_resource_from_path(path),
+            extract_action_from_method(endpoint["method"], not path.rstrip("/").endswith("}")))
+
+
+def _flatten(fields: Dict[str, Any], parent: str = "") -> Iterator[Dict[str, Any]]:
+    for name, meta in fields.items():
+        path = f"{parent}.{name}" if parent else name
+        yield {"field_name": name, "field_path": path, "field_type": meta["type"],
+               "description": meta.get("description", ""), "is_sensitive": meta.get("sensitive", False),
+               "is_pii": meta.get("pii", False), "is_phi": meta.get("phi", False), "is_financial": False}
+        if meta.get("fields"):
+            yield from _flatten(meta["fields"], path)
+        elif meta.get("items", {}).get("fields"):
+            yield from _flatten(meta["items"]["fields"], f"{path}[]")
+
+
+def _resources(document: Dict[str, Any]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    resources: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+    for ep in document["endpoints"]:
+        resource, action = _resource_action(ep)
+        fields = resources.setdefault(resource, {}).setdefault(action, {})
+        for f in _flatten(ep.get("response_fields") or ep.get("request_fields") or {}):
+            fields.setdefault(f["field_path"], f)
+    return {r: {a: list(f.values()) for a, f in actions.items()} for r, actions in resources.items()}
+
+
+def _ip(rng: random.Random) -> str:
+    return f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+
+
+def _anchor(value: Optional[str]) -> datetime:
+    if value:
+        anchor = datetime.fromisoformat(value)
+        return anchor if anchor.tzinfo else anchor.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=_anchor, default=_anchor(None),
+                        help="ISO timestamp all generated times are relative to (default: today 00:00 UTC)")
+    parser.add_argument("--apps", type=int, default=1000)
+    parser.add_argument("--roles-per-app", type=int, default=5)
+    parser.add_argument("--groups", type=int, default=5000, help="size of the AD group pool")
+    parser.add_argument("--groups-per-role", type=int, default=3)
+    parser.add_argument("--resources-per-role", type=int, default=4)
+    parser.add_argument("--rls-per-grant", type=int, default=1, help="RLS filters per role permission")
+    parser.add_argument("--api-keys-per-app", type=int, default=3)
+    parser.add_argument("--discovered-ratio", type=float, default=0.8, help="share of apps with a discovery run")
+    parser.add_argument("--endpoints-per-app", type=int, default=20)
+    parser.add_argument("--fields-per-endpoint", type=int, default=12)
+    parser.add_argument("--users", type=int, default=50_000, help="distinct users in activity and revocations")
+    parser.add_argument("--activity", type=int, default=1_000_000, help="activity_log rows")
+    parser.add_argument("--revoked", type=int, default=500_000, help="revoked_tokens rows")
+    parser.add_argument("--days", type=float, default=90, help="history window for activity and revocations")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="rows per COPY")
+    parser.add_argument("--reset", action="store_true", help="delete synthetic rows from a previous run first")
+    parser.add_argument("--discovery-dir", type=Path, help="write one discovery document per app here")
+    parser.add_argument("--discovery-base-url", default="http://127.0.0.1:8900",
+                        help="where the stub serves the discovery documents")
+    parser.add_argument("--skip-db", action="store_true", help="only write discovery documents")
+    args = parser.parse_args(argv)
+
+    seeder = Seeder(args)
+    seeder.build_apps()
+    if args.discovery_dir:
+        seeder.write_discovery_documents(args.discovery_dir)
+    if args.skip_db:
+        return
+
+    import psycopg2
+    from services.database import DatabaseService
+    conn = psycopg2.connect(**DatabaseService().connection_params)
+    try:
+        seeder.load(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
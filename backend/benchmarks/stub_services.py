@@ -0,0 +1,125 @@
+"""Local stand-ins for Azure AD and Microsoft Graph used by the load benchmark.
+
+A threaded stdlib HTTP server that answers the calls the auth hot paths make:
+the ``client_credentials`` token request and the group reads from Graph. An
+optional fixed delay per response mimics network latency, so benchmark numbers
+reflect CIDS itself rather than the tenant.
+
+It also serves the ``/discovery`` documents written by ``benchmarks.seed
+--discovery-dir`` at ``/apps/<client_id>/discovery``, so discovery can run
+against thousands of synthetic apps:
+
+    python -m benchmarks.stub_services --port 8900 --discovery-dir /tmp/discovery
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import urlparse
+
+GROUPS = [
+    {"id": f"00000000-0000-0000-0000-{i:012d}", "displayName": f"bench-group-{i}"}
+    for i in range(1, 11)
+]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    delay = 0.0
+    discovery_dir: Optional[Path] = None
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body, head: bool = False):
+        if self.delay:
+            time.sleep(self.delay)
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(data)
+
+    def _discovery_document(self, path: str) -> Optional[bytes]:
+        parts = path.strip("/").split("/")
+        if self.discovery_dir is None or len(parts) != 3 or parts[0] != "apps" or parts[2] != "discovery":
+            return None
+        document = self.discovery_dir / f"{Path(parts[1]).name}.json"
+        return document.read_bytes() if document.is_file() else None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if urlparse(self.path).path.endswith("/oauth2/v2.0/token"):
+            self._send(200, {"token_type": "Bearer", "expires_in": 3600, "access_token": "stub-app-token"})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_HEAD(self):
+        document = self._discovery_document(urlparse(self.path).path)
+        self._send(200 if document is not None else 404, document or b"", head=True)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        document = self._discovery_document(path)
+        if document is not None:
+            self._send(200, document)
+        elif path.endswith("/me/memberOf") or path.endswith("/transitiveMemberOf"):
+            self._send(200, {"value": [dict(g, **{"@odata.type": "#microsoft.graph.group"}) for g in GROUPS]})
+        elif path.endswith("/groups/delta"):
+            self._send(200, {"value": GROUPS, "@odata.deltaLink": f"http://{self.headers.get('Host')}{path}?$deltatoken=bench"})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServices:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay_ms: float = 0.0,
+                 discovery_dir: Optional[Path] = None):
+        handler = type("StubHandler", (_Handler,), {"delay": delay_ms / 1000.0, "discovery_dir": discovery_dir})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServices":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="bench-stubs", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="latency added to every response")
+    parser.add_argument("--discovery-dir", type=Path, help="documents written by benchmarks.seed --discovery-dir")
+    args = parser.parse_args(argv)
+
+    stubs = StubServices(args.host, args.port, args.delay_ms, args.discovery_dir)
+    print(f"Stub services on {stubs.base_url}")
+    try:
+        stubs.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stubs.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
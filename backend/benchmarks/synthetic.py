@@ -0,0 +1,119 @@
+"""Seeded synthetic inputs for the micro benchmarks.
+
+Every generator takes a ``random.Random`` and a size, so the same seed and
+scale always produce the same data and results stay comparable between runs.
+"""
+from __future__ import annotations
+
+import random
+import string
+from typing import Any, Dict, List, Tuple
+
+ACTIONS = ("read", "write", "delete")
+RESOURCES = ("employees", "payroll", "patients", "orders", "invoices", "devices", "tickets", "projects")
+
+
+def word(rng: random.Random, length: int = 8) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=length))
+
+
+def group_names(rng: random.Random, n: int) -> List[str]:
+    return [f"grp-{word(rng, 6)}-{i}" for i in range(n)]
+
+
+def token_templates(rng: random.Random, n: int, groups: List[str]) -> List[Dict[str, Any]]:
+    """``n`` enabled templates, each bound to a few AD groups, plus one default."""
+    claims = [{"key": k, "include": True} for k in ("iss", "sub", "aud", "exp", "iat", "email", "name", "groups", "roles")]
+    templates = [{"name": "Default Token", "adGroups": [], "priority": 0, "enabled": True, "claims": claims}]
+    for i in range(n):
+        templates.append({
+            "name": f"template-{i}",
+            "adGroups": rng.sample(groups, k=min(3, len(groups))),
+            "priority": rng.randint(1, 100),
+            "enabled": rng.random() > 0.1,
+            "claims": claims + [{"key": f"custom_{j}", "value": j} for j in range(rng.randint(0, 5))],
+        })
+    return templates
+
+
+def token_claims(rng: random.Random, groups: List[str]) -> Dict[str, Any]:
+    return {
+        "iss": "internal-auth-service", "sub": word(rng, 12), "aud": "internal-services",
+        "exp": 2_000_000_000, "iat": 1_700_000_000, "nbf": 1_700_000_000, "jti": word(rng, 32),
+        "token_type": "access", "token_version": "2.0", "email": f"{word(rng)}@example.com",
+        "name": word(rng), "groups": groups, "roles": {}, "bound_ip": "10.0.0.1", "bound_device": word(rng, 16),
+    }
+
+
+def permission_keys(rng: random.Random, app_id: str, n: int) -> List[str]:
+    """``n`` distinct ``app.resource.action.field`` keys."""
+    return [f"{app_id}.{RESOURCES[i % len(RESOURCES)]}.{ACTIONS[i % len(ACTIONS)]}.field_{i}" for i in range(n)]
+
+
+def record(rng: random.Random, n_fields: int, depth: int = 1) -> Dict[str, Any]:
+    """A response object with ``n_fields`` top-level fields, some nested."""
+    obj: Dict[str, Any] = {}
+    for i in range(n_fields):
+        if depth and i % 10 == 9:
+            obj[f"field_{i}"] = record(rng, 5, depth - 1)
+        else:
+            obj[f"field_{i}"] = rng.choice([word(rng), rng.randint(0, 10_000), rng.random() > 0.5])
+    return obj
+
+
+def endpoints(rng: random.Random, n_apps: int, per_app: int) -> Dict[str, Dict[str, Any]]:
+    """``AppEndpointsRegistry.endpoints`` shape; about one in five paths is a wildcard."""
+    data: Dict[str, Dict[str, Any]] = {}
+    for a in range(n_apps):
+        eps = []
+        for e in range(per_app):
+            resource = RESOURCES[e % len(RESOURCES)]
+            path = f"/api/{resource}/{e}/*" if e % 5 == 0 else f"/api/{resource}/{e}"
+            eps.append({"method": rng.choice(("GET", "POST", "PUT", "DELETE", "*")), "path": path, "discovered": True})
+        data[f"app-{a}"] = {"endpoints": eps, "version": "20250101000000"}
+    return data
+
+
+def discovery_document(rng: random.Random, app_id: str, n_endpoints: int, fields_per_endpoint: int) -> Dict[str, Any]:
+    """A ``/discovery`` response (``DiscoveryResponse`` shape) with nested field metadata."""
+    def fields(n: int, depth: int) -> Dict[str, Any]:
+        out = {}
+        for i in range(n):
+            if depth and i % 8 == 7:
+                out[f"f{i}"] = {"type": "object", "fields": fields(4, depth - 1)}
+            elif depth and i % 8 == 6:
+                out[f"f{i}"] = {"type": "array", "items": {"type": "object", "fields": fields(3, 0)}}
+            else:
+                out[f"f{i}"] = {"type": "string", "sensitive": rng.random() < 0.1, "pii": rng.random() < 0.1,
+                                "phi": rng.random() < 0.05, "description": f"field {i}"}
+        return out
+
+    eps = []
+    for e in range(n_endpoints):
+        resource = RESOURCES[e % len(RESOURCES)]
+        method = ("GET", "POST", "PUT")[e % 3]
+        path = f"/api/{resource}_{e // len(RESOURCES)}" + ("/{id}" if e % 2 else "")
+        key = "response_fields" if method == "GET" else "request_fields"
+        eps.append({"method": method, "path": path, "operation_id": f"op_{e}", "description": f"endpoint {e}",
+                    key: fields(fields_per_endpoint, 2)})
+    return {"version": "2.0", "app_id": app_id, "app_name": f"Synthetic {app_id}", "endpoints": eps}
+
+
+def role_rls_filters(rng: random.Random, n_roles: int, n_resources: int, fields_per_resource: int) -> List[Dict[str, Dict[str, List[Dict[str, Any]]]]]:
+    """Per-role ``{resource: {field: [filters]}}`` with overlapping resources/fields."""
+    roles = []
+    for r in range(n_roles):
+        rls: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        for res in rng.sample(range(n_resources * 2), k=n_resources):
+            rls[f"resource_{res}"] = {
+                f"field_{f}": [{"id": f"{r}-{res}-{f}", "filter_condition": f"field_{f} = '{word(rng, 4)}'"}]
+                for f in rng.sample(range(fields_per_resource * 2), k=fields_per_resource)
+            }
+        roles.append(rls)
+    return roles
+
+
+def split_scale(scale: int, parts: int) -> Tuple[int, int]:
+    """Split ``scale`` items into ``(outer, inner)`` with ``outer * inner ~= scale``."""
+    outer = max(1, min(parts, scale))
+    return outer, max(1, scale // outer)
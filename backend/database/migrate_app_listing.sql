@@ -0,0 +1,26 @@
+-- Migration script for the registered apps listing
+-- Indexes behind DatabaseService.APPS_LISTING_QUERY: latest discovery per app
+-- (DISTINCT ON), grouped role counts and keyset pagination of the admin list
+-- This script is idempotent and can be run multiple times safely
+
+-- Set search path
+SET search_path TO cids, public;
+
+-- Keyset pagination: ORDER BY created_at DESC, client_id DESC
+CREATE INDEX IF NOT EXISTS idx_registered_apps_created_client
+    ON cids.registered_apps (created_at DESC, client_id DESC);
+
+-- DISTINCT ON (client_id) ... ORDER BY client_id, discovery_version::int DESC
+CREATE INDEX IF NOT EXISTS idx_discovery_history_client_version
+    ON cids.discovery_history (client_id, (discovery_version::int) DESC, discovery_timestamp DESC);
+
+-- Permission counts for the latest discovery of each app
+CREATE INDEX IF NOT EXISTS idx_discovered_permissions_client_discovery
+    ON cids.discovered_permissions (client_id, discovery_id);
+
+CREATE INDEX IF NOT EXISTS idx_field_metadata_discovery_id
+    ON cids.field_metadata (discovery_id);
+
+-- Active role counts per app
+CREATE INDEX IF NOT EXISTS idx_role_metadata_active_client
+    ON cids.role_metadata (client_id) WHERE is_active = true;
@@ -0,0 +1,74 @@
+-- Migration script for dashboard statistics
+-- Keeps activity_log counts in hourly buckets so the dashboard's
+-- "activity in the last 24 hours" reads at most 25 rows instead of scanning activity_log
+-- This script is idempotent and can be run multiple times safely
+
+-- Set search path
+SET search_path TO cids, public;
+
+CREATE TABLE IF NOT EXISTS cids.activity_hourly (
+    bucket TIMESTAMP WITH TIME ZONE PRIMARY KEY, -- date_trunc('hour', activity_log.timestamp)
+    activity_count BIGINT NOT NULL DEFAULT 0
+);
+
+COMMENT ON TABLE cids.activity_hourly IS 'Rows per hour in activity_log, maintained by triggers on activity_log';
+
+-- Statement-level triggers: one upsert per hour touched by a statement, so bulk
+-- inserts (COPY, retention deletes) cost one row update per hour, not per row
+CREATE OR REPLACE FUNCTION cids.activity_hourly_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO cids.activity_hourly (bucket, activity_count)
+    SELECT date_trunc('hour', COALESCE(n.timestamp, CURRENT_TIMESTAMP)), COUNT(*)
+    FROM new_rows n
+    GROUP BY 1
+    ON CONFLICT (bucket) DO UPDATE
+        SET activity_count = cids.activity_hourly.activity_count + EXCLUDED.activity_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION cids.activity_hourly_on_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE cids.activity_hourly h
+    SET activity_count = GREATEST(h.activity_count - d.removed, 0)
+    FROM (
+        SELECT date_trunc('hour', o.timestamp) AS bucket, COUNT(*) AS removed
+        FROM old_rows o
+        WHERE o.timestamp IS NOT NULL
+        GROUP BY 1
+    ) d
+    WHERE h.bucket = d.bucket;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS activity_hourly_insert ON cids.activity_log;
+CREATE TRIGGER activity_hourly_insert
+    AFTER INSERT ON cids.activity_log
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION cids.activity_hourly_on_insert();
+
+DROP TRIGGER IF EXISTS activity_hourly_delete ON cids.activity_log;
+CREATE TRIGGER activity_hourly_delete
+    AFTER DELETE ON cids.activity_log
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION cids.activity_hourly_on_delete();
+
+-- Backfill from existing rows. Taking the lock first keeps concurrent inserts from
+-- being counted twice (once by the trigger, once here)
+BEGIN;
+LOCK TABLE cids.activity_log IN SHARE MODE;
+TRUNCATE cids.activity_hourly;
+INSERT INTO cids.activity_hourly (bucket, activity_count)
+SELECT date_trunc('hour', timestamp), COUNT(*)
+FROM cids.activity_log
+WHERE timestamp IS NOT NULL
+GROUP BY 1;
+COMMIT;
+
+-- Verify
+SELECT COALESCE(SUM(activity_count), 0) AS bucketed,
+       (SELECT COUNT(*) FROM cids.activity_log WHERE timestamp IS NOT NULL) AS activity_log_rows
+FROM cids.activity_hourly;
@@ -0,0 +1,42 @@
+-- Migration script for refresh_tokens table
+-- Adds rotation family and cached user info so refresh tokens survive restarts
+-- This script is idempotent and can be run multiple times safely
+
+-- Set search path
+SET search_path TO cids, public;
+
+DO $$
+BEGIN
+    -- Add family_id if it doesn't exist
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = 'cids' AND table_name = 'refresh_tokens'
+                   AND column_name = 'family_id') THEN
+        ALTER TABLE cids.refresh_tokens ADD COLUMN family_id VARCHAR(64);
+        RAISE NOTICE 'Added family_id column to refresh_tokens table';
+    END IF;
+
+    -- Add user_info if it doesn't exist (user claims without Azure tokens)
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = 'cids' AND table_name = 'refresh_tokens'
+                   AND column_name = 'user_info') THEN
+        ALTER TABLE cids.refresh_tokens ADD COLUMN user_info JSONB;
+        RAISE NOTICE 'Added user_info column to refresh_tokens table';
+    END IF;
+
+    -- Add index on family_id for family revocation
+    IF NOT EXISTS (SELECT 1 FROM pg_indexes
+                   WHERE schemaname = 'cids' AND tablename = 'refresh_tokens'
+                   AND indexname = 'idx_refresh_tokens_family_id') THEN
+        CREATE INDEX idx_refresh_tokens_family_id ON cids.refresh_tokens(family_id);
+        RAISE NOTICE 'Created index idx_refresh_tokens_family_id';
+    END IF;
+
+    -- Add index on user_id for revoke-all-user-tokens
+    IF NOT EXISTS (SELECT 1 FROM pg_indexes
+                   WHERE schemaname = 'cids' AND tablename = 'refresh_tokens'
+                   AND indexname = 'idx_refresh_tokens_user_id') THEN
+        CREATE INDEX idx_refresh_tokens_user_id ON cids.refresh_tokens(user_id);
+        RAISE NOTICE 'Created index idx_refresh_tokens_user_id';
+    END IF;
+
+END $$;
@@ -0,0 +1,15 @@
+-- Migration script for the access-token revocation feed
+-- Stamps revoked_at with the insert time instead of the transaction start time,
+-- so a row committed by a long-open transaction does not land behind a feed
+-- cursor that already moved past its revoked_at
+-- This script is idempotent and can be run multiple times safely
+
+-- Set search path
+SET search_path TO cids, public;
+
+ALTER TABLE cids.revoked_tokens ALTER COLUMN revoked_at SET DEFAULT clock_timestamp();
+
+-- Keyset index for GET /auth/revocations: (revoked_at, token_id) > cursor
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_access_feed
+    ON cids.revoked_tokens (revoked_at, token_id)
+    WHERE token_type = 'access';
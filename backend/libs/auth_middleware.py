@@ -3,29 +3,35 @@ from fastapi import Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional, List
 import httpx
-from authlib.jose import jwt
 import logging
 from functools import wraps
 import os
 
+from libs.jwks_client import JWKSClient, JWKSValidationError
+from libs.revocation_client import RevocationFeedClient
+
 logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
 
 class AuthMiddleware:
-    def __init__(self, auth_service_url: Optional[str] = None, verify_ssl: Optional[bool] = None):
+    def __init__(self, auth_service_url: Optional[str] = None, verify_ssl: Optional[bool] = None, api_key: Optional[str] = None):
         self.auth_service_url = (auth_service_url or os.getenv('CIDS_URL') or "http://localhost:8000").rstrip('/')
         self.verify_ssl = verify_ssl if verify_ssl is not None else (os.getenv('CIDS_VERIFY_SSL', 'false').lower() == 'true')
-        self.public_keys = None
+        # With an API key, revocations are followed from the CIDS delta feed into a local set
+        api_key = api_key or os.getenv('CIDS_API_KEY')
+        self.revocations = RevocationFeedClient(self.auth_service_url, api_key, verify_ssl=self.verify_ssl) if api_key else None
+        # JWTs are verified locally against the CIDS JWKS (refetched on unknown kid)
+        self.jwks_client = JWKSClient(
+            self.auth_service_url,
+            verify_ssl=self.verify_ssl,
+            is_revoked=self.revocations.is_revoked if self.revocations else None,
+        )
 
     async def get_public_keys(self):
-        if not self.public_keys:
-            async with httpx.AsyncClient(verify=self.verify_ssl) as client:
-                response = await client.get(f"{self.auth_service_url}/auth/public-key")
-                response.raise_for_status()
-                self.public_keys = response.json()
-        return self.public_keys
+        await self.jwks_client.arefresh()
+        return self.jwks_client.jwks
 
     async def validate_token(self, token: str) -> dict:
         try:
@@ -45,17 +51,15 @@ class AuthMiddleware:
                         'app_client_id': data.get('app_client_id'),
                         'auth_type': 'api_key',
                     }
-            jwks = await self.get_public_keys()
-            claims = jwt.decode(token, jwks)
-            from datetime import datetime, timezone
-            now = datetime.now(timezone.utc)
-            exp = claims.get('exp')
-            if exp and datetime.fromtimestamp(exp, timezone.utc) < now:
-                raise HTTPException(status_code=401, detail="Token has expired")
+            if self.revocations:
+                self.revocations.ensure_task()
+            claims = await self.jwks_client.avalidate(token)
             claims['auth_type'] = 'jwt'
             return claims
         except HTTPException:
             raise
+        except JWKSValidationError as e:
+            raise HTTPException(status_code=401, detail=str(e))
         except Exception as e:
             logger.error(f"Token validation error: {e}")
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -3,12 +3,12 @@ CIDS Auth Library for Microservices (migrated)
 """
 from typing import Dict, List, Any, Optional, Set, Union, Callable
 from functools import wraps
-import requests
-import jwt
 import logging
-from datetime import datetime
 import os
 
+from libs.jwks_client import JWKSClient, JWKSValidationError
+from libs.revocation_client import RevocationFeedClient
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,33 +25,26 @@ class CIDSTokenError(CIDSAuthError):
 
 
 class CIDSAuth:
-    def __init__(self, cids_url: str, client_id: str, client_secret: Optional[str] = None, verify_ssl: bool = True, cache_public_key: bool = True):
+    def __init__(self, cids_url: str, client_id: str, client_secret: Optional[str] = None, verify_ssl: bool = True, cache_public_key: bool = True, api_key: Optional[str] = None):
         self.cids_url = cids_url.rstrip('/')
         self.client_id = client_id
         self.client_secret = client_secret
         self.verify_ssl = verify_ssl
-        self._public_key = None
-        self._public_key_cached_at = None
         self.cache_public_key = cache_public_key
-        self.cache_duration = 3600
-
-    def _get_public_key(self) -> str:
-        if self.cache_public_key and self._public_key:
-            if (datetime.utcnow().timestamp() - self._public_key_cached_at) < self.cache_duration:
-                return self._public_key
-        try:
-            response = requests.get(f"{self.cids_url}/auth/public-key", verify=self.verify_ssl, timeout=10)
-            response.raise_for_status()
-            key_data = response.json()
-            public_key = key_data.get('public_key')
-            if not public_key:
-                raise CIDSAuthError("No public key returned from CIDS")
-            if self.cache_public_key:
-                self._public_key = public_key
-                self._public_key_cached_at = datetime.utcnow().timestamp()
-            return public_key
-        except requests.RequestException as e:
-            raise CIDSAuthError(f"Failed to fetch public key from CIDS: {e}")
+        # With an API key, a background thread follows the CIDS revocation feed into a local set
+        self._revocations = None
+        if api_key:
+            self._revocations = RevocationFeedClient(self.cids_url, api_key, verify_ssl=verify_ssl)
+            self._revocations.start_thread()
+        # Signing keys come from the CIDS JWKS; without caching every validation refetches it
+        self._jwks = JWKSClient(
+            self.cids_url,
+            verify_ssl=verify_ssl,
+            audiences=[client_id, 'internal-services'],
+            default_max_age=300 if cache_public_key else 0,
+            min_refetch_interval=30 if cache_public_key else 0,
+            is_revoked=self._revocations.is_revoked if self._revocations else None,
+        )
 
     def validate_token(self, token: str) -> Dict[str, Any]:
         if not token:
@@ -59,8 +52,7 @@ class CIDSAuth:
         if token.startswith('Bearer '):
             token = token[7:]
         try:
-            public_key = self._get_public_key()
-            claims = jwt.decode(token, public_key, algorithms=['RS256'], audience=[self.client_id, 'internal-services'])
+            claims = self._jwks.validate(token)
             all_permissions = claims.get('permissions', {})
             app_permissions = all_permissions.get(self.client_id, [])
             return {
@@ -72,10 +64,8 @@ class CIDSAuth:
                 'permissions': app_permissions,
                 'claims': claims
             }
-        except jwt.ExpiredSignatureError:
-            raise CIDSTokenError("Token has expired")
-        except jwt.InvalidTokenError as e:
-            raise CIDSTokenError(f"Invalid token: {e}")
+        except JWKSValidationError as e:
+            raise CIDSTokenError(str(e))
         except Exception as e:
             raise CIDSTokenError(f"Token validation failed: {e}")
 
@@ -183,5 +173,6 @@ def from_env() -> CIDSAuth:
         raise ValueError("CIDS_CLIENT_ID environment variable not set")
     client_secret = os.getenv('CIDS_CLIENT_SECRET')
     verify_ssl = os.getenv('CIDS_VERIFY_SSL', 'true').lower() == 'true'
-    return CIDSAuth(cids_url=cids_url, client_id=client_id, client_secret=client_secret, verify_ssl=verify_ssl)
+    api_key = os.getenv('CIDS_API_KEY')
+    return CIDSAuth(cids_url=cids_url, client_id=client_id, client_secret=client_secret, verify_ssl=verify_ssl, api_key=api_key)
 
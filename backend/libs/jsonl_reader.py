@@ -0,0 +1,75 @@
+"""Reverse-chronological readers for append-only JSONL log files.
+
+Log files are appended in time order, so reading them backwards from the end
+yields the newest records first. Callers can stop after ``limit`` matches and
+only touch the tail of the history instead of parsing every file in full.
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+READ_BLOCK_BYTES = 64 * 1024
+
+
+def iter_lines_reverse(path: Path, end_offset: Optional[int] = None,
+                       block_size: int = READ_BLOCK_BYTES) -> Iterator[bytes]:
+    """Yield non-empty lines of ``path`` from ``end_offset`` (default EOF) backwards."""
+    try:
+        f = path.open("rb")
+    except (FileNotFoundError, IsADirectoryError):
+        return
+    with f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell() if end_offset is None else min(end_offset, f.tell())
+        tail = b""
+        while pos > 0:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            chunk = f.read(read_size) + tail
+            lines = chunk.split(b"\n")
+            # The first piece may be the end of a line that starts in an earlier block
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
+
+
+def iter_jsonl_reverse(paths: Iterable[Path]) -> Iterator[Dict[str, Any]]:
+    """Parsed records from ``paths`` (newest file first), each file read from its end.
+
+    Unparseable lines are skipped. Files are opened lazily, so a consumer that
+    stops early never touches older files.
+    """
+    for path in paths:
+        for raw in iter_lines_reverse(path):
+            try:
+                yield json.loads(raw)
+            except Exception:
+                continue
+
+
+def daily_files(directory: Path, prefix: str, start: Optional[date] = None,
+                end: Optional[date] = None) -> List[Path]:
+    """``<prefix>YYYY-MM-DD.jsonl`` files in ``directory``, newest day first, limited to [start, end]."""
+    if not directory.exists():
+        return []
+    files = []
+    for p in directory.glob(f"{prefix}*.jsonl"):
+        try:
+            day = date.fromisoformat(p.stem[len(prefix):])
+        except ValueError:
+            continue
+        if start and day < start:
+            continue
+        if end and day > end:
+            continue
+        files.append((day, p))
+    files.sort(reverse=True)
+    return [p for _, p in files]
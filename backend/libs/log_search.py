@@ -0,0 +1,355 @@
+"""Full-text inverted index for the JSON application log.
+
+Each segment gets a term index mapping tokens of the log message and of selected
+structured fields to the byte offsets of the lines that contain them. Rotated
+segments persist it as a ``<segment>.terms`` sidecar, built on rollover or on
+first search; the active file is indexed incrementally by tailing it from the
+last indexed offset whenever a search runs. Searches intersect postings, verify
+phrases on the candidate lines only and page newest-first with an opaque cursor.
+"""
+from __future__ import annotations
+
+import base64
+import bisect
+import json
+import os
+import re
+import threading
+from array import array
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from libs.log_store import (
+    ORDER_SLACK,
+    ROLLOVER_INDEXERS,
+    SIDECAR_SUFFIXES,
+    AppLogStore,
+    parse_log_ts,
+    sidecar_path,
+)
+
+TERMS_SUFFIX = ".terms"
+TERMS_VERSION = 1
+MAX_TOKEN_LENGTH = 64
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+# Structured fields (as written by JSONFormatter) that are indexed, and the
+# names accepted for them in ``field:value`` queries
+INDEXED_FIELDS = ("logger", "user.email", "request.id", "url.path")
+FIELD_ALIASES = {
+    "logger": "logger",
+    "user.email": "user.email",
+    "user_email": "user.email",
+    "request.id": "request.id",
+    "request_id": "request.id",
+    "url.path": "url.path",
+    "url_path": "url.path",
+}
+
+_cache: Dict[str, "TermIndex"] = {}
+_active: Dict[str, "TermIndex"] = {}
+_lock = threading.Lock()
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) <= MAX_TOKEN_LENGTH]
+
+
+def _record_terms(obj: Dict[str, Any]) -> Set[str]:
+    terms = set(tokenize(str(obj.get("message", ""))))
+    for field in INDEXED_FIELDS:
+        value = obj.get(field)
+        if value is None:
+            continue
+        value = str(value).lower()
+        terms.add(f"{field}:{value}")
+        terms.update(tokenize(value))
+    return terms
+
+
+def _searchable_text(obj: Dict[str, Any]) -> List[str]:
+    return [str(obj.get("message", "")).lower()] + [
+        str(obj[field]).lower() for field in INDEXED_FIELDS if obj.get(field) is not None
+    ]
+
+
+def parse_query(q: str) -> Tuple[List[str], List[str]]:
+    """Split a search box query into index terms and phrases to verify.
+
+    ``"quoted text"`` is a phrase, ``field:value`` an exact match on an indexed
+    field, and anything else a term. Terms that tokenize into several tokens
+    (``alice@example.com``) are matched as phrases.
+    """
+    terms: List[str] = []
+    phrases: List[str] = []
+    for quoted, word in _QUERY.findall(q or ""):
+        if word and ":" in word:
+            field, _, value = word.partition(":")
+            name = FIELD_ALIASES.get(field.lower())
+            if name and value:
+                terms.append(f"{name}:{value.lower()}")
+                continue
+        text = quoted or word
+        tokens = tokenize(text)
+        terms.extend(tokens)
+        if len(tokens) > 1:
+            phrases.append(text.lower())
+    return terms, phrases
+
+
+def encode_cursor(identity: str, offset: int) -> str:
+    raw = json.dumps([identity, offset]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    if not cursor:
+        return None
+    try:
+        identity, offset = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(identity), int(offset)
+    except Exception:
+        raise ValueError("Invalid log search cursor")
+
+
+def _compare_identity(a: str, b: str) -> int:
+    """Order two segments by the timestamp of their first record."""
+    ta, tb = parse_log_ts(a), parse_log_ts(b)
+    if ta is not None and tb is not None:
+        return (ta > tb) - (ta < tb)
+    return (a > b) - (a < b)
+
+
+class TermIndex:
+    def __init__(self):
+        # Timestamp of the segment's first record; stays the same when the segment is renamed
+        self.identity: Optional[str] = None
+        self.size = 0
+        self.mtime_ns = 0
+        self.postings: Dict[str, array] = {}
+
+    def add(self, offset: int, obj: Dict[str, Any]):
+        if self.identity is None:
+            self.identity = obj.get("timestamp")
+        for term in _record_terms(obj):
+            plist = self.postings.get(term)
+            if plist is None:
+                plist = self.postings[term] = array("Q")
+            plist.append(offset)
+
+    def scan(self, segment: Path):
+        """Index the complete lines appended since the last scan."""
+        with segment.open("rb") as f:
+            f.seek(self.size)
+            offset = self.size
+            while True:
+                raw = f.readline()
+                if not raw.endswith(b"\n"):
+                    # EOF, or a line that is still being written
+                    break
+                line_offset = offset
+                offset += len(raw)
+                if not raw.strip():
+                    continue
+                try:
+                    obj = json.loads(raw)
+                except Exception:
+                    continue
+                self.add(line_offset, obj)
+            self.size = offset
+
+    def lookup(self, terms: List[str]) -> List[int]:
+        """Offsets of lines containing every term, ascending."""
+        lists = []
+        for term in set(terms):
+            plist = self.postings.get(term)
+            if not plist:
+                return []
+            lists.append(plist)
+        lists.sort(key=len)
+        result = list(lists[0])
+        for plist in lists[1:]:
+            result = [o for o in result if _contains(plist, o)]
+            if not result:
+                break
+        return result
+
+    def to_json(self) -> Dict[str, Any]:
+        # Offsets are ascending, so store deltas to keep the sidecar small
+        postings = {}
+        for term, plist in self.postings.items():
+            prev = 0
+            deltas = []
+            for offset in plist:
+                deltas.append(offset - prev)
+                prev = offset
+            postings[term] = deltas
+        return {
+            "version": TERMS_VERSION,
+            "identity": self.identity,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "postings": postings,
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "TermIndex":
+        index = cls()
+        index.identity = data.get("identity")
+        index.size = data["size"]
+        index.mtime_ns = data["mtime_ns"]
+        index.postings = {term: array("Q", accumulate(deltas)) for term, deltas in data["postings"].items()}
+        return index
+
+
+def _contains(plist: array, offset: int) -> bool:
+    i = bisect.bisect_left(plist, offset)
+    return i < len(plist) and plist[i] == offset
+
+
+def _is_current(index: Optional[TermIndex], stat: os.stat_result) -> bool:
+    return index is not None and index.size == stat.st_size and index.mtime_ns == stat.st_mtime_ns
+
+
+def write_term_index(segment: Path) -> Optional[TermIndex]:
+    """Build and persist the term sidecar for a rotated segment."""
+    try:
+        stat = segment.stat()
+        index = TermIndex()
+        index.scan(segment)
+    except FileNotFoundError:
+        return None
+    index.mtime_ns = stat.st_mtime_ns
+    target = sidecar_path(segment, TERMS_SUFFIX)
+    tmp = target.with_name(target.name + ".tmp")
+    try:
+        with tmp.open("w") as f:
+            json.dump(index.to_json(), f)
+        os.replace(tmp, target)
+    except Exception:
+        # A missing sidecar only costs a rebuild on the next search
+        pass
+    with _lock:
+        _cache[str(segment)] = index
+    return index
+
+
+def load_term_index(segment: Path) -> Optional[TermIndex]:
+    """Term index for a rotated segment, rebuilt when stale or missing."""
+    try:
+        stat = segment.stat()
+    except FileNotFoundError:
+        return None
+    key = str(segment)
+    with _lock:
+        index = _cache.get(key)
+    if _is_current(index, stat):
+        return index
+    try:
+        with sidecar_path(segment, TERMS_SUFFIX).open("r") as f:
+            data = json.load(f)
+        index = TermIndex.from_json(data) if data.get("version") == TERMS_VERSION else None
+    except Exception:
+        index = None
+    if _is_current(index, stat):
+        with _lock:
+            _cache[key] = index
+        return index
+    return write_term_index(segment)
+
+
+def _first_timestamp(segment: Path) -> Optional[str]:
+    try:
+        with segment.open("rb") as f:
+            return json.loads(f.readline()).get("timestamp")
+    except Exception:
+        return None
+
+
+def active_term_index(segment: Path) -> Optional[TermIndex]:
+    """In-memory term index for the active file, caught up to its current end."""
+    try:
+        stat = segment.stat()
+    except FileNotFoundError:
+        return None
+    key = str(segment)
+    with _lock:
+        index = _active.get(key)
+        if index is None or stat.st_size < index.size or (index.identity and index.identity != _first_timestamp(segment)):
+            # First search, or the file was rotated since the last one
+            index = _active[key] = TermIndex()
+        if stat.st_size > index.size:
+            index.scan(segment)
+        return index
+
+
+def search(
+    store: AppLogStore,
+    q: str,
+    start=None,
+    end=None,
+    levels: Optional[List[str]] = None,
+    logger_prefix: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Term/phrase search over the log store, newest first.
+
+    Returns ``{"items": [...], "next_cursor": str | None}``; pass ``next_cursor``
+    back to continue after the last returned record.
+    """
+    terms, phrases = parse_query(q)
+    if not terms:
+        # Nothing indexable (e.g. only punctuation): fall back to a substring scan
+        return {"items": store.query(start, end, levels, logger_prefix, q, limit), "next_cursor": None}
+    after = decode_cursor(cursor)
+    level_set = set(l.upper() for l in (levels or []))
+    items: List[Dict[str, Any]] = []
+
+    for segment, seg_index in store.candidate_segments(start, end, level_set, logger_prefix):
+        index = active_term_index(segment) if seg_index is None else load_term_index(segment)
+        if index is None or index.identity is None:
+            continue
+        offsets = index.lookup(terms)
+        if after is not None:
+            order = _compare_identity(index.identity, after[0])
+            if order > 0:
+                # Newer than the page we stopped on
+                continue
+            if order == 0:
+                offsets = offsets[:bisect.bisect_left(offsets, after[1])]
+        if not offsets:
+            continue
+        with segment.open("rb") as f:
+            for offset in reversed(offsets):
+                f.seek(offset)
+                try:
+                    obj = json.loads(f.readline())
+                except Exception:
+                    continue
+                ts = parse_log_ts(obj.get("timestamp", ""))
+                if start and (not ts or ts < start):
+                    if ts and ts < start - ORDER_SLACK:
+                        return {"items": items, "next_cursor": None}
+                    continue
+                if end and (not ts or ts > end):
+                    continue
+                if level_set and str(obj.get("level", "")).upper() not in level_set:
+                    continue
+                if logger_prefix and not str(obj.get("logger", "")).startswith(logger_prefix):
+                    continue
+                if phrases:
+                    texts = _searchable_text(obj)
+                    if not all(any(p in t for t in texts) for p in phrases):
+                        continue
+                items.append(obj)
+                if len(items) >= limit:
+                    return {"items": items, "next_cursor": encode_cursor(index.identity, offset)}
+    return {"items": items, "next_cursor": None}
+
+
+SIDECAR_SUFFIXES.append(TERMS_SUFFIX)
+ROLLOVER_INDEXERS.append(write_term_index)
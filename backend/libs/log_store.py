@@ -0,0 +1,292 @@
+"""Indexed segment store for the rotated JSON application log.
+
+Every rotated segment (``app.log.1`` .. ``app.log.N``) gets a sidecar
+``<segment>.idx`` with its time range, per-level counts, logger names and sparse
+``(timestamp, byte offset)`` checkpoints. Queries use the sidecars to skip
+segments that cannot match, seek close to the end of the requested window and
+read lines newest-first from there, stopping as soon as enough rows are found.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from libs.jsonl_reader import iter_lines_reverse
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+# One checkpoint per this many bytes of segment data
+CHECKPOINT_BYTES = 256 * 1024
+
+# Records from concurrent threads can hit the file slightly out of timestamp order
+ORDER_SLACK = timedelta(seconds=1)
+
+_index_cache: Dict[str, Dict[str, Any]] = {}
+_index_lock = threading.Lock()
+
+
+def parse_log_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        # Support subsecond and whole second
+        if value.endswith("Z") and "." not in value:
+            return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ")
+    except Exception:
+        return None
+
+
+def sidecar_path(segment: Path, suffix: str = INDEX_SUFFIX) -> Path:
+    return segment.with_name(segment.name + suffix)
+
+
+def build_segment_index(segment: Path) -> Dict[str, Any]:
+    """Scan a segment once and describe it for query planning."""
+    stat = segment.stat()
+    first_ts: Optional[datetime] = None
+    last_ts: Optional[datetime] = None
+    levels: Dict[str, int] = {}
+    loggers = set()
+    checkpoints: List[List[Any]] = []
+    next_checkpoint = 0
+    offset = 0
+    count = 0
+    with segment.open("rb") as f:
+        for raw in f:
+            line_offset = offset
+            offset += len(raw)
+            if offset > stat.st_size:
+                # Segment grew while we were scanning; index what the stat covered
+                break
+            if not raw.strip():
+                continue
+            try:
+                obj = json.loads(raw)
+            except Exception:
+                continue
+            ts = parse_log_ts(obj.get("timestamp"))
+            level = str(obj.get("level", "")).upper()
+            levels[level] = levels.get(level, 0) + 1
+            loggers.add(str(obj.get("logger", "")))
+            count += 1
+            if ts is None:
+                continue
+            if first_ts is None or ts < first_ts:
+                first_ts = ts
+            if last_ts is None or ts > last_ts:
+                last_ts = ts
+            if line_offset >= next_checkpoint:
+                checkpoints.append([obj.get("timestamp"), line_offset])
+                next_checkpoint = line_offset + CHECKPOINT_BYTES
+    return {
+        "version": INDEX_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "count": count,
+        "first_ts": first_ts.isoformat() if first_ts else None,
+        "last_ts": last_ts.isoformat() if last_ts else None,
+        "levels": levels,
+        "loggers": sorted(loggers),
+        "checkpoints": checkpoints,
+    }
+
+
+def write_segment_index(segment: Path) -> Optional[Dict[str, Any]]:
+    """Build and persist the sidecar for ``segment``; returns the index."""
+    try:
+        index = build_segment_index(segment)
+    except FileNotFoundError:
+        return None
+    target = sidecar_path(segment)
+    tmp = target.with_name(target.name + ".tmp")
+    try:
+        with tmp.open("w") as f:
+            json.dump(index, f)
+        os.replace(tmp, target)
+    except Exception:
+        # A missing sidecar only costs a rebuild on the next query
+        pass
+    with _index_lock:
+        _index_cache[str(segment)] = index
+    return index
+
+
+def _is_current(index: Optional[Dict[str, Any]], stat: os.stat_result) -> bool:
+    return (
+        index is not None
+        and index.get("version") == INDEX_VERSION
+        and index.get("size") == stat.st_size
+        and index.get("mtime_ns") == stat.st_mtime_ns
+    )
+
+
+def load_segment_index(segment: Path) -> Optional[Dict[str, Any]]:
+    """Return the index for a rotated segment, rebuilding it when stale or missing."""
+    try:
+        stat = segment.stat()
+    except FileNotFoundError:
+        return None
+    key = str(segment)
+    with _index_lock:
+        index = _index_cache.get(key)
+    if _is_current(index, stat):
+        return index
+    try:
+        with sidecar_path(segment).open("r") as f:
+            index = json.load(f)
+    except Exception:
+        index = None
+    if _is_current(index, stat):
+        with _index_lock:
+            _index_cache[key] = index
+        return index
+    return write_segment_index(segment)
+
+
+def _window_end_offset(index: Dict[str, Any], end: Optional[datetime]) -> Optional[int]:
+    """Byte offset past which every line in the segment is newer than ``end``."""
+    if end is None:
+        return None
+    for ts_value, offset in index.get("checkpoints", []):
+        ts = parse_log_ts(ts_value)
+        if ts is not None and ts > end + ORDER_SLACK:
+            return offset
+    return None
+
+
+# Sidecars moved along with their segment on rollover, and the builders run for a
+# freshly rotated segment; other indexes (e.g. libs.log_search) register here
+SIDECAR_SUFFIXES: List[str] = [INDEX_SUFFIX]
+ROLLOVER_INDEXERS: List[Callable[[Path], Any]] = [write_segment_index]
+
+
+def _index_rotated_segment(segment: Path) -> None:
+    for indexer in list(ROLLOVER_INDEXERS):
+        try:
+            indexer(segment)
+        except Exception:
+            continue
+
+
+class IndexedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that keeps a sidecar index next to each rotated segment."""
+
+    def doRollover(self):
+        # Shift sidecars the same way the base class shifts segments
+        for suffix in SIDECAR_SUFFIXES:
+            for i in range(self.backupCount - 1, 0, -1):
+                src = sidecar_path(Path(self.rotation_filename(f"{self.baseFilename}.{i}")), suffix)
+                dst = sidecar_path(Path(self.rotation_filename(f"{self.baseFilename}.{i + 1}")), suffix)
+                if src.exists():
+                    if dst.exists():
+                        dst.unlink()
+                    os.replace(src, dst)
+        first = Path(self.rotation_filename(f"{self.baseFilename}.1"))
+        for suffix in SIDECAR_SUFFIXES:
+            if sidecar_path(first, suffix).exists():
+                sidecar_path(first, suffix).unlink()
+        super().doRollover()
+        if self.backupCount > 0 and first.exists():
+            # Index off the logging path; readers rebuild lazily if they get there first
+            threading.Thread(target=_index_rotated_segment, args=(first,), daemon=True).start()
+
+
+class AppLogStore:
+    def __init__(self, path: Path, backup_count: int):
+        self.path = path
+        self.backup_count = backup_count
+
+    def segments(self) -> List[Path]:
+        """Active file followed by rotated backups, newest first."""
+        return [self.path] + [self.path.with_name(f"{self.path.name}.{i}") for i in range(1, self.backup_count + 1)]
+
+    def candidate_segments(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        level_set: Set[str],
+        logger_prefix: Optional[str],
+    ) -> Iterator[Tuple[Path, Optional[Dict[str, Any]]]]:
+        """Segments that may hold matches, newest first, with their sidecar index.
+
+        The active file has no index and is always a candidate.
+        """
+        for i, segment in enumerate(self.segments()):
+            if i == 0:
+                yield segment, None
+                continue
+            index = load_segment_index(segment)
+            if not index or not index.get("count"):
+                continue
+            first_ts = datetime.fromisoformat(index["first_ts"]) if index.get("first_ts") else None
+            last_ts = datetime.fromisoformat(index["last_ts"]) if index.get("last_ts") else None
+            if start and last_ts and last_ts < start:
+                # Older segments only go further back in time
+                return
+            if end and first_ts and first_ts > end:
+                continue
+            if level_set and not any(index["levels"].get(l) for l in level_set):
+                continue
+            if logger_prefix and not any(name.startswith(logger_prefix) for name in index["loggers"]):
+                continue
+            yield segment, index
+
+    def query(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        levels: Optional[List[str]] = None,
+        logger_prefix: Optional[str] = None,
+        q: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` matching records, newest first."""
+        level_set = set(l.upper() for l in (levels or []))
+        q_lower = (q or "").lower()
+        # Match the raw line when the query looks the same JSON-encoded, skipping the parse for misses
+        q_raw = q_lower if json.dumps(q_lower, ensure_ascii=False)[1:-1] == q_lower else ""
+        items: List[Dict[str, Any]] = []
+
+        for segment, index in self.candidate_segments(start, end, level_set, logger_prefix):
+            end_offset = _window_end_offset(index, end) if index else None
+            for raw in iter_lines_reverse(segment, end_offset):
+                try:
+                    line = raw.decode("utf-8")
+                except UnicodeDecodeError:
+                    continue
+                if q_raw and q_raw not in line.lower():
+                    continue
+                try:
+                    obj = json.loads(line)
+                except Exception:
+                    continue
+                ts = parse_log_ts(obj.get("timestamp", ""))
+                if start and (not ts or ts < start):
+                    if ts and ts < start - ORDER_SLACK:
+                        return self._ordered(items)
+                    continue
+                if end and (not ts or ts > end):
+                    continue
+                if level_set and str(obj.get("level", "")).upper() not in level_set:
+                    continue
+                if logger_prefix and not str(obj.get("logger", "")).startswith(logger_prefix):
+                    continue
+                if q_lower and not q_raw and q_lower not in str(obj.get("message", "")).lower():
+                    continue
+                items.append(obj)
+                if len(items) >= limit:
+                    return self._ordered(items)
+        return self._ordered(items)
+
+    @staticmethod
+    def _ordered(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Lines come back newest-first already; this only fixes small cross-thread skew
+        items.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        return items
@@ -3,15 +3,22 @@ Sets up application logging (JSON + rotation) and exposes runtime-config APIs.
 """
 from __future__ import annotations
 
+import atexit
+import copy
 import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Any, Dict, Optional
-from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
 from utils.paths import logs_path, config_path
+from libs.log_store import IndexedRotatingFileHandler
 
 
 DEFAULT_CONFIG: Dict[str, Any] = {
@@ -25,6 +32,10 @@ DEFAULT_CONFIG: Dict[str, Any] = {
             "rotation": {"max_bytes": 20_000_000, "backup_count": 10},
         },
         "module_levels": {"httpx": "WARNING", "uvicorn": "WARNING"},
+        # Bounded hand-off queue between request threads and the log writer
+        "queue_size": 10_000,
+        # Records/second below WARNING per logger (and its children)
+        "rate_limits": {"services.discovery_db": 20},
     },
     "audit": {
         "enabled": True,
@@ -36,11 +47,25 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         "persist_to_disk": True,
         "path": str(logs_path("token_activity")),
         "retention_days": 60,
+        "flush_interval_seconds": 1.0,
+        "max_batch": 500,
+        "fsync_interval_seconds": 30,
     },
     "access": {
         "enabled": True,
         "path": str(logs_path("access")),
         "retention_days": 30,
+        # Fraction of requests logged, overridable per path prefix, e.g.
+        # {"/auth/validate": 0.1, "/docs": false}; 5xx responses are always logged
+        "sample_rate": 1.0,
+        "routes": {},
+        "always_log_errors": True,
+    },
+    "slow_query": {
+        "enabled": True,
+        "threshold_ms": 200,
+        # Append the statement's plan (EXPLAIN, not ANALYZE) to slow SELECTs
+        "explain": False,
     },
     "privacy": {
         "redact_auth_headers": True,
@@ -49,60 +74,248 @@ DEFAULT_CONFIG: Dict[str, Any] = {
 }
 
 _CONFIG_FILE = config_path("logging.json")
-_CURRENT_CONFIG: Dict[str, Any] = {}
+
+
+# Record attributes passed via `extra` that JSONFormatter emits (underscores become dots)
+EXTRA_KEYS = (
+    "request_id",
+    "trace_id",
+    "span_id",
+    "user_email",
+    "http_request_method",
+    "http_response_status_code",
+    "url_path",
+    "duration_ms",
+    "source_ip",
+    "user_agent_original",
+    "event_category",
+)
+
+
+_EXTRA_FIELDS = tuple((key, key.replace("_", ".")) for key in EXTRA_KEYS)
 
 
 class JSONFormatter(logging.Formatter):
+    """One JSON object per record.
+
+    The serialised line is cached on the record, so the file and stdout
+    handlers share a single ``json.dumps`` per record.
+    """
+
     def __init__(self, service_name: str = "cids-backend"):
         super().__init__()
         self.service_name = service_name
+        self._cache_attr = f"_json_{service_name}"
 
     def format(self, record: logging.LogRecord) -> str:
+        cached = record.__dict__.get(self._cache_attr)
+        if cached is not None:
+            return cached
+        created = record.created
         payload: Dict[str, Any] = {
-            "timestamp": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(created)) + ".%06dZ" % int((created % 1) * 1_000_000),
             "level": record.levelname,
             "logger": record.name,
             "service.name": self.service_name,
             "message": record.getMessage(),
         }
         # Attach extras if present
-        extra_keys = (
-            "request_id",
-            "trace_id",
-            "span_id",
-            "user_email",
-            "http_request_method",
-            "http_response_status_code",
-            "url_path",
-            "duration_ms",
-            "source_ip",
-            "user_agent_original",
-            "event_category",
-        )
-        for key in extra_keys:
-            val = getattr(record, key, None)
+        attrs = record.__dict__
+        for key, name in _EXTRA_FIELDS:
+            val = attrs.get(key)
             if val is not None:
-                payload[key.replace("_", ".")] = val
+                payload[name] = val
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        line = json.dumps(payload, ensure_ascii=False, default=str)
+        attrs[self._cache_attr] = line
+        return line
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler over a bounded queue that drops (and counts) records when full.
+
+    Only cheap work happens on the calling thread: the message is rendered
+    once and the traceback captured; JSON encoding and I/O run on the listener.
+    """
+
+    def __init__(self, capacity: int):
+        super().__init__(queue.Queue(maxsize=capacity))
+        self.capacity = capacity
+        self.dropped: Dict[str, int] = {}
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
         if record.exc_info:
-            payload["exception"] = self.formatException(record.exc_info)
-        return json.dumps(payload, ensure_ascii=False)
+            record.exc_text = _TRACEBACK_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+
+
+class RateLimitFilter(logging.Filter):
+    """Per-logger token bucket for records below WARNING.
+
+    ``limits`` maps a logger name (and its children) to records per second;
+    the burst allowance is twice the rate.
+    """
+
+    def __init__(self, limits: Dict[str, float]):
+        super().__init__()
+        self.limits = {name: float(rate) for name, rate in (limits or {}).items() if float(rate) > 0}
+        self.suppressed: Dict[str, int] = {}
+        self._buckets: Dict[str, List[float]] = {}
+        self._resolved: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def _limit_for(self, logger_name: str) -> Optional[str]:
+        try:
+            return self._resolved[logger_name]
+        except KeyError:
+            pass
+        match = None
+        for name in self.limits:
+            if logger_name == name or logger_name.startswith(name + "."):
+                if match is None or len(name) > len(match):
+                    match = name
+        self._resolved[logger_name] = match
+        return match
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.limits or record.levelno >= logging.WARNING:
+            return True
+        name = self._limit_for(record.name)
+        if name is None:
+            return True
+        rate = self.limits[name]
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(name, [rate * 2, now])
+            bucket[0] = min(rate * 2, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+            self.suppressed[name] = self.suppressed.get(name, 0) + 1
+            return False
+
+
+_TRACEBACK_FORMATTER = logging.Formatter()
+_QUEUE_HANDLER: Optional[DroppingQueueHandler] = None
+_LISTENER: Optional[QueueListener] = None
+_RATE_LIMITER: Optional[RateLimitFilter] = None
+
+
+def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
 
 
 def _load_config_from_disk() -> Dict[str, Any]:
+    # The saved file overrides DEFAULT_CONFIG key by key, so settings added
+    # after it was written (e.g. app.rate_limits) still take effect. A rate
+    # limit is turned off by setting its rate to 0, not by removing it.
     try:
         if Path(_CONFIG_FILE).exists():
             with open(_CONFIG_FILE, "r") as f:
                 data = json.load(f)
-                return data
+                return _deep_merge(DEFAULT_CONFIG, data)
     except Exception:
         # Fall back to defaults on any error
         pass
-    return DEFAULT_CONFIG.copy()
+    return copy.deepcopy(DEFAULT_CONFIG)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+@dataclass(frozen=True)
+class AccessLogSettings:
+    enabled: bool = True
+    sample_rate: float = 1.0
+    # (path prefix, sample rate) longest prefix first; rate 0 disables the route
+    routes: Tuple[Tuple[str, float], ...] = ()
+    always_log_errors: bool = True
+
+    @classmethod
+    def from_config(cls, access: Mapping[str, Any]) -> "AccessLogSettings":
+        routes = []
+        for prefix, value in (access.get("routes") or {}).items():
+            # true/false enable or disable a route, a number sets its sample rate
+            rate = (1.0 if value else 0.0) if isinstance(value, bool) else float(value)
+            routes.append((prefix, min(max(rate, 0.0), 1.0)))
+        routes.sort(key=lambda r: len(r[0]), reverse=True)
+        return cls(
+            enabled=bool(access.get("enabled", True)),
+            sample_rate=min(max(float(access.get("sample_rate", 1.0)), 0.0), 1.0),
+            routes=tuple(routes),
+            always_log_errors=bool(access.get("always_log_errors", True)),
+        )
+
+    def rate_for(self, path: str) -> float:
+        for prefix, rate in self.routes:
+            if path.startswith(prefix):
+                return rate
+        return self.sample_rate
+
+
+@dataclass(frozen=True)
+class LoggingConfigSnapshot:
+    """Immutable view of the logging config.
+
+    ``update_logging_config`` builds a new snapshot and rebinds ``SNAPSHOT`` in
+    one step, so readers never see a half-applied update and need no copy.
+    """
+    data: Mapping[str, Any]
+    access: AccessLogSettings
+
+    @classmethod
+    def from_dict(cls, cfg: Dict[str, Any]) -> "LoggingConfigSnapshot":
+        data = _freeze(cfg)
+        return cls(data=data, access=AccessLogSettings.from_config(data.get("access", {})))
+
+    def section(self, name: str) -> Mapping[str, Any]:
+        return self.data.get(name) or MappingProxyType({})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return _thaw(self.data)
+
+
+# Current config; hot paths read `logging_config.SNAPSHOT` directly
+SNAPSHOT: LoggingConfigSnapshot = LoggingConfigSnapshot.from_dict(DEFAULT_CONFIG)
+_UPDATE_LOCK = threading.Lock()
 
 
 def get_logging_config() -> Dict[str, Any]:
     # Return a copy to avoid external mutation
-    return json.loads(json.dumps(_CURRENT_CONFIG))
+    return SNAPSHOT.to_dict()
 
 
 def _ensure_dirs(cfg: Dict[str, Any]) -> None:
@@ -120,7 +333,22 @@ def _ensure_dirs(cfg: Dict[str, Any]) -> None:
         pass
 
 
+def _stop_listener() -> None:
+    global _LISTENER
+    if _LISTENER is None:
+        return
+    # Drains what is queued, then closes the old file handle
+    _LISTENER.stop()
+    for h in _LISTENER.handlers:
+        try:
+            h.close()
+        except Exception:
+            pass
+    _LISTENER = None
+
+
 def _apply_logging_config(cfg: Dict[str, Any]) -> None:
+    global _QUEUE_HANDLER, _LISTENER, _RATE_LIMITER
     _ensure_dirs(cfg)
 
     # Root logger
@@ -128,6 +356,7 @@ def _apply_logging_config(cfg: Dict[str, Any]) -> None:
     # Remove existing non-uvicorn handlers to avoid dupes
     for h in list(root.handlers):
         root.removeHandler(h)
+    _stop_listener()
 
     level = getattr(logging, str(cfg["app"]["level"]).upper(), logging.INFO)
     root.setLevel(level)
@@ -138,54 +367,87 @@ def _apply_logging_config(cfg: Dict[str, Any]) -> None:
     else:
         formatter = logging.Formatter(fmt="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
+    handlers: List[logging.Handler] = []
+
     # File handler
     file_cfg = cfg["app"].get("file", {})
     if file_cfg.get("enabled", True) and file_cfg.get("path"):
         max_bytes = int(file_cfg.get("rotation", {}).get("max_bytes", 20_000_000))
         backups = int(file_cfg.get("rotation", {}).get("backup_count", 10))
-        fh = RotatingFileHandler(file_cfg["path"], maxBytes=max_bytes, backupCount=backups)
+        fh = IndexedRotatingFileHandler(file_cfg["path"], maxBytes=max_bytes, backupCount=backups)
         fh.setLevel(level)
         fh.setFormatter(formatter)
-        root.addHandler(fh)
+        handlers.append(fh)
 
     # Stdout handler
     if cfg["app"].get("stdout", True):
         sh = logging.StreamHandler()
         sh.setLevel(level)
         sh.setFormatter(formatter)
-        root.addHandler(sh)
+        handlers.append(sh)
+
+    # Callers only enqueue; a listener thread formats and writes
+    qh = DroppingQueueHandler(int(cfg["app"].get("queue_size", 10_000)))
+    qh.setLevel(level)
+    rate_limiter = RateLimitFilter(cfg["app"].get("rate_limits", {}))
+    qh.addFilter(rate_limiter)
+    if _QUEUE_HANDLER is not None:
+        # Keep counting across reconfigurations
+        qh.dropped = _QUEUE_HANDLER.dropped
+        rate_limiter.suppressed = _RATE_LIMITER.suppressed
+    listener = QueueListener(qh.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    root.addHandler(qh)
+    _QUEUE_HANDLER, _LISTENER, _RATE_LIMITER = qh, listener, rate_limiter
 
     # Module-specific levels
     for module_name, lvl in cfg["app"].get("module_levels", {}).items():
         logging.getLogger(module_name).setLevel(getattr(logging, lvl.upper(), logging.INFO))
 
 
+def get_logging_stats() -> Dict[str, Any]:
+    """Queue depth plus records dropped on a full queue and suppressed by rate limits."""
+    qh, rl = _QUEUE_HANDLER, _RATE_LIMITER
+    return {
+        "queue_depth": qh.queue.qsize() if qh else 0,
+        "queue_capacity": qh.capacity if qh else 0,
+        "dropped": dict(qh.dropped) if qh else {},
+        "rate_limited": dict(rl.suppressed) if rl else {},
+    }
+
+
+atexit.register(_stop_listener)
+
+
 def setup_logging(initial_config: Optional[Dict[str, Any]] = None) -> None:
-    global _CURRENT_CONFIG
+    global SNAPSHOT
     cfg = initial_config or _load_config_from_disk()
-    _CURRENT_CONFIG = cfg
-    _apply_logging_config(cfg)
+    with _UPDATE_LOCK:
+        snapshot = LoggingConfigSnapshot.from_dict(cfg)
+        _apply_logging_config(cfg)
+        SNAPSHOT = snapshot
 
 
 def update_logging_config(patch: Dict[str, Any]) -> Dict[str, Any]:
     """Shallow-merge update to logging config and apply at runtime."""
-    global _CURRENT_CONFIG
-    cfg = get_logging_config()
-    # Shallow merge (nested dicts handled one level deep for our needs)
-    for k, v in patch.items():
-        if isinstance(v, dict) and isinstance(cfg.get(k), dict):
-            cfg[k].update(v)
-        else:
-            cfg[k] = v
-    _CURRENT_CONFIG = cfg
-    # Persist to disk
-    try:
-        Path(_CONFIG_FILE).parent.mkdir(parents=True, exist_ok=True)
-        with open(_CONFIG_FILE, "w") as f:
-            json.dump(cfg, f, indent=2)
-    except Exception:
-        pass
-    # Apply live
-    _apply_logging_config(cfg)
-    return get_logging_config()
-
+    global SNAPSHOT
+    with _UPDATE_LOCK:
+        cfg = SNAPSHOT.to_dict()
+        # Shallow merge (nested dicts handled one level deep for our needs)
+        for k, v in patch.items():
+            if isinstance(v, dict) and isinstance(cfg.get(k), dict):
+                cfg[k].update(v)
+            else:
+                cfg[k] = v
+        snapshot = LoggingConfigSnapshot.from_dict(cfg)
+        # Persist to disk
+        try:
+            Path(_CONFIG_FILE).parent.mkdir(parents=True, exist_ok=True)
+            with open(_CONFIG_FILE, "w") as f:
+                json.dump(cfg, f, indent=2)
+        except Exception:
+            pass
+        # Apply live, then publish
+        _apply_logging_config(cfg)
+        SNAPSHOT = snapshot
+    return snapshot.to_dict()
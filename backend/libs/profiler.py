@@ -0,0 +1,196 @@
+"""In-process sampling profiler and allocation snapshots (stdlib only).
+
+``sample_stacks`` runs a timer thread that reads every other thread's current
+frame through ``sys._current_frames()`` at a fixed interval. This costs nothing
+between samples and covers the event loop as well as the threadpool, unlike a
+``SIGPROF`` handler, which only ever sees the main thread. Results render as
+collapsed stacks (flamegraph.pl / speedscope import) or as a speedscope
+``sampled`` profile.
+
+``allocation_diff`` takes two ``tracemalloc`` snapshots ``seconds`` apart and
+reports the top allocators and the biggest growth between them.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+MAX_SECONDS = 60
+MAX_STACK_DEPTH = 128
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+Stack = Tuple[Frame, ...]     # root first
+
+# Leaf frames of threads that are blocked rather than running
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("socket.py", "accept"),
+    ("thread.py", "_worker"),
+}
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _short_path(path: str) -> str:
+    parts = path.replace("\\", "/").split("/")
+    for marker in ("site-packages", "backend", "lib"):
+        if marker in parts:
+            return "/".join(parts[len(parts) - parts[::-1].index(marker):])
+    return "/".join(parts[-2:])
+
+
+def _stack(frame) -> Stack:
+    frames: List[Frame] = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+def _is_idle(stack: Stack) -> bool:
+    if not stack:
+        return True
+    name, filename, _ = stack[-1]
+    return (os.path.basename(filename), name) in _IDLE_LEAVES
+
+
+class StackSamples:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.duration = 0.0
+        self.sample_count = 0
+        # (thread name, stack) -> samples
+        self.counts: Counter = Counter()
+
+    def collapsed(self) -> str:
+        """One ``thread;frame;frame count`` line per distinct stack."""
+        lines = []
+        for (thread, stack), count in self.counts.most_common():
+            names = ";".join(f"{name} ({_short_path(path)}:{line})" for name, path, line in stack)
+            lines.append(f"{thread};{names} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str = "cids") -> Dict[str, Any]:
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[Frame, int] = {}
+        per_thread: Dict[str, Tuple[List[List[int]], List[float]]] = {}
+        for (thread, stack), count in self.counts.items():
+            indexes = []
+            for frame in stack:
+                i = frame_index.get(frame)
+                if i is None:
+                    i = frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": _short_path(frame[1]), "line": frame[2]})
+                indexes.append(i)
+            samples, weights = per_thread.setdefault(thread, ([], []))
+            samples.append(indexes)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "cids-profiler",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(sum(weights), 6),
+                    "samples": samples,
+                    "weights": weights,
+                }
+                for thread, (samples, weights) in sorted(per_thread.items())
+            ],
+        }
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, include_idle: bool = False) -> StackSamples:
+    """Sample all threads for ``seconds``; blocking, so run it off the event loop."""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        seconds = max(0.1, min(float(seconds), MAX_SECONDS))
+        result = StackSamples(interval)
+        me = threading.get_ident()
+        start = time.perf_counter()
+        deadline = start + seconds
+        next_tick = start
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _stack(frame)
+                if include_idle or not _is_idle(stack):
+                    result.counts[(names.get(ident, str(ident)), stack)] += 1
+            result.sample_count += 1
+            # Fixed-rate schedule; a slow sample skips ticks instead of bunching up
+            next_tick += interval
+            if next_tick < now:
+                next_tick = now + interval
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+        result.duration = time.perf_counter() - start
+        return result
+    finally:
+        _busy.release()
+
+
+def _stat_dict(stat) -> Dict[str, Any]:
+    frames = [f"{_short_path(f.filename)}:{f.lineno}" for f in stat.traceback]
+    return {"location": frames[0] if frames else "?", "traceback": frames,
+            "size_kib": round(stat.size / 1024, 1), "count": stat.count}
+
+
+def _diff_dict(stat) -> Dict[str, Any]:
+    entry = _stat_dict(stat)
+    entry.update({"size_diff_kib": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff})
+    return entry
+
+
+def allocation_diff(seconds: float, top: int = 25, nframes: int = 1) -> Dict[str, Any]:
+    """Top allocators now and their growth over ``seconds``; blocking."""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    started_here = not tracemalloc.is_tracing()
+    try:
+        seconds = max(0.1, min(float(seconds), MAX_SECONDS))
+        nframes = max(1, min(int(nframes), 25))
+        key = "traceback" if nframes > 1 else "lineno"
+        if started_here:
+            tracemalloc.start(nframes)
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        before = tracemalloc.take_snapshot().filter_traces(filters)
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot().filter_traces(filters)
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "seconds": seconds,
+            "traced_kib": round(current / 1024, 1),
+            "peak_kib": round(peak / 1024, 1),
+            # Tracing started for this request only sees allocations made after it began
+            "tracing_started_for_request": started_here,
+            "top": [_stat_dict(s) for s in after.statistics(key)[:top]],
+            "growth": [_diff_dict(s) for s in after.compare_to(before, key)[:top] if s.size_diff > 0],
+        }
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _busy.release()
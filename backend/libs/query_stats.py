@@ -0,0 +1,226 @@
+"""SQL fingerprint statistics and slow-query logging for psycopg2.
+
+Connections opened with ``connection_factory=InstrumentedConnection`` hand out
+cursors that time every ``execute``. Statements are grouped by fingerprint (the
+SQL with literals and placeholders replaced by ``?`` and whitespace collapsed),
+and each fingerprint keeps its call count, errors, rows returned and a window of
+recent durations for p50/p99. Statements slower than the ``slow_query``
+threshold of the logging config are logged to ``db.slow_query``, with their
+plan when ``explain`` is on; ``explain()`` produces the plan on demand.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor
+
+from libs import logging_config
+
+logger = logging.getLogger("db.slow_query")
+
+WINDOW = 512
+MAX_FINGERPRINTS = 2000
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_LITERALS = re.compile(r"'(?:[^']|'')*'|%\(\w+\)s|%s|\$\d+|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+_EXPLAINABLE = re.compile(r"^\s*(select|with)\b", re.I)
+
+
+def normalize(sql: str) -> str:
+    text = _COMMENTS.sub(" ", sql)
+    text = _LITERALS.sub("?", text)
+    text = _IN_LIST.sub("(?+)", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+class QueryStats:
+    __slots__ = ("fingerprint", "statement", "count", "errors", "rows", "total", "max",
+                 "durations", "last_sql", "last_params")
+
+    def __init__(self, fingerprint: str, statement: str):
+        self.fingerprint = fingerprint
+        self.statement = statement
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.durations: Deque[float] = deque(maxlen=WINDOW)
+        # Kept for EXPLAIN on demand; never logged
+        self.last_sql: Optional[str] = None
+        self.last_params: Any = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        window = sorted(self.durations)
+
+        def pct(p: float) -> float:
+            return round(window[min(len(window) - 1, int(p * len(window)))] * 1000, 3) if window else 0.0
+
+        return {
+            "fingerprint": self.fingerprint,
+            "statement": self.statement,
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "rows_per_call": round(self.rows / self.count, 2) if self.count else 0.0,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "p50_ms": pct(0.5),
+            "p99_ms": pct(0.99),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class QueryStatsRegistry:
+    def __init__(self):
+        self._stats: Dict[str, QueryStats] = {}
+        # Raw SQL text -> (fingerprint, normalized); statements repeat, so regexes run once each
+        self._fingerprints: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, sql: str) -> Tuple[str, str]:
+        known = self._fingerprints.get(sql)
+        if known is None:
+            statement = normalize(sql)
+            known = (hashlib.sha1(statement.encode("utf-8")).hexdigest()[:16], statement)
+            if len(self._fingerprints) < MAX_FINGERPRINTS * 4:
+                self._fingerprints[sql] = known
+        return known
+
+    def record(self, sql: str, params: Any, duration: float, rows: int, failed: bool) -> QueryStats:
+        fp, statement = self.fingerprint(sql)
+        with self._lock:
+            stats = self._stats.get(fp)
+            if stats is None:
+                if len(self._stats) >= MAX_FINGERPRINTS:
+                    stats = self._stats.setdefault("other", QueryStats("other", "<other statements>"))
+                else:
+                    stats = self._stats[fp] = QueryStats(fp, statement)
+            stats.count += 1
+            stats.total += duration
+            stats.durations.append(duration)
+            if duration > stats.max:
+                stats.max = duration
+            if failed:
+                stats.errors += 1
+            elif rows > 0:
+                stats.rows += rows
+            stats.last_sql, stats.last_params = sql, params
+        return stats
+
+    def get(self, fingerprint: str) -> Optional[QueryStats]:
+        return self._stats.get(fingerprint)
+
+    def top(self, sort: str = "total_ms", limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = [s.to_dict() for s in self._stats.values()]
+        rows.sort(key=lambda r: r.get(sort, 0), reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStatsRegistry()
+
+
+def explain(conn, sql: str, params: Any = None) -> Optional[str]:
+    """Plan of a SELECT/WITH statement (not executed; EXPLAIN without ANALYZE)."""
+    if not _EXPLAINABLE.match(sql):
+        return None
+    execute = psycopg2.extensions.cursor.execute
+    with conn.cursor() as cur:
+        # Plain cursor, so explaining does not recurse into the statistics.
+        # This runs inside the caller's transaction; a savepoint keeps a failed
+        # EXPLAIN from aborting it
+        savepoint = not conn.autocommit
+        if savepoint:
+            execute(cur, "SAVEPOINT query_stats_explain")
+        try:
+            execute(cur, "EXPLAIN " + sql, params)
+            plan = "\n".join(row[0] for row in cur.fetchall())
+        except Exception:
+            if savepoint:
+                execute(cur, "ROLLBACK TO SAVEPOINT query_stats_explain")
+                execute(cur, "RELEASE SAVEPOINT query_stats_explain")
+            raise
+        if savepoint:
+            execute(cur, "RELEASE SAVEPOINT query_stats_explain")
+        return plan
+
+
+def _record(cursor, sql, params, start: float, failed: bool):
+    duration = time.perf_counter() - start
+    try:
+        query = sql.decode("utf-8", "replace") if isinstance(sql, bytes) else str(sql)
+        rows = cursor.rowcount if not failed else 0
+        stats = query_stats.record(query, params, duration, rows, failed)
+        cfg = logging_config.SNAPSHOT.section("slow_query")
+        if not cfg.get("enabled", True) or duration * 1000 < float(cfg.get("threshold_ms", 200)):
+            return
+        plan = None
+        if cfg.get("explain") and not failed:
+            try:
+                plan = explain(cursor.connection, query, params)
+            except Exception as e:
+                plan = f"EXPLAIN failed: {e}"
+        logger.warning(
+            f"Slow query {stats.fingerprint} took {duration * 1000:.1f} ms ({rows} rows): {stats.statement[:500]}"
+            + (f"\n{plan}" if plan else ""),
+            extra={"duration_ms": int(duration * 1000), "event_category": "database"},
+        )
+    except Exception:
+        # Instrumentation must never break the query path
+        pass
+
+
+class _InstrumentedMixin:
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            _record(self, query, vars, start, True)
+            raise
+        _record(self, query, vars, start, False)
+        return result
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            result = super().executemany(query, vars_list)
+        except Exception:
+            _record(self, query, None, start, True)
+            raise
+        _record(self, query, None, start, False)
+        return result
+
+
+class InstrumentedCursor(_InstrumentedMixin, psycopg2.extensions.cursor):
+    pass
+
+
+class InstrumentedDictCursor(_InstrumentedMixin, RealDictCursor):
+    pass
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Connection whose cursors (plain or ``RealDictCursor``) record query statistics."""
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get("cursor_factory")
+        if factory is None or factory is psycopg2.extensions.cursor:
+            kwargs["cursor_factory"] = InstrumentedCursor
+        elif factory is RealDictCursor:
+            kwargs["cursor_factory"] = InstrumentedDictCursor
+        return super().cursor(*args, **kwargs)
@@ -0,0 +1,77 @@
+"""Versioned, TTL-bounded in-memory snapshot shared by read-mostly caches.
+
+A subclass implements ``_load()`` (one database read producing the whole
+value) and, when a failed read does not return None, ``_usable()``.
+``current()`` returns the cached value while it is younger than the TTL and
+no ``invalidate()`` happened since it was loaded; otherwise one caller reloads
+it under a lock while concurrent callers wait for that result.
+
+``invalidate()`` only bumps a version number, so writers never wait for a
+reload in progress; a reload that raced with an invalidation is stored under
+the old version and reloaded on the next read. When a reload fails, the
+previous value keeps being served; with no previous value, the failed result
+is returned without being cached.
+"""
+import logging
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+from libs.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    # Label for the cids_cache_requests metric and log lines
+    cache_name = "snapshot"
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        # (version, loaded_at, value)
+        self._snapshot: Optional[Tuple[int, float, Any]] = None
+        self._version = 0
+        self._lock = threading.Lock()
+        # Separate from _lock so invalidate() never waits for a reload
+        self._version_lock = threading.Lock()
+
+    def _load(self) -> Any:
+        raise NotImplementedError
+
+    def _usable(self, value: Any) -> bool:
+        return value is not None
+
+    def _fresh(self, snapshot) -> bool:
+        return (snapshot is not None and snapshot[0] == self._version
+                and time.monotonic() - snapshot[1] < self.ttl_seconds)
+
+    def current(self) -> Any:
+        """Cached value, reloading it when missing, invalidated or older than the TTL."""
+        snapshot = self._snapshot
+        if self._fresh(snapshot):
+            record_cache(self.cache_name, True)
+            return snapshot[2]
+        with self._lock:
+            # Another caller may have reloaded while we waited
+            snapshot = self._snapshot
+            if self._fresh(snapshot):
+                record_cache(self.cache_name, True)
+                return snapshot[2]
+            record_cache(self.cache_name, False)
+            version = self._version
+            value = self._load()
+            if not self._usable(value):
+                if snapshot is not None:
+                    logger.warning(f"{self.cache_name} reload failed; serving the copy from version {snapshot[0]}")
+                    return snapshot[2]
+                return value
+            self._snapshot = (version, time.monotonic(), value)
+            return value
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self):
+        with self._version_lock:
+            self._version += 1
@@ -0,0 +1,338 @@
+"""Lightweight request tracing with OpenTelemetry-compatible export.
+
+Spans carry W3C trace/span ids, live in a ``contextvars`` context so they
+follow the request through ``await`` points, and are exported in batches as
+OTLP/JSON ``ExportTraceServiceRequest`` documents, either appended one per line
+to a file (readable by the collector's ``otlpjsonfile`` receiver) or POSTed to a
+collector's ``/v1/traces`` endpoint.
+
+Configured from the environment:
+
+- ``TRACING_EXPORTER``: ``file``, ``otlp`` or ``none`` (default ``none``; ids
+  still propagate so logs can be correlated, but no spans are recorded)
+- ``TRACING_FILE``: output for the file exporter (default ``logs/traces/traces.jsonl``)
+- ``OTEL_EXPORTER_OTLP_ENDPOINT``: collector base URL (default ``http://localhost:4318``)
+- ``TRACING_SAMPLE_RATE``: fraction of new traces recorded (default 1.0)
+- ``OTEL_SERVICE_NAME``: ``service.name`` resource attribute (default ``cids``)
+"""
+from __future__ import annotations
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from utils.paths import logs_path
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled",
+                 "start_ns", "end_ns", "attributes", "status", "status_message")
+
+    def __init__(self, name: str, kind: int, trace_id: str, parent_id: Optional[str], sampled: bool,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = 0
+        self.status_message = ""
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        self.status = STATUS_ERROR
+        self.status_message = message[:500]
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status:
+            span["status"] = {"code": self.status, "message": self.status_message}
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class SpanExporter:
+    """Buffers finished spans and writes them out from a background thread."""
+
+    def __init__(self, kind: str, file_path: Path, endpoint: str, service_name: str,
+                 max_queue: int = 4096, max_batch: int = 512, interval: float = 2.0):
+        self.kind = kind
+        self.file_path = file_path
+        self.endpoint = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.interval = interval
+        self.dropped = 0
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self, span: Span):
+        with self._lock:
+            if len(self._buffer) >= self.max_queue:
+                self.dropped += 1
+                return
+            self._buffer.append(span)
+            pending = len(self._buffer)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+        if pending >= self.max_batch:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Span export failed: {e}")
+
+    def _document(self, spans: List[Span]) -> bytes:
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "cids.tracing"}, "spans": [s.to_otlp() for s in spans]}],
+            }]
+        }, separators=(",", ":")).encode("utf-8")
+
+    def flush(self):
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        for i in range(0, len(spans), self.max_batch):
+            body = self._document(spans[i:i + self.max_batch])
+            if self.kind == "file":
+                self.file_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.file_path.open("ab") as f:
+                    f.write(body + b"\n")
+            else:
+                req = urllib.request.Request(self.endpoint, data=body, method="POST",
+                                             headers={"Content-Type": "application/json"})
+                with urllib.request.urlopen(req, timeout=5) as resp:
+                    resp.read()
+
+
+class Tracer:
+    def __init__(self):
+        self._current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("cids_span", default=None)
+        self.exporter: Optional[SpanExporter] = None
+        self.sample_rate = 1.0
+        self.configure()
+
+    def configure(self):
+        kind = os.getenv("TRACING_EXPORTER", "none").lower()
+        self.sample_rate = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+        if kind in ("file", "otlp"):
+            self.exporter = SpanExporter(
+                kind,
+                Path(os.getenv("TRACING_FILE", str(logs_path("traces", "traces.jsonl")))),
+                os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"),
+                os.getenv("OTEL_SERVICE_NAME", "cids"),
+            )
+        else:
+            self.exporter = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    def start_span(self, name: str, kind: int = KIND_INTERNAL, traceparent: Optional[str] = None,
+                   attributes: Optional[Dict[str, Any]] = None) -> Span:
+        parent = self._current.get()
+        if parent is not None:
+            return Span(name, kind, parent.trace_id, parent.span_id, parent.sampled, attributes)
+        match = _TRACEPARENT.match(traceparent.strip().lower()) if traceparent else None
+        if match and match.group(1) != "0" * 32:
+            # Continue the caller's trace and honour its sampling decision
+            return Span(name, kind, match.group(1), match.group(2), match.group(3) == "01", attributes)
+        sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        return Span(name, kind, f"{random.getrandbits(128):032x}", None, sampled, attributes)
+
+    def activate(self, span: Span) -> contextvars.Token:
+        return self._current.set(span)
+
+    def end_span(self, span: Span, token: Optional[contextvars.Token] = None):
+        span.end_ns = time.time_ns()
+        if token is not None:
+            self._current.reset(token)
+        if span.sampled and self.exporter is not None:
+            self.exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, kind: int = KIND_INTERNAL, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Record ``name`` as a child of the current span; yields None while tracing is off."""
+        if self.exporter is None:
+            yield None
+            return
+        span = self.start_span(name, kind, attributes=attributes)
+        token = self.activate(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            self.end_span(span, token)
+
+    def flush(self):
+        if self.exporter is not None:
+            try:
+                self.exporter.flush()
+            except Exception as e:
+                logger.warning(f"Span export failed: {e}")
+
+
+tracer = Tracer()
+atexit.register(tracer.flush)
+
+
+def traced(name: str, kind: int = KIND_INTERNAL, **attributes: Any) -> Callable[[Callable], Callable]:
+    """Decorator form of ``tracer.span`` for sync and async functions."""
+    def decorate(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if tracer.exporter is None:
+                    return await func(*args, **kwargs)
+                with tracer.span(name, kind, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if tracer.exporter is None:
+                return func(*args, **kwargs)
+            with tracer.span(name, kind, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def trace_methods(cls: type, prefix: str, exclude: Iterable[str] = (), kind: int = KIND_INTERNAL,
+                  attributes: Optional[Dict[str, Any]] = None) -> type:
+    """Wrap every public method of ``cls`` in a span named ``<prefix>.<method>``."""
+    skip = set(exclude)
+    for name, func in list(vars(cls).items()):
+        if name.startswith("_") or name in skip or not inspect.isfunction(func):
+            continue
+        setattr(cls, name, traced(f"{prefix}.{name}", kind, **(attributes or {}))(func))
+    return cls
+
+
+def install_httpx_tracing() -> None:
+    """Record a client span for every outbound httpx request and propagate ``traceparent``."""
+    import httpx
+
+    if getattr(httpx.Client.send, "_cids_traced", False):
+        return
+    sync_send, async_send = httpx.Client.send, httpx.AsyncClient.send
+
+    def _start(request) -> Optional[Span]:
+        if tracer.exporter is None or tracer.current_span() is None:
+            # Only outbound calls made on behalf of a traced request are recorded
+            return None
+        span = tracer.start_span(f"HTTP {request.method}", KIND_CLIENT, attributes={
+            "http.request.method": request.method,
+            "server.address": request.url.host,
+            "url.full": str(request.url.copy_with(query=None)),
+        })
+        request.headers["traceparent"] = span.traceparent
+        return span
+
+    def _finish(span: Span, response=None, error: Optional[BaseException] = None):
+        if response is not None:
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.set_error(f"HTTP {response.status_code}")
+        if error is not None:
+            span.set_error(f"{type(error).__name__}: {error}")
+        tracer.end_span(span)
+
+    @functools.wraps(sync_send)
+    def send(self, request, *args, **kwargs):
+        span = _start(request)
+        if span is None:
+            return sync_send(self, request, *args, **kwargs)
+        try:
+            response = sync_send(self, request, *args, **kwargs)
+        except BaseException as e:
+            _finish(span, error=e)
+            raise
+        _finish(span, response)
+        return response
+
+    @functools.wraps(async_send)
+    async def asend(self, request, *args, **kwargs):
+        span = _start(request)
+        if span is None:
+            return await async_send(self, request, *args, **kwargs)
+        try:
+            response = await async_send(self, request, *args, **kwargs)
+        except BaseException as e:
+            _finish(span, error=e)
+            raise
+        _finish(span, response)
+        return response
+
+    send._cids_traced = True
+    httpx.Client.send = send
+    httpx.AsyncClient.send = asend
@@ -1,19 +1,56 @@
 """FastAPI middleware that logs structured access logs for each request/response."""
 from __future__ import annotations
 
+import random
 import time
 from typing import Callable
 from fastapi import Request
 import logging
 
-from libs.logging_config import get_logging_config
+from libs import logging_config
 
 logger = logging.getLogger("access")
 
 
+def _emit(request: Request, response, start: float) -> None:
+    try:
+        duration_ms = int((time.perf_counter() - start) * 1000)
+        # Extract user/email if set by auth; fallback None
+        user_email = None
+        try:
+            user_email = getattr(request.state, "user_email", None)
+        except Exception:
+            pass
+        user_agent = request.headers.get("user-agent")
+        client_ip = request.client.host if request.client else None
+
+        # Emit structured fields via `extra` so JSON formatter includes them
+        logger.info(
+            "request",
+            extra={
+                "request_id": getattr(request.state, "request_id", None),
+                "user_email": user_email,
+                "http_request_method": request.method,
+                "http_response_status_code": getattr(response, "status_code", None),
+                "url_path": request.url.path,
+                "duration_ms": duration_ms,
+                "source_ip": client_ip,
+                "user_agent_original": user_agent,
+            },
+        )
+    except Exception:
+        # Avoid breaking request on logging failure
+        pass
+
+
 async def access_log_middleware(request: Request, call_next: Callable):
-    cfg = get_logging_config()
-    if not cfg.get("access", {}).get("enabled", True):
+    access = logging_config.SNAPSHOT.access
+    if not access.enabled:
+        return await call_next(request)
+    # Sampling is decided up front; failed requests can still be logged afterwards
+    rate = access.rate_for(request.url.path)
+    sampled = rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+    if not sampled and not access.always_log_errors:
         return await call_next(request)
 
     start = time.perf_counter()
@@ -22,32 +59,6 @@ async def access_log_middleware(request: Request, call_next: Callable):
         response = await call_next(request)
         return response
     finally:
-        try:
-            duration_ms = int((time.perf_counter() - start) * 1000)
-            # Extract user/email if set by auth; fallback None
-            user_email = None
-            try:
-                user_email = getattr(request.state, "user_email", None)
-            except Exception:
-                pass
-            user_agent = request.headers.get("user-agent")
-            client_ip = request.client.host if request.client else None
-
-            # Emit structured fields via `extra` so JSON formatter includes them
-            logger.info(
-                "request",
-                extra={
-                    "request_id": getattr(request.state, "request_id", None),
-                    "user_email": user_email,
-                    "http_request_method": request.method,
-                    "http_response_status_code": getattr(response, "status_code", None),
-                    "url_path": request.url.path,
-                    "duration_ms": duration_ms,
-                    "source_ip": client_ip,
-                    "user_agent_original": user_agent,
-                },
-            )
-        except Exception:
-            # Avoid breaking request on logging failure
-            pass
-
+        status = getattr(response, "status_code", None)
+        if sampled or status is None or status >= 500:
+            _emit(request, response, start)
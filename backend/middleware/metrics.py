@@ -0,0 +1,28 @@
+"""FastAPI middleware that records request latency per route template and status."""
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+from fastapi import Request
+
+from libs.metrics import http_request_seconds
+
+
+def _route_template(request: Request) -> str:
+    # Set by the router once a route matched; the template keeps label cardinality bounded
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+async def metrics_middleware(request: Request, call_next: Callable):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_request_seconds.labels(request.method, _route_template(request), status).observe(
+            time.perf_counter() - start
+        )
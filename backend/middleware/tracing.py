@@ -0,0 +1,43 @@
+"""FastAPI middleware that opens the server span for each request.
+
+The trace id (continued from an incoming ``traceparent`` header when present)
+becomes ``request.state.request_id``, so it shows up in the access log and can
+be echoed back by clients through the ``X-Request-ID`` response header.
+"""
+from __future__ import annotations
+
+from typing import Callable
+
+from fastapi import Request
+
+from libs.tracing import KIND_SERVER, tracer
+
+
+async def tracing_middleware(request: Request, call_next: Callable):
+    span = tracer.start_span(
+        f"{request.method} {request.url.path}",
+        KIND_SERVER,
+        traceparent=request.headers.get("traceparent"),
+        attributes={"http.request.method": request.method, "url.path": request.url.path},
+    )
+    token = tracer.activate(span)
+    request.state.request_id = span.trace_id
+    response = None
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = span.trace_id
+        return response
+    except BaseException as e:
+        span.set_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        route = getattr(request.scope.get("route"), "path", None)
+        if route:
+            # Low-cardinality span name from the route template, as OTel recommends
+            span.name = f"{request.method} {route}"
+            span.set_attribute("http.route", route)
+        if response is not None:
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.set_error(f"HTTP {response.status_code}")
+        tracer.end_span(span, token)
@@ -1,5 +1,6 @@
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime
+import base64
 import uuid
 from pydantic import BaseModel
 import logging
@@ -10,6 +11,23 @@ from utils.paths import data_path
 logger = logging.getLogger(__name__)
 
 
+def encode_apps_cursor(created_at: str, client_id: str) -> str:
+    """Keyset cursor for the admin app listing (created_at as returned in the app dict)"""
+    raw = f"{created_at}|{client_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_apps_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, client_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), client_id
+    except Exception:
+        raise ValueError("Invalid apps cursor")
+
+
 class RegisterAppRequest(BaseModel):
     name: str
     description: str
@@ -230,8 +248,8 @@ class AppRegistrationStore:
         """Save role mappings to app_role_mappings table"""
         if client_id not in registered_apps:
             # Check database for app
-            from services.database import db_service
-            app = db_service.get_app_by_id(client_id)
+            from services.app_registry import app_registry
+            app = app_registry.get(client_id)
             if not app:
                 return False
         
@@ -271,7 +289,9 @@ class AppRegistrationStore:
                         (mapping_uuid, client_id, ad_group_name, role_name, rol_id, created_at, updated_at)
                         VALUES (%s, %s, %s, %s, %s, NOW(), NOW())
                     """, (mapping_uuid, client_id, ad_group, app_role, role_id))
-            
+
+            from services.role_index import group_role_index
+            group_role_index.invalidate()
             return True
         except Exception as e:
             logger.error(f"Error saving role mappings to database: {e}")
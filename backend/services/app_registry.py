@@ -0,0 +1,76 @@
+"""In-memory snapshot of the registered apps.
+
+Login, token exchange, discovery and the admin routes all need app rows by
+client_id or the list of apps. Instead of each one querying
+``cids.registered_apps``, they read a versioned snapshot loaded with a single
+query. App create/update/delete and discovery runs call ``invalidate()``; the
+next read reloads. ``APP_REGISTRY_TTL`` (seconds) bounds how stale a snapshot
+can get when another worker changed the table.
+
+Snapshots are immutable once published; callers get the shared dicts and must
+copy before modifying them.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from libs.snapshot_cache import SnapshotCache
+from services.database import db_service
+
+
+@dataclass(frozen=True)
+class AppRegistrySnapshot:
+    apps: Tuple[Dict, ...] = ()
+    by_id: Dict[str, Dict] = field(default_factory=dict)
+    active: Tuple[Dict, ...] = ()
+
+    @classmethod
+    def build(cls, rows: List[Dict]) -> "AppRegistrySnapshot":
+        apps = tuple(rows)
+        return cls(
+            apps=apps,
+            by_id={app['client_id']: app for app in apps},
+            active=tuple(app for app in apps if app.get('is_active', True)),
+        )
+
+
+class AppRegistry(SnapshotCache):
+    cache_name = "app_registry"
+
+    def __init__(self, ttl_seconds: Optional[float] = None, db=None):
+        super().__init__(ttl_seconds if ttl_seconds is not None else float(os.getenv('APP_REGISTRY_TTL', '300')))
+        self.db = db if db is not None else db_service
+
+    def _load(self) -> Optional[AppRegistrySnapshot]:
+        rows = self.db.get_registered_app_rows()
+        return AppRegistrySnapshot.build(rows) if rows is not None else None
+
+    def snapshot(self) -> AppRegistrySnapshot:
+        """Current snapshot; empty when the first load fails."""
+        return self.current() or AppRegistrySnapshot()
+
+    def get(self, client_id: str) -> Optional[Dict]:
+        """App row by client_id.
+
+        A miss falls back to the database, so an app created by another
+        worker is visible before this worker's snapshot expires.
+        """
+        if not client_id:
+            return None
+        app = self.snapshot().by_id.get(client_id)
+        if app is None:
+            app = self.db.get_app_by_id(client_id)
+            if app is not None:
+                self.invalidate()
+        return app
+
+    def all(self) -> Tuple[Dict, ...]:
+        """Every registered app, newest first."""
+        return self.snapshot().apps
+
+    def active(self) -> Tuple[Dict, ...]:
+        """Apps with is_active set, newest first."""
+        return self.snapshot().active
+
+
+app_registry = AppRegistry()
@@ -1,12 +1,12 @@
 """Audit logging for CIDS IAM operations (migrated)"""
 from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
-import json
+from datetime import datetime
 import logging
 from enum import Enum
 import httpx
 
 from utils.paths import logs_path
+from libs.jsonl_reader import daily_files, iter_jsonl_reverse
 from services.database import db_service
 
 logger = logging.getLogger(__name__)
@@ -144,41 +144,31 @@ class AuditLogger:
         return {k: self._remove_none_values(v) for k, v in d.items() if v is not None and (not isinstance(v, dict) or self._remove_none_values(v))}
 
     def query_audit_logs(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, action: Optional[AuditAction] = None, user_email: Optional[str] = None, resource_id: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Newest-first audit entries; stops reading once `limit` matches are found."""
         results = []
-        dates_to_check = None
-        if start_date and end_date:
-            dates_to_check = []
-            current = start_date.date()
-            while current <= end_date.date():
-                dates_to_check.append(current)
-                current = current + timedelta(days=1)
-        for audit_file in sorted(self.audit_dir.glob("audit_*.jsonl"), reverse=True):
-            if dates_to_check:
-                file_date = audit_file.stem.split('_')[1]
-                if file_date not in [d.isoformat() for d in dates_to_check]:
+        files = daily_files(self.audit_dir, "audit_", start_date.date() if start_date else None, end_date.date() if end_date else None)
+        try:
+            for entry in iter_jsonl_reverse(files):
+                if action and entry.get('action') != action.value:
                     continue
-            try:
-                with open(audit_file, 'r') as f:
-                    for line in f:
-                        if not line.strip():
-                            continue
-                        entry = json.loads(line)
-                        if action and entry.get('action') != action.value:
-                            continue
-                        if user_email and entry.get('user', {}).get('email') != user_email:
-                            continue
-                        if resource_id and entry.get('resource', {}).get('id') != resource_id:
-                            continue
+                if user_email and entry.get('user', {}).get('email') != user_email:
+                    continue
+                if resource_id and entry.get('resource', {}).get('id') != resource_id:
+                    continue
+                if start_date or end_date:
+                    try:
                         entry_time = datetime.fromisoformat(entry['timestamp'])
-                        if start_date and entry_time < start_date:
-                            continue
-                        if end_date and entry_time > end_date:
-                            continue
-                        results.append(entry)
-                        if len(results) >= limit:
-                            return results
-            except Exception as e:
-                logger.error(f"Error reading audit file {audit_file}: {e}")
+                    except Exception:
+                        continue
+                    if start_date and entry_time < start_date:
+                        continue
+                    if end_date and entry_time > end_date:
+                        continue
+                results.append(entry)
+                if len(results) >= limit:
+                    break
+        except Exception as e:
+            logger.error(f"Error reading audit files in {self.audit_dir}: {e}")
         return results
 
 
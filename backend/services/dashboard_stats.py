@@ -0,0 +1,36 @@
+"""Cached dashboard statistics.
+
+The admin dashboard polls ``/auth/admin/dashboard/stats``. The snapshot from
+``DatabaseService.get_dashboard_stats`` (one query) is kept for
+``DASHBOARD_STATS_TTL`` seconds, so repeated loads and several admins looking
+at the dashboard cost one query per TTL regardless of table sizes. App, role,
+API key and discovery writes call ``invalidate()`` so this worker's next load
+is fresh; other workers catch up within the TTL.
+"""
+import os
+from typing import Any, Dict, Optional
+
+from libs.snapshot_cache import SnapshotCache
+from services.database import db_service
+
+
+class DashboardStatsCache(SnapshotCache):
+    cache_name = "dashboard_stats"
+
+    def __init__(self, ttl_seconds: Optional[float] = None, db=None):
+        super().__init__(ttl_seconds if ttl_seconds is not None else float(os.getenv('DASHBOARD_STATS_TTL', '30')))
+        self.db = db if db is not None else db_service
+
+    def _load(self) -> Dict[str, Any]:
+        return self.db.get_dashboard_stats()
+
+    def _usable(self, stats: Dict[str, Any]) -> bool:
+        # A failed read returns zeros; do not pin those for a whole TTL
+        return 'roles_active' in stats
+
+    def get(self) -> Dict[str, Any]:
+        """Return the cached snapshot, refreshing it when older than the TTL."""
+        return self.current()
+
+
+dashboard_stats = DashboardStatsCache()
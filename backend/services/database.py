@@ -10,6 +10,10 @@ from typing import Dict, List, Any, Optional, Tuple, Union
 import logging
 from datetime import datetime
 
+from libs.metrics import db_query_seconds, instrument_methods
+from libs.tracing import KIND_CLIENT, trace_methods
+from libs.query_stats import InstrumentedConnection, explain
+
 logger = logging.getLogger(__name__)
 
 class DatabaseService:
@@ -39,6 +43,8 @@ class DatabaseService:
         logger.info(f"Database config: host={self.connection_params['host']}, port={self.connection_params['port']}")
         self.conn = None
         self.cursor = None
+        # Set to False once cids.activity_hourly turns out to be missing
+        self._activity_buckets = True
     
     def connect(self):
         """Establish database connection"""
@@ -54,7 +60,7 @@ class DatabaseService:
                     'password': os.getenv('DB_PASSWORD', 'postgres')
                 }
             logger.info(f"Connecting to database at {self.connection_params['host']}:{self.connection_params['port']}")
-            self.conn = psycopg2.connect(**self.connection_params)
+            self.conn = psycopg2.connect(**self.connection_params, connection_factory=InstrumentedConnection)
             self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
             return True
         except Exception as e:
@@ -68,6 +74,18 @@ class DatabaseService:
         if self.conn:
             self.conn.close()
     
+    def explain_query(self, query: str, params: Any = None) -> Optional[str]:
+        """Return the planner's EXPLAIN output for a SELECT, or None"""
+        try:
+            if not self.conn or self.conn.closed:
+                self.connect()
+            return explain(self.conn, query, params)
+        except Exception as e:
+            logger.error(f"Failed to explain query: {e}")
+            if self.conn:
+                self.conn.rollback()
+            return None
+
     def execute_query(self, query: str, params: tuple = None) -> List[Dict]:
         """Execute a SELECT query and return results"""
         try:
@@ -149,102 +167,166 @@ class DatabaseService:
                 'inactive': 0
             }
     
+    # Latest discovery per app via DISTINCT ON, per-discovery counts and active
+    # role counts as grouped joins: one pass over each table, no correlated
+    # subqueries and no per-app follow-up queries.
+    APPS_LISTING_QUERY = """
+        WITH latest AS (
+            SELECT DISTINCT ON (client_id)
+                   client_id, discovery_id, discovery_version::int AS latest_version,
+                   endpoints_count, discovery_timestamp
+            FROM cids.discovery_history
+            {history_filter}
+            ORDER BY client_id, discovery_version::int DESC, discovery_timestamp DESC
+        ),
+        permission_counts AS (
+            SELECT dp.client_id, COUNT(DISTINCT CONCAT(dp.resource, '.', dp.action)) AS permissions_count
+            FROM cids.discovered_permissions dp
+            JOIN latest l ON l.client_id = dp.client_id AND l.discovery_id = dp.discovery_id
+            GROUP BY dp.client_id
+        ),
+        field_counts AS (
+            SELECT fm.discovery_id, COUNT(DISTINCT fm.field_name) AS fields_count
+            FROM cids.field_metadata fm
+            JOIN latest l ON l.discovery_id = fm.discovery_id
+            GROUP BY fm.discovery_id
+        ),
+        role_counts AS (
+            SELECT client_id, COUNT(*) AS active_roles_count
+            FROM cids.role_metadata
+            WHERE is_active = true
+            {roles_filter}
+            GROUP BY client_id
+        )
+        SELECT
+            ra.client_id, ra.name, ra.description, ra.redirect_uris, ra.owner_email,
+            ra.is_active, ra.created_at, ra.updated_at, ra.discovery_endpoint,
+            ra.allow_discovery, ra.last_discovery_at, ra.discovery_status, ra.discovery_version,
+            ra.last_discovery_run_at, ra.last_discovery_run_by, ra.discovery_run_count,
+            l.latest_version,
+            l.endpoints_count AS latest_endpoints_count,
+            CASE WHEN l.client_id IS NOT NULL THEN COALESCE(pc.permissions_count, 0) END AS latest_permissions_count,
+            CASE WHEN l.client_id IS NOT NULL THEN COALESCE(fc.fields_count, 0) END AS latest_sensitive_fields_count,
+            l.discovery_timestamp AS latest_discovery_timestamp,
+            l.discovery_id AS latest_discovery_id,
+            COALESCE(rc.active_roles_count, 0) AS active_roles_count
+        FROM cids.registered_apps ra
+        LEFT JOIN latest l ON l.client_id = ra.client_id
+        LEFT JOIN permission_counts pc ON pc.client_id = ra.client_id
+        LEFT JOIN field_counts fc ON fc.discovery_id = l.discovery_id
+        LEFT JOIN role_counts rc ON rc.client_id = ra.client_id
+        {apps_filter}
+        ORDER BY ra.created_at DESC, ra.client_id DESC
+    """
+
+    @staticmethod
+    def _format_app_row(app: Dict) -> Dict:
+        app_dict = dict(app)
+        for key in ('created_at', 'updated_at', 'last_discovery_at', 'last_discovery_run_at', 'latest_discovery_timestamp'):
+            if app_dict.get(key):
+                app_dict[key] = app_dict[key].isoformat()
+        app_dict['discovery_endpoint'] = app_dict.get('discovery_endpoint') or None
+        return app_dict
+
     def get_all_registered_apps(self) -> List[Dict]:
         """Get all registered applications from database"""
         try:
             if not self.conn or self.conn.closed:
                 if not self.connect():
                     return []
-            
-            query = """
-                SELECT 
-                    ra.client_id, ra.name, ra.description, ra.redirect_uris, ra.owner_email,
-                    ra.is_active, ra.created_at, ra.updated_at, ra.discovery_endpoint,
-                    ra.allow_discovery, ra.last_discovery_at, ra.discovery_status, ra.discovery_version,
-                    ra.last_discovery_run_at, ra.last_discovery_run_by, ra.discovery_run_count,
-                    -- Get latest discovery version and endpoints count from discovery_history
-                    dh.latest_version, dh.latest_endpoints_count, dh.latest_permissions_count, dh.latest_sensitive_fields_count,
-                    dh.latest_discovery_timestamp, dh.latest_discovery_id
-                FROM cids.registered_apps ra
-                LEFT JOIN (
-                    SELECT client_id, 
-                           MAX(discovery_version::int) as latest_version,
-                           (SELECT endpoints_count 
-                            FROM cids.discovery_history dh2 
-                            WHERE dh2.client_id = dh.client_id 
-                              AND dh2.discovery_version::int = MAX(dh.discovery_version::int)
-                            LIMIT 1) as latest_endpoints_count,
-                           (SELECT COUNT(DISTINCT CONCAT(resource, '.', action))
-                            FROM cids.discovered_permissions dp
-                            WHERE dp.client_id = dh.client_id 
-                              AND dp.discovery_id = (
-                                  SELECT discovery_id 
-                                  FROM cids.discovery_history dh3
-                                  WHERE dh3.client_id = dh.client_id
-                                    AND dh3.discovery_version::int = MAX(dh.discovery_version::int)
-                                  LIMIT 1
-                              )) as latest_permissions_count,
-                           (SELECT COUNT(DISTINCT field_name)
-                            FROM cids.field_metadata fm
-                            WHERE fm.discovery_id = (
-                                  SELECT discovery_id
-                                  FROM cids.discovery_history dh4
-                                  WHERE dh4.client_id = dh.client_id
-                                    AND dh4.discovery_version::int = MAX(dh.discovery_version::int)
-                                  LIMIT 1
-                              )) as latest_sensitive_fields_count,
-                           (SELECT discovery_timestamp 
-                            FROM cids.discovery_history dh5
-                            WHERE dh5.client_id = dh.client_id 
-                              AND dh5.discovery_version::int = MAX(dh.discovery_version::int)
-                            LIMIT 1) as latest_discovery_timestamp,
-                           (SELECT discovery_id 
-                            FROM cids.discovery_history dh6
-                            WHERE dh6.client_id = dh.client_id 
-                              AND dh6.discovery_version::int = MAX(dh.discovery_version::int)
-                            LIMIT 1) as latest_discovery_id
-                    FROM cids.discovery_history dh
-                    GROUP BY client_id
-                ) dh ON ra.client_id = dh.client_id
-                ORDER BY ra.created_at DESC
-            """
-            self.cursor.execute(query)
-            apps = self.cursor.fetchall()
-            
-            # Handle JSON fields and datetime conversion
-            result = []
-            for app in apps:
-                # app is already a dict thanks to RealDictCursor
-                app_dict = dict(app)  # Make a copy to avoid modifying original
-                
-                # Debug log
-                logger.info(f"App from DB: {app_dict.get('name')} - discovery_endpoint: {app_dict.get('discovery_endpoint')}")
-                
-                # Convert datetime objects to strings
-                if app_dict.get('created_at'):
-                    app_dict['created_at'] = app_dict['created_at'].isoformat()
-                if app_dict.get('updated_at'):
-                    app_dict['updated_at'] = app_dict['updated_at'].isoformat()
-                if app_dict.get('last_discovery_at'):
-                    app_dict['last_discovery_at'] = app_dict['last_discovery_at'].isoformat()
-                if app_dict.get('last_discovery_run_at'):
-                    app_dict['last_discovery_run_at'] = app_dict['last_discovery_run_at'].isoformat()
-                if app_dict.get('latest_discovery_timestamp'):
-                    app_dict['latest_discovery_timestamp'] = app_dict['latest_discovery_timestamp'].isoformat()
-                    
-                # Ensure discovery_endpoint is included
-                app_dict['discovery_endpoint'] = app_dict.get('discovery_endpoint') or None
-                
-                # Add active roles count for this app
-                app_dict['active_roles_count'] = self.get_active_roles_count_by_app(app_dict['client_id'])
-                
-                result.append(app_dict)
-            
+
+            self.cursor.execute(self.APPS_LISTING_QUERY.format(
+                history_filter="", roles_filter="", apps_filter=""))
+            result = [self._format_app_row(app) for app in self.cursor.fetchall()]
+            logger.debug(f"Loaded {len(result)} registered apps")
             return result
         except Exception as e:
             logger.error(f"Failed to get all apps: {e}")
+            if self.conn and not self.conn.closed:
+                self.conn.rollback()
             return []
-    
+
+    def get_registered_app_rows(self) -> Optional[List[Dict]]:
+        """Columns of every registered app, without discovery or role counts.
+
+        Returns None (not an empty list) when the read fails, so callers
+        caching the result can tell "no apps" from "database unavailable".
+        """
+        try:
+            if not self.conn or self.conn.closed:
+                if not self.connect():
+                    return None
+
+            self.cursor.execute("""
+                SELECT client_id, name, description, redirect_uris, owner_email,
+                       is_active, created_at, updated_at, discovery_endpoint,
+                       allow_discovery, last_discovery_at, discovery_status, discovery_version
+                FROM cids.registered_apps
+                ORDER BY created_at DESC, client_id DESC
+            """)
+            return [self._format_app_row(app) for app in self.cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Failed to get registered app rows: {e}")
+            if self.conn and not self.conn.closed:
+                self.conn.rollback()
+            return None
+
+    def get_group_role_rows(self) -> Optional[List[Dict]]:
+        """(ad_group_name, client_id, role_name) for every mapping to an active role of a registered app.
+
+        Returns None when the read fails.
+        """
+        try:
+            if not self.conn or self.conn.closed:
+                if not self.connect():
+                    return None
+
+            # Mappings without a role_metadata row predate it and still count
+            self.cursor.execute("""
+                SELECT arm.ad_group_name, arm.client_id, arm.role_name
+                FROM cids.app_role_mappings arm
+                JOIN cids.registered_apps ra ON ra.client_id = arm.client_id
+                LEFT JOIN cids.role_metadata rm
+                       ON rm.client_id = arm.client_id AND rm.role_name = arm.role_name
+                WHERE COALESCE(rm.is_active, true)
+                ORDER BY arm.client_id, arm.role_name
+            """)
+            return self.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Failed to get group role mappings: {e}")
+            if self.conn and not self.conn.closed:
+                self.conn.rollback()
+            return None
+
+    def get_registered_apps_page(self, limit: int, after: Optional[Tuple[datetime, str]] = None) -> Tuple[List[Dict], bool]:
+        """Keyset page of registered apps, newest first, after a (created_at, client_id) cursor.
+
+        Returns (apps, has_more). Only the apps on the page have their
+        discovery and role counts computed.
+        """
+        try:
+            if not self.conn or self.conn.closed:
+                if not self.connect():
+                    return [], False
+
+            # Page the apps first, then restrict the aggregates to those client ids
+            keyset = "WHERE (created_at, client_id) < (%(after_ts)s, %(after_id)s)" if after else ""
+            in_page = (f"client_id IN (SELECT client_id FROM cids.registered_apps {keyset} "
+                       f"ORDER BY created_at DESC, client_id DESC LIMIT %(limit)s)")
+            params = {'limit': limit + 1, 'after_ts': after[0] if after else None, 'after_id': after[1] if after else None}
+            self.cursor.execute(self.APPS_LISTING_QUERY.format(
+                history_filter=f"WHERE {in_page}",
+                roles_filter=f"AND {in_page}",
+                apps_filter=f"WHERE ra.{in_page}",
+            ), params)
+            rows = self.cursor.fetchall()
+            return [self._format_app_row(app) for app in rows[:limit]], len(rows) > limit
+        except Exception as e:
+            logger.error(f"Failed to get registered apps page: {e}")
+            if self.conn and not self.conn.closed:
+                self.conn.rollback()
+            return [], False
+
     def get_app_by_id(self, client_id: str) -> Optional[Dict]:
         """Get a single application by client_id"""
         try:
@@ -698,148 +780,100 @@ class DatabaseService:
             logger.error(f"Failed to get active roles count for app {client_id}: {e}")
             return 0
     
+    # One statement, so every counter comes from the same MVCC snapshot. Each
+    # table is scanned once with FILTER aggregates instead of one COUNT per figure.
+    DASHBOARD_STATS_QUERY = """
+        SELECT
+            apps.*, roles.*, perms.*, keys.*, a2a.*, rls.*,
+            (SELECT COUNT(*) FROM cids.discovery_endpoints) AS discovery_endpoints_total,
+            (SELECT COUNT(*) FROM cids.token_templates) AS token_templates_total,
+            (SELECT COUNT(*) FROM cids.rotation_policies WHERE app_client_id != 'default') AS rotation_policies_total,
+            ({activity}) AS activity_last_24h,
+            (SELECT COALESCE(json_agg(json_build_object('role_name', role_name, 'count', permission_count)
+                                      ORDER BY permission_count DESC, role_name), '[]'::json)
+             FROM (
+                 SELECT rm.role_name, COUNT(p.permission_id) AS permission_count
+                 FROM cids.role_metadata rm
+                 LEFT JOIN cids.permissions p ON rm.role_id = p.role_id
+                 WHERE rm.is_active = true
+                 GROUP BY rm.role_name, rm.role_id
+             ) by_role) AS permissions_by_role
+        FROM
+            (SELECT COUNT(*) AS apps_total,
+                    COUNT(*) FILTER (WHERE is_active = true) AS apps_active,
+                    COUNT(*) FILTER (WHERE last_discovery_at IS NOT NULL) AS apps_discovered,
+                    COUNT(*) FILTER (WHERE allow_discovery = true AND discovery_endpoint IS NOT NULL) AS endpoints_total
+             FROM cids.registered_apps) apps,
+            (SELECT COUNT(*) AS roles_total,
+                    COUNT(*) FILTER (WHERE is_active = true) AS roles_active
+             FROM cids.role_metadata) roles,
+            (SELECT COUNT(DISTINCT CONCAT(resource, '.', action)) AS permissions_total
+             FROM cids.permissions) perms,
+            (SELECT COUNT(*) AS api_keys_total,
+                    COUNT(*) FILTER (WHERE is_active = true) AS api_keys_active
+             FROM cids.api_keys) keys,
+            (SELECT COUNT(*) AS a2a_permissions_total,
+                    COUNT(*) FILTER (WHERE is_active = true) AS a2a_permissions_active
+             FROM cids.a2a_permissions) a2a,
+            (SELECT COUNT(*) AS rls_filters_total,
+                    COUNT(*) FILTER (WHERE is_active = true) AS rls_filters_active
+             FROM cids.rls_filters) rls
+    """
+    # Hourly buckets kept by the trigger in database/migrate_dashboard_stats.sql;
+    # the last 24 hours to the hour, without touching activity_log
+    ACTIVITY_BUCKETS_24H = """
+        SELECT COALESCE(SUM(activity_count), 0) FROM cids.activity_hourly
+        WHERE bucket >= date_trunc('hour', NOW() - INTERVAL '24 hours')
+    """
+    ACTIVITY_SCAN_24H = "SELECT COUNT(*) FROM cids.activity_log WHERE timestamp > NOW() - INTERVAL '24 hours'"
+
     def get_dashboard_stats(self) -> Dict[str, int]:
-        """Get comprehensive statistics for the dashboard"""
+        """Get comprehensive statistics for the dashboard in a single query"""
+        empty = {
+            'apps_total': 0,
+            'apps_active': 0,
+            'apps_discovered': 0,
+            'endpoints_total': 0,
+            'roles_total': 0,
+            'permissions_total': 0,
+            'api_keys_total': 0,
+            'api_keys_active': 0,
+            'token_templates_total': 0,
+            'activity_last_24h': 0
+        }
         try:
             if not self.conn or self.conn.closed:
                 if not self.connect():
-                    return {
-                        'apps_total': 0,
-                        'apps_active': 0,
-                        'apps_discovered': 0,
-                        'endpoints_total': 0,
-                        'roles_total': 0,
-                        'permissions_total': 0,
-                        'api_keys_total': 0,
-                        'api_keys_active': 0
-                    }
-            
-            stats = {}
-            
-            # Apps statistics
-            self.cursor.execute("SELECT COUNT(*) as total FROM cids.registered_apps")
-            stats['apps_total'] = self.cursor.fetchone()['total']
-            
-            self.cursor.execute("SELECT COUNT(*) as active FROM cids.registered_apps WHERE is_active = true")
-            stats['apps_active'] = self.cursor.fetchone()['active']
-            
-            # Apps discovered (apps that have been discovered - last_discovery_at is not null)
-            self.cursor.execute("""
-                SELECT COUNT(*) as discovered 
-                FROM cids.registered_apps 
-                WHERE last_discovery_at IS NOT NULL
-            """)
-            stats['apps_discovered'] = self.cursor.fetchone()['discovered']
-            
-            # Endpoints count from discovery_endpoints table (actual discovered endpoints)
-            self.cursor.execute("""
-                SELECT COUNT(*) as total
-                FROM cids.discovery_endpoints
-            """)
-            stats['discovery_endpoints_total'] = self.cursor.fetchone()['total']
-
-            # Apps with discovery enabled (for backward compatibility)
-            self.cursor.execute("""
-                SELECT COUNT(*) as total
-                FROM cids.registered_apps
-                WHERE allow_discovery = true
-                AND discovery_endpoint IS NOT NULL
-            """)
-            stats['endpoints_total'] = self.cursor.fetchone()['total']
-            
-            # Roles count from role_metadata table
-            self.cursor.execute("SELECT COUNT(*) as total FROM cids.role_metadata")
-            stats['roles_total'] = self.cursor.fetchone()['total']
-            
-            # Active roles count
-            self.cursor.execute("SELECT COUNT(*) as active FROM cids.role_metadata WHERE is_active = true")
-            stats['roles_active'] = self.cursor.fetchone()['active']
-            
-            # Inactive roles count
-            stats['roles_inactive'] = stats['roles_total'] - stats['roles_active']
-            
-            # Permissions count (unique permission combinations)
-            self.cursor.execute("""
-                SELECT COUNT(DISTINCT CONCAT(resource, '.', action)) as total 
-                FROM cids.permissions
-            """)
-            stats['permissions_total'] = self.cursor.fetchone()['total']
-            
-            # Permissions by role
-            self.cursor.execute("""
-                SELECT 
-                    rm.role_name,
-                    COUNT(p.permission_id) as permission_count
-                FROM cids.role_metadata rm
-                LEFT JOIN cids.permissions p ON rm.role_id = p.role_id
-                WHERE rm.is_active = true
-                GROUP BY rm.role_name, rm.role_id
-                ORDER BY permission_count DESC, rm.role_name
-            """)
-            permissions_by_role = self.cursor.fetchall()
-            stats['permissions_by_role'] = [
-                {'role_name': row['role_name'], 'count': row['permission_count']} 
-                for row in permissions_by_role
-            ]
-            
-            # API Keys statistics
-            self.cursor.execute("SELECT COUNT(*) as total FROM cids.api_keys")
-            stats['api_keys_total'] = self.cursor.fetchone()['total']
-            
-            self.cursor.execute("SELECT COUNT(*) as active FROM cids.api_keys WHERE is_active = true")
-            stats['api_keys_active'] = self.cursor.fetchone()['active']
-            
-            # Token templates count
-            self.cursor.execute("SELECT COUNT(*) as total FROM cids.token_templates")
-            stats['token_templates_total'] = self.cursor.fetchone()['total']
-            
-            # Rotation policies count
-            self.cursor.execute("SELECT COUNT(*) as total FROM cids.rotation_policies WHERE app_client_id != 'default'")
-            stats['rotation_policies_total'] = self.cursor.fetchone()['total']
-
-            # A2A Permissions statistics
-            self.cursor.execute("SELECT COUNT(*) as total FROM cids.a2a_permissions")
-            stats['a2a_permissions_total'] = self.cursor.fetchone()['total']
+                    return empty
 
-            self.cursor.execute("SELECT COUNT(*) as active FROM cids.a2a_permissions WHERE is_active = true")
-            stats['a2a_permissions_active'] = self.cursor.fetchone()['active']
+            activity = self.ACTIVITY_BUCKETS_24H if self._activity_buckets else self.ACTIVITY_SCAN_24H
+            try:
+                self.cursor.execute(self.DASHBOARD_STATS_QUERY.format(activity=activity))
+            except psycopg2.ProgrammingError as e:
+                # 42P01 undefined_table
+                if not self._activity_buckets or e.pgcode != '42P01' or 'activity_hourly' not in str(e):
+                    raise
+                # Migration not applied yet: count activity_log directly from now on
+                logger.warning("cids.activity_hourly not found; run database/migrate_dashboard_stats.sql. "
+                               "Falling back to scanning activity_log for activity_last_24h")
+                self.conn.rollback()
+                self._activity_buckets = False
+                self.cursor.execute(self.DASHBOARD_STATS_QUERY.format(activity=self.ACTIVITY_SCAN_24H))
 
+            stats = dict(self.cursor.fetchone())
+            stats['roles_inactive'] = stats['roles_total'] - stats['roles_active']
             stats['a2a_permissions_inactive'] = stats['a2a_permissions_total'] - stats['a2a_permissions_active']
-
-            # RLS Filters statistics
-            self.cursor.execute("SELECT COUNT(*) as total FROM cids.rls_filters")
-            stats['rls_filters_total'] = self.cursor.fetchone()['total']
-
-            self.cursor.execute("SELECT COUNT(*) as active FROM cids.rls_filters WHERE is_active = true")
-            stats['rls_filters_active'] = self.cursor.fetchone()['active']
-
             stats['rls_filters_inactive'] = stats['rls_filters_total'] - stats['rls_filters_active']
+            stats['activity_last_24h'] = int(stats['activity_last_24h'])
 
-            # Audit log entries (last 24 hours)
-            self.cursor.execute("""
-                SELECT COUNT(*) as recent 
-                FROM cids.activity_log 
-                WHERE timestamp > NOW() - INTERVAL '24 hours'
-            """)
-            stats['activity_last_24h'] = self.cursor.fetchone()['recent']
-            
-            logger.info(f"Dashboard stats retrieved: {stats}")
+            logger.debug(f"Dashboard stats retrieved: {stats}")
             return stats
-            
+
         except Exception as e:
             logger.error(f"Failed to get dashboard stats: {e}")
-            return {
-                'apps_total': 0,
-                'apps_active': 0,
-                'apps_discovered': 0,
-                'endpoints_total': 0,
-                'roles_total': 0,
-                'permissions_total': 0,
-                'api_keys_total': 0,
-                'api_keys_active': 0,
-                'token_templates_total': 0,
-                'activity_last_24h': 0
-            }
+            if self.conn and not self.conn.closed:
+                self.conn.rollback()
+            return empty
 
     def get_token_templates(self) -> List[Dict]:
         """Get all token templates from database"""
@@ -1086,11 +1120,14 @@ class DatabaseService:
             if not self.conn or self.conn.closed:
                 self.connect()
 
+            # clock_timestamp(), not CURRENT_TIMESTAMP: the shared connection may
+            # already be inside a transaction that started long ago, and the
+            # revocation feed pages on revoked_at
             self.cursor.execute("""
                 INSERT INTO cids.revoked_tokens
                 (token_id, token_type, revoked_by, revoked_reason, user_email,
-                 user_id, ip_address, expires_at, token_hash)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                 user_id, ip_address, expires_at, token_hash, revoked_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, clock_timestamp())
                 ON CONFLICT (token_id) DO NOTHING
             """, (token_id, token_type, revoked_by, reason, user_email,
                   user_id, ip_address, expires_at, token_hash))
@@ -1125,31 +1162,78 @@ class DatabaseService:
                 return False
 
             result = self.cursor.fetchone()
+            # End the read transaction so the connection is not left idle in it
+            self.conn.commit()
             return result is not None
 
         except Exception as e:
             logger.error(f"Error checking token revocation: {e}")
+            if self.conn and not self.conn.closed:
+                self.conn.rollback()
             # In case of error, assume not revoked (fail open for availability)
             # But log the error for security monitoring
             return False
 
+    def get_revoked_token_ids(self, token_ids: List[str]) -> set:
+        """Return the subset of token_ids that are revoked (one query for a batch)"""
+        if not token_ids:
+            return set()
+        try:
+            if not self.conn or self.conn.closed:
+                self.connect()
+
+            self.cursor.execute("""
+                SELECT token_id FROM cids.revoked_tokens
+                WHERE token_id = ANY(%s)
+            """, (list(token_ids),))
+
+            revoked = {row['token_id'] for row in self.cursor.fetchall()}
+            # End the read transaction so the connection is not left idle in it
+            self.conn.commit()
+            return revoked
+
+        except Exception as e:
+            logger.error(f"Error checking batch token revocation: {e}")
+            if self.conn and not self.conn.closed:
+                self.conn.rollback()
+            # Fail open for availability, same as is_token_revoked
+            return set()
+
+    def get_revocations_since(self, after_revoked_at: datetime, after_token_id: str,
+                              limit: int = 1000, settle_seconds: float = 1.0) -> List[Dict]:
+        """Get unexpired access-token revocations after a (revoked_at, token_id) cursor"""
+        return self.execute_query("""
+            SELECT token_id, expires_at, revoked_at
+            FROM cids.revoked_tokens
+            WHERE token_type = 'access'
+              AND (revoked_at, token_id) > (%s, %s)
+              AND revoked_at <= clock_timestamp() - make_interval(secs => %s)
+              AND (expires_at IS NULL OR expires_at > clock_timestamp())
+            ORDER BY revoked_at, token_id
+            LIMIT %s
+        """, (after_revoked_at, after_token_id, settle_seconds, limit))
+
     def save_refresh_token(self, token_hash: str, user_email: str, user_id: str,
                           expires_at: datetime, client_ip: str = None,
                           user_agent: str = None, device_fingerprint: str = None,
-                          parent_token_hash: str = None) -> bool:
+                          parent_token_hash: str = None, family_id: str = None,
+                          user_info: Dict = None) -> bool:
         """Save refresh token info for tracking and rotation"""
         try:
             if not self.conn or self.conn.closed:
                 self.connect()
 
+            from psycopg2.extras import Json
             self.cursor.execute("""
                 INSERT INTO cids.refresh_tokens
                 (token_hash, user_email, user_id, expires_at, client_ip,
-                 user_agent, device_fingerprint, parent_token_hash)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                 user_agent, device_fingerprint, parent_token_hash,
+                 family_id, user_info)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 ON CONFLICT (token_hash) DO NOTHING
             """, (token_hash, user_email, user_id, expires_at, client_ip,
-                  user_agent, device_fingerprint, parent_token_hash))
+                  user_agent, device_fingerprint, parent_token_hash,
+                  family_id, Json(user_info) if user_info is not None else None))
 
             self.conn.commit()
             logger.info(f"Refresh token saved for user {user_email}")
@@ -1213,6 +1297,46 @@ class DatabaseService:
                 self.conn.rollback()
             return False
 
+    def get_refresh_token(self, token_hash: str) -> Optional[Dict]:
+        """Get a refresh token row by hash (used for read-through after restart)"""
+        results = self.execute_query("""
+            SELECT token_hash, user_email, user_id, expires_at, is_active,
+                   family_id, user_info
+            FROM cids.refresh_tokens
+            WHERE token_hash = %s
+        """, (token_hash,))
+        return results[0] if results else None
+
+    def deactivate_refresh_token_family(self, family_id: str) -> bool:
+        """Deactivate every refresh token in a rotation family (reuse detected)"""
+        return self.execute_update("""
+            UPDATE cids.refresh_tokens
+            SET is_active = false
+            WHERE family_id = %s AND is_active = true
+        """, (family_id,))
+
+    def deactivate_user_refresh_tokens(self, user_id: str) -> int:
+        """Deactivate all active refresh tokens of a user, returns the number deactivated"""
+        try:
+            if not self.conn or self.conn.closed:
+                self.connect()
+
+            self.cursor.execute("""
+                UPDATE cids.refresh_tokens
+                SET is_active = false
+                WHERE user_id = %s AND is_active = true
+            """, (user_id,))
+            count = self.cursor.rowcount
+
+            self.conn.commit()
+            return count
+
+        except Exception as e:
+            logger.error(f"Failed to deactivate refresh tokens for user {user_id}: {e}")
+            if self.conn:
+                self.conn.rollback()
+            return 0
+
     def cleanup_expired_tokens(self) -> int:
         """Clean up expired revoked tokens older than 7 days"""
         try:
@@ -1517,5 +1641,9 @@ class DatabaseService:
                 self.conn.rollback()
             return False
 
+# Per-method call counts and latency
+instrument_methods(DatabaseService, db_query_seconds, "database", exclude=("connect", "disconnect"))
+trace_methods(DatabaseService, "db.database", exclude=("connect", "disconnect"), kind=KIND_CLIENT, attributes={"db.system": "postgresql"})
+
 # Singleton instance
 db_service = DatabaseService()
\ No newline at end of file
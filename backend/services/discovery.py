@@ -24,7 +24,9 @@ from services.jwt import JWTManager
 from services.endpoints import AppEndpointsRegistry
 from services.permission_registry import PermissionRegistry
 from services.app_registration import registered_apps, save_data
+from services.app_registry import app_registry
 from services.discovery_db import discovery_db
+from libs.metrics import discovery_seconds
 
 logger = logging.getLogger(__name__)
 
@@ -239,6 +241,16 @@ class DiscoveryService:
 
     async def discover_with_fields(self, client_id: str, force: bool = False, user_email: str = None) -> Dict[str, Any]:
         """Enhanced discovery with progress tracking, retry logic, and comprehensive error handling"""
+        started = time.perf_counter()
+        status = "exception"
+        try:
+            result = await self._discover_with_fields(client_id, force, user_email)
+            status = str(result.get("status", "unknown")) if isinstance(result, dict) else "unknown"
+            return result
+        finally:
+            discovery_seconds.labels(status).observe(time.perf_counter() - started)
+
+    async def _discover_with_fields(self, client_id: str, force: bool, user_email: Optional[str]) -> Dict[str, Any]:
         logger.info(f"[DISCOVERY] Starting discovery for {client_id}, force={force}, user={user_email}")
         start_time = datetime.utcnow()
 
@@ -246,10 +258,8 @@ class DiscoveryService:
         self._update_progress(client_id, DiscoveryStatus.PENDING, "Validating configuration", 0)
 
         try:
-            # Load app config from DATABASE instead of JSON
-            from services.database import DatabaseService
-            db_service = DatabaseService()
-            app = db_service.get_app_by_id(client_id)
+            # Load app config from the shared app registry instead of JSON
+            app = app_registry.get(client_id)
             
             logger.info(f"[DISCOVERY] App found from DB: {app is not None}")
             if not app:
@@ -383,6 +393,7 @@ class DiscoveryService:
                     client_id, 
                     user_email=user_email or app.get("owner_email")
                 )
+                app_registry.invalidate()
                 
                 # Log activity with discovery_id
                 discovery_db.log_discovery_activity(
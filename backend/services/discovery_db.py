@@ -10,6 +10,10 @@ from pathlib import Path
 import psycopg2
 from psycopg2.extras import RealDictCursor, Json
 
+from libs.metrics import db_query_seconds, instrument_methods
+from libs.tracing import KIND_CLIENT, trace_methods
+from libs.query_stats import InstrumentedConnection
+
 logger = logging.getLogger(__name__)
 
 # Database configuration
@@ -30,7 +34,7 @@ class DiscoveryDatabase:
     def get_connection(self):
         """Get database connection"""
         try:
-            return psycopg2.connect(**self.db_config)
+            return psycopg2.connect(**self.db_config, connection_factory=InstrumentedConnection)
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             # Fallback to localhost if container name fails
@@ -38,7 +42,7 @@ class DiscoveryDatabase:
                 config = self.db_config.copy()
                 config["host"] = "localhost"
                 config["port"] = 54322
-                return psycopg2.connect(**config)
+                return psycopg2.connect(**config, connection_factory=InstrumentedConnection)
             except Exception as e2:
                 logger.error(f"Failed to connect to localhost database: {e2}")
                 raise
@@ -813,4 +817,7 @@ class DiscoveryDatabase:
             return 0
 
 
+instrument_methods(DiscoveryDatabase, db_query_seconds, "discovery", exclude=("get_connection",))
+trace_methods(DiscoveryDatabase, "db.discovery", exclude=("get_connection",), kind=KIND_CLIENT, attributes={"db.system": "postgresql"})
+
 discovery_db = DiscoveryDatabase()
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""Microsoft Graph application token cache and local group directory.
+
+``GraphAppTokenProvider`` keeps the ``client_credentials`` token and renews it
+shortly before expiry. ``GroupDirectory`` mirrors tenant groups locally using
+Graph delta queries and answers admin group searches from an in-memory prefix
+index instead of calling Graph on every keystroke.
+"""
+import asyncio
+import bisect
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from libs.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AUTHORITY_BASE_URL = "https://login.microsoftonline.com"
+DEFAULT_GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+
+_WORD_SPLIT = re.compile(r"[\s\-_./:,;()\[\]]+")
+
+
+def _new_client(timeout_seconds: float) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=timeout_seconds,
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+    )
+
+
+class GraphAppTokenProvider:
+    def __init__(self, authority_base_url: Optional[str] = None, refresh_skew_seconds: int = 300,
+                 timeout_seconds: float = 10.0):
+        self.authority_base_url = (authority_base_url or os.getenv('AZURE_AUTHORITY_BASE_URL', DEFAULT_AUTHORITY_BASE_URL)).rstrip('/')
+        self.refresh_skew_seconds = refresh_skew_seconds
+        self.timeout_seconds = timeout_seconds
+        self._token: Optional[str] = None
+        self._expires_at: float = 0.0
+        self._lock = asyncio.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = _new_client(self.timeout_seconds)
+        return self._client
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and time.monotonic() < self._expires_at - self.refresh_skew_seconds
+
+    async def get_token(self) -> Optional[str]:
+        """Return a cached Graph application token, renewing it before it expires."""
+        if self._is_fresh():
+            record_cache("graph_app_token", True)
+            return self._token
+        record_cache("graph_app_token", False)
+        async with self._lock:
+            if self._is_fresh():
+                return self._token
+            tenant_id = os.getenv('AZURE_TENANT_ID')
+            client_id = os.getenv('AZURE_CLIENT_ID')
+            client_secret = os.getenv('AZURE_CLIENT_SECRET')
+            if not tenant_id or not client_id or not client_secret:
+                return None
+            try:
+                resp = await self._get_client().post(
+                    f"{self.authority_base_url}/{tenant_id}/oauth2/v2.0/token",
+                    data={
+                        'grant_type': 'client_credentials',
+                        'client_id': client_id,
+                        'client_secret': client_secret,
+                        'scope': 'https://graph.microsoft.com/.default'
+                    }
+                )
+                if resp.status_code != 200:
+                    logger.warning(f"Graph app token fetch failed: {resp.status_code} {resp.text}")
+                    # Keep serving a still-valid token if renewal failed
+                    return self._token if time.monotonic() < self._expires_at else None
+                data = resp.json()
+                self._token = data.get('access_token')
+                self._expires_at = time.monotonic() + int(data.get('expires_in', 3600))
+            except Exception:
+                logger.exception("Error fetching Graph app token")
+                return self._token if time.monotonic() < self._expires_at else None
+            return self._token
+
+    def invalidate(self):
+        self._token = None
+        self._expires_at = 0.0
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+class GroupDirectory:
+    def __init__(self, token_provider: GraphAppTokenProvider, graph_base_url: Optional[str] = None,
+                 sync_interval_seconds: Optional[int] = None, timeout_seconds: float = 30.0):
+        self.token_provider = token_provider
+        self.graph_base_url = (graph_base_url or os.getenv('GRAPH_API_BASE_URL', DEFAULT_GRAPH_BASE_URL)).rstrip('/')
+        self.sync_interval_seconds = sync_interval_seconds if sync_interval_seconds is not None else int(os.getenv('GRAPH_GROUP_SYNC_INTERVAL', '300'))
+        self.timeout_seconds = timeout_seconds
+        self.groups: Dict[str, Dict[str, str]] = {}
+        self._delta_link: Optional[str] = None
+        self._last_sync: float = 0.0
+        # Sorted (token, display_name_lower, group_id); one row per word prefix source
+        self._index: List[Tuple[str, str, str]] = []
+        self._sorted_ids: List[str] = []
+        self._sync_lock = asyncio.Lock()
+        self._background_sync: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = _new_client(self.timeout_seconds)
+        return self._client
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._delta_link is not None
+
+    async def ensure_synced(self) -> bool:
+        """Make sure the mirror is usable.
+
+        The first call blocks on a full sync. Later calls return immediately and
+        start a background delta sync when the mirror is older than the sync interval.
+        """
+        if not self.is_loaded:
+            return await self.sync()
+        if time.monotonic() - self._last_sync > self.sync_interval_seconds:
+            if self._background_sync is None or self._background_sync.done():
+                self._background_sync = asyncio.ensure_future(self.sync())
+        return True
+
+    async def sync(self) -> bool:
+        """Apply a Graph delta round (full load when there is no delta link yet)."""
+        async with self._sync_lock:
+            token = await self.token_provider.get_token()
+            if not token:
+                return False
+            full_sync = self._delta_link is None
+            url = self._delta_link or f"{self.graph_base_url}/groups/delta?$select=id,displayName,description"
+            groups = {} if full_sync else dict(self.groups)
+            headers = {'Authorization': f'Bearer {token}'}
+            try:
+                client = self._get_client()
+                while url:
+                    resp = await client.get(url, headers=headers)
+                    if resp.status_code == 410 and not full_sync:
+                        # Delta token expired: start over with a full sync
+                        logger.info("Graph group delta link expired, running full sync")
+                        full_sync = True
+                        groups = {}
+                        url = f"{self.graph_base_url}/groups/delta?$select=id,displayName,description"
+                        continue
+                    if resp.status_code == 401:
+                        self.token_provider.invalidate()
+                    if resp.status_code != 200:
+                        logger.warning(f"Graph group delta sync failed: {resp.status_code} {resp.text}")
+                        return self.is_loaded
+                    data = resp.json()
+                    for g in data.get('value', []):
+                        group_id = g.get('id')
+                        if not group_id:
+                            continue
+                        if '@removed' in g:
+                            groups.pop(group_id, None)
+                            continue
+                        # Delta rows only carry changed properties; merge onto what we have
+                        current = groups.get(group_id, {'id': group_id, 'displayName': '', 'description': ''})
+                        updated = dict(current)
+                        for key in ('displayName', 'description'):
+                            if key in g:
+                                updated[key] = g.get(key) or ''
+                        groups[group_id] = updated
+                    url = data.get('@odata.nextLink')
+                    if not url:
+                        self._delta_link = data.get('@odata.deltaLink') or self._delta_link
+            except Exception:
+                logger.exception("Graph group delta sync failed")
+                return self.is_loaded
+
+            self._rebuild_index(groups)
+            self._last_sync = time.monotonic()
+            logger.info(f"Graph group directory synced ({'full' if full_sync else 'delta'}): {len(groups)} groups")
+            return True
+
+    def _rebuild_index(self, groups: Dict[str, Dict[str, str]]):
+        index: List[Tuple[str, str, str]] = []
+        for group_id, g in groups.items():
+            name = (g.get('displayName') or '').lower()
+            tokens = {name}
+            tokens.update(t for t in _WORD_SPLIT.split(name) if t)
+            for token in tokens:
+                index.append((token, name, group_id))
+        index.sort()
+        sorted_ids = sorted(groups, key=lambda gid: (groups[gid].get('displayName') or '').lower())
+        # Swap in one step so concurrent searches see a consistent view
+        self.groups, self._index, self._sorted_ids = groups, index, sorted_ids
+
+    def search(self, query: Optional[str] = None, top: int = 100) -> List[Dict[str, str]]:
+        """Prefix search on display name and its words, ordered by display name."""
+        groups, index = self.groups, self._index
+        if not query:
+            return [groups[gid] for gid in self._sorted_ids[:top]]
+        q = query.strip().lower()
+        start = bisect.bisect_left(index, (q,))
+        matches: Dict[str, str] = {}
+        for token, name, group_id in index[start:]:
+            if not token.startswith(q):
+                break
+            matches[group_id] = name
+        ordered = sorted(matches, key=lambda gid: matches[gid])[:top]
+        return [groups[gid] for gid in ordered]
+
+    async def close(self):
+        if self._background_sync is not None and not self._background_sync.done():
+            self._background_sync.cancel()
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+graph_app_token = GraphAppTokenProvider()
+group_directory = GroupDirectory(graph_app_token)
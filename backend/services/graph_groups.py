@@ -0,0 +1,106 @@
+"""Microsoft Graph group membership lookup with per-user caching.
+
+Used by token exchange and refresh. Results are cached by user ``sub`` for
+``GRAPH_GROUPS_CACHE_TTL`` seconds, all ``@odata.nextLink`` pages are
+followed, and concurrent lookups for the same user share one Graph call.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from libs.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+
+
+class GraphGroupsCache:
+    def __init__(self, base_url: Optional[str] = None, ttl_seconds: Optional[int] = None,
+                 timeout_seconds: float = 10.0, max_pages: int = 50):
+        self.base_url = (base_url or os.getenv('GRAPH_API_BASE_URL', DEFAULT_GRAPH_BASE_URL)).rstrip('/')
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv('GRAPH_GROUPS_CACHE_TTL', '300'))
+        self.timeout_seconds = timeout_seconds
+        self.max_pages = max_pages
+        self._cache: Dict[str, Tuple[float, List[Dict[str, str]]]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    async def get_user_groups(self, user_sub: Optional[str], access_token: str) -> Optional[List[Dict[str, str]]]:
+        """Return [{'id', 'displayName'}] for the user, or None if Graph could not be read."""
+        if not user_sub:
+            return await self._fetch_groups(access_token)
+
+        cached = self._cache.get(user_sub)
+        if cached and cached[0] > time.monotonic():
+            record_cache("graph_groups", True)
+            return cached[1]
+        record_cache("graph_groups", False)
+
+        # Single-flight: concurrent callers for the same user await the same lookup
+        pending = self._inflight.get(user_sub)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.ensure_future(self._fetch_groups(access_token))
+        self._inflight[user_sub] = future
+        try:
+            groups = await asyncio.shield(future)
+        finally:
+            self._inflight.pop(user_sub, None)
+
+        if groups is not None and self.ttl_seconds > 0:
+            self._cache[user_sub] = (time.monotonic() + self.ttl_seconds, groups)
+        return groups
+
+    async def _fetch_groups(self, access_token: str) -> Optional[List[Dict[str, str]]]:
+        client = self._get_client()
+        headers = {'Authorization': f'Bearer {access_token}'}
+        url: Optional[str] = f"{self.base_url}/me/memberOf?$select=id,displayName"
+        groups: List[Dict[str, str]] = []
+        pages = 0
+        try:
+            while url and pages < self.max_pages:
+                response = await client.get(url, headers=headers)
+                if response.status_code != 200:
+                    logger.warning(f"Failed to fetch groups from Graph API: {response.status_code}")
+                    return None
+                data = response.json()
+                for g in data.get('value', []):
+                    if isinstance(g, dict):
+                        groups.append({'id': g.get('id', ''), 'displayName': g.get('displayName') or f"Group {g.get('id', '')[:8]}..."})
+                url = data.get('@odata.nextLink')
+                pages += 1
+            if url:
+                logger.warning(f"Graph memberOf truncated after {pages} pages ({len(groups)} groups)")
+        except Exception as e:
+            logger.error(f"Failed to fetch groups from Graph API: {e}")
+            return None
+        return groups
+
+    def invalidate(self, user_sub: Optional[str] = None):
+        """Drop one user's cached groups, or the whole cache."""
+        if user_sub is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(user_sub, None)
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+graph_groups_cache = GraphGroupsCache()
@@ -9,6 +9,8 @@ from authlib.jose import jwt, JsonWebKey
 import logging
 
 from services.token_templates import TokenTemplateManager
+from libs.metrics import token_validations, tokens_issued
+from libs.tracing import tracer
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -93,10 +95,20 @@ class JWTManager:
             claims.update(user_info)
             claims['token_version'] = token_version
         header = {'alg': 'RS256', 'kid': self.kid}
-        token = jwt.encode(header, claims, self.private_pem)
+        with tracer.span('jwt.sign', token_type=token_type):
+            token = jwt.encode(header, claims, self.private_pem)
+        tokens_issued.labels(token_type).inc()
         return token.decode('utf-8') if isinstance(token, bytes) else token
 
     def validate_token(self, token: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
+        with tracer.span('jwt.verify') as span:
+            result = self._validate_token(token)
+            if span is not None and not result[0]:
+                span.set_attribute('jwt.error', result[2])
+        token_validations.labels('jwt', 'valid' if result[0] else 'invalid').inc()
+        return result
+
+    def _validate_token(self, token: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
         try:
             claims = jwt.decode(token, self.public_pem)
             now = datetime.now(timezone.utc)
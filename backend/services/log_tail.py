@@ -0,0 +1,210 @@
+"""Shared tailers behind the admin live log streams (SSE).
+
+There is one ``LogTailer`` per log stream, no matter how many admins are watching.
+It follows the file currently being written, woken by filesystem events via
+``watchfiles`` (inotify on Linux) when installed and by polling otherwise, and
+fans every new line out to the subscribers through bounded queues. A slow
+subscriber loses events instead of holding up the tailer and is told how many
+it missed. Event ids are ``<inode>-<offset>``, so a reconnecting client's
+``Last-Event-ID`` resumes from the exact byte position, across a rotation too.
+"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Callable, List, Optional, Set, Tuple
+
+from libs.jsonl_reader import daily_files
+from libs import logging_config
+
+try:
+    from watchfiles import awatch
+except ImportError:  # pragma: no cover - polling fallback
+    awatch = None
+
+logger = logging.getLogger(__name__)
+
+# (event id, line); an event id of None marks a gap and carries the dropped count
+Event = Tuple[Optional[str], str]
+
+
+class Subscription:
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def offer(self, event: Event):
+        if self.dropped:
+            # Announce the gap ahead of the next event, once there is room for both
+            if self.queue.maxsize - self.queue.qsize() < 2:
+                self.dropped += 1
+                return
+            self.queue.put_nowait((None, str(self.dropped)))
+            self.dropped = 0
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class LogTailer:
+    def __init__(self, name: str, files: Callable[[], List[Path]], directory: Callable[[], Path],
+                 queue_size: int = 1000, max_replay: int = 5000, poll_interval: float = 1.0):
+        self.name = name
+        # files(): the stream's files, the one being written first, then its predecessor
+        self.files = files
+        self.directory = directory
+        self.queue_size = queue_size
+        self.max_replay = max_replay
+        self.poll_interval = poll_interval
+        self._subs: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._inode: Optional[int] = None
+        self._offset = 0
+
+    # ---- file reading ----
+
+    @staticmethod
+    def _read_from(path: Path, offset: int, until: Optional[int] = None) -> Tuple[List[Event], int]:
+        """Complete lines of ``path`` after ``offset`` (up to ``until``) and the new offset."""
+        events: List[Event] = []
+        with path.open("rb") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            while until is None or offset < until:
+                raw = f.readline()
+                if not raw.endswith(b"\n"):
+                    # EOF, or a line that is still being written
+                    break
+                offset += len(raw)
+                line = raw.decode("utf-8", "replace").strip()
+                if line:
+                    events.append((f"{inode}-{offset}", line))
+        return events, offset
+
+    @staticmethod
+    def _find(inode: int, paths: List[Path]) -> Optional[Path]:
+        for p in paths:
+            try:
+                if p.stat().st_ino == inode:
+                    return p
+            except FileNotFoundError:
+                continue
+        return None
+
+    def current_file(self) -> Optional[Path]:
+        files = self.files()
+        return files[0] if files and files[0].exists() else None
+
+    def _poll(self):
+        files = self.files()
+        current = files[0] if files and files[0].exists() else None
+        if current is None:
+            return
+        st = current.stat()
+        if st.st_ino != self._inode:
+            if self._inode is None:
+                # Fresh start: only lines written from now on are live
+                self._inode, self._offset = st.st_ino, st.st_size
+                return
+            # Rotated or a new day: drain what is left of the previous file first
+            previous = self._find(self._inode, files[1:])
+            if previous is not None:
+                self._broadcast(self._read_from(previous, self._offset)[0])
+            self._inode, self._offset = st.st_ino, 0
+        elif st.st_size < self._offset:
+            # Truncated in place
+            self._offset = 0
+        if st.st_size > self._offset:
+            events, self._offset = self._read_from(current, self._offset)
+            self._broadcast(events)
+
+    def _broadcast(self, events: List[Event]):
+        for event in events:
+            for sub in self._subs:
+                sub.offer(event)
+
+    def _replay(self, last_event_id: str) -> List[Event]:
+        try:
+            inode_str, offset_str = last_event_id.split("-", 1)
+            inode, offset = int(inode_str), int(offset_str)
+        except ValueError:
+            return []
+        files = self.files()
+        source = self._find(inode, files)
+        if source is None:
+            return []
+        if inode == self._inode:
+            events = self._read_from(source, offset, self._offset)[0]
+        else:
+            events = self._read_from(source, offset)[0]
+            current = self.current_file()
+            if current is not None:
+                events += self._read_from(current, 0, self._offset)[0]
+        return events[-self.max_replay:]
+
+    # ---- subscribers ----
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Tuple[Subscription, List[Event]]:
+        """Register a subscriber; returns its queue and the events to replay first.
+
+        Runs without awaiting, so the replay ends exactly where live events begin.
+        """
+        if self._task is None or self._task.done():
+            self._inode, self._offset = None, 0
+            try:
+                self._poll()
+            except Exception as e:
+                logger.warning(f"Log tailer {self.name} failed to open its file: {e}")
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        replay: List[Event] = []
+        if last_event_id:
+            try:
+                replay = self._replay(last_event_id)
+            except Exception as e:
+                logger.warning(f"Log tailer {self.name} could not resume from {last_event_id}: {e}")
+        sub = Subscription(self.queue_size)
+        self._subs.add(sub)
+        return sub, replay
+
+    def unsubscribe(self, sub: Subscription):
+        self._subs.discard(sub)
+
+    async def _run(self):
+        # Stops on its own shortly after the last subscriber leaves
+        while self._subs:
+            try:
+                directory = self.directory()
+                if awatch is not None and directory.is_dir():
+                    async for _ in awatch(directory, debounce=50, step=50, rust_timeout=5000, yield_on_timeout=True):
+                        self._poll()
+                        if not self._subs:
+                            break
+                else:
+                    await asyncio.sleep(self.poll_interval)
+                    self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Log tailer {self.name} error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+
+def _app_log_files() -> List[Path]:
+    path = Path(logging_config.SNAPSHOT.section("app").get("file", {}).get("path", ""))
+    return [path, path.with_name(f"{path.name}.1")]
+
+
+def _daily_stream(key: str, prefix: str) -> Tuple[Callable[[], List[Path]], Callable[[], Path]]:
+    def directory() -> Path:
+        return Path(logging_config.SNAPSHOT.section(key).get("path", ""))
+
+    def files() -> List[Path]:
+        return daily_files(directory(), prefix)[:2]
+
+    return files, directory
+
+
+app_log_tailer = LogTailer("app", _app_log_files, lambda: _app_log_files()[0].parent)
+audit_log_tailer = LogTailer("audit", *_daily_stream("audit", "audit_"))
+token_activity_tailer = LogTailer("token_activity", *_daily_stream("token_activity", "token_activity_"))
@@ -305,6 +305,8 @@ class PermissionRegistry:
                 ))
             
             self.db_conn.commit()
+            from services.role_index import group_role_index
+            group_role_index.invalidate()
             logger.info(f"Deleted role {role_name} and permissions from database")
             return True
         except Exception as e:
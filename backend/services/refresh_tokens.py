@@ -1,85 +1,197 @@
-"""Refresh Token Storage and Management (migrated, in-memory)"""
+"""Refresh Token Storage and Management (indexed, database-backed)
+
+Tokens are cached in memory and indexed by user ``sub`` and ``family_id`` so
+revocation touches only the affected tokens. Every token is also written to
+``cids.refresh_tokens``; a cache miss reads through to the database, so
+validation and rotation keep working after a restart.
+"""
 import time
 import secrets
 import hashlib
-from typing import Dict, Optional, Tuple
-from datetime import datetime
+import heapq
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime, timezone
 import logging
 
+from services.database import db_service
+
 logger = logging.getLogger(__name__)
 
+# user_info keys that are never written to the database row
+_NON_PERSISTED_KEYS = ('azure_access_token',)
+
 
 class RefreshTokenStore:
-    def __init__(self):
+    def __init__(self, db=None):
+        self.db = db if db is not None else db_service
         self.tokens: Dict[str, Tuple[dict, float]] = {}
+        # family_id -> hash of the current (latest) token in the family
         self.token_families: Dict[str, str] = {}
+        # Secondary indexes
+        self.user_tokens: Dict[str, Set[str]] = {}
+        self.family_tokens: Dict[str, Set[str]] = {}
+        # (expiry, token_hash) min-heap; stale entries are skipped lazily
+        self._expiry_heap: List[Tuple[float, str]] = []
 
-    def create_refresh_token(self, user_info: dict, lifetime_days: int = 30) -> str:
+    def create_refresh_token(self, user_info: dict, lifetime_days: int = 30,
+                             parent_token_hash: Optional[str] = None,
+                             client_ip: Optional[str] = None,
+                             user_agent: Optional[str] = None) -> str:
         token = secrets.token_urlsafe(48)
         token_hash = self._hash_token(token)
         expiry = time.time() + (lifetime_days * 24 * 60 * 60)
         family_id = user_info.get('family_id', secrets.token_urlsafe(16))
         user_info['family_id'] = family_id
-        self.tokens[token_hash] = (user_info, expiry)
+        self._index(token_hash, user_info, expiry)
         self.token_families[family_id] = token_hash
+        self._persist(token_hash, user_info, expiry, parent_token_hash, client_ip, user_agent)
         return token
 
-    def validate_and_rotate(self, token: str) -> Tuple[Optional[dict], Optional[str]]:
+    def validate(self, token: str) -> Optional[dict]:
+        """Copy of the user info for a current token, without rotating it.
+
+        Replaying a retired token revokes its whole family, as in
+        ``validate_and_rotate``.
+        """
+        user_info = self._current(self._hash_token(token))
+        return dict(user_info) if user_info is not None else None
+
+    def validate_and_rotate(self, token: str, updates: Optional[dict] = None) -> Tuple[Optional[dict], Optional[str]]:
+        """Retire the token and issue its successor; ``updates`` (e.g. fresh groups) go into the new token."""
         token_hash = self._hash_token(token)
-        if token_hash not in self.tokens:
+        user_info = self._current(token_hash)
+        if user_info is None:
             return None, None
+        if updates:
+            user_info.update(updates)
+        self._cleanup_token(token_hash)
+        new_token = self.create_refresh_token(user_info, lifetime_days=30, parent_token_hash=token_hash)
+        # Rotation: retire the old row and count its use
+        self.db.deactivate_refresh_token(token_hash)
+        self.db.update_refresh_token_usage(token_hash)
+        return user_info, new_token
+
+    def _current(self, token_hash: str) -> Optional[dict]:
+        if token_hash not in self.tokens and not self._load_from_db(token_hash):
+            return None
         user_info, expiry = self.tokens[token_hash]
         if time.time() > expiry:
             self._cleanup_token(token_hash)
-            return None, None
+            return None
         family_id = user_info.get('family_id')
         if family_id and self.token_families.get(family_id) != token_hash:
             self._revoke_family(family_id)
-            return None, None
-        del self.tokens[token_hash]
-        new_token = self.create_refresh_token(user_info, lifetime_days=30)
-        return user_info, new_token
+            return None
+        return user_info
 
     def revoke_token(self, token: str) -> bool:
         token_hash = self._hash_token(token)
-        if token_hash in self.tokens:
+        if token_hash in self.tokens or self._load_from_db(token_hash):
             self._cleanup_token(token_hash)
+            self.db.deactivate_refresh_token(token_hash)
             return True
         return False
 
     def revoke_all_user_tokens(self, user_sub: str) -> int:
-        revoked = 0
-        tokens_to_remove = [h for h, (info, _) in self.tokens.items() if info.get('sub') == user_sub]
+        tokens_to_remove = list(self.user_tokens.get(user_sub, ()))
         for token_hash in tokens_to_remove:
             self._cleanup_token(token_hash)
-            revoked += 1
-        return revoked
+        db_revoked = self.db.deactivate_user_refresh_tokens(user_sub)
+        return max(len(tokens_to_remove), db_revoked)
 
     def cleanup_expired(self) -> int:
         current_time = time.time()
-        expired_tokens = [h for h, (_, exp) in self.tokens.items() if current_time > exp]
-        for token_hash in expired_tokens:
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= current_time:
+            expiry, token_hash = heapq.heappop(self._expiry_heap)
+            entry = self.tokens.get(token_hash)
+            if entry is None or entry[1] != expiry:
+                continue
             self._cleanup_token(token_hash)
-        return len(expired_tokens)
+            removed += 1
+        return removed
 
     def _hash_token(self, token: str) -> str:
         return hashlib.sha256(token.encode()).hexdigest()
 
+    def _index(self, token_hash: str, user_info: dict, expiry: float):
+        self.tokens[token_hash] = (user_info, expiry)
+        sub = user_info.get('sub')
+        if sub:
+            self.user_tokens.setdefault(sub, set()).add(token_hash)
+        family_id = user_info.get('family_id')
+        if family_id:
+            self.family_tokens.setdefault(family_id, set()).add(token_hash)
+        heapq.heappush(self._expiry_heap, (expiry, token_hash))
+
+    def _persist(self, token_hash: str, user_info: dict, expiry: float,
+                 parent_token_hash: Optional[str], client_ip: Optional[str],
+                 user_agent: Optional[str]):
+        stored_info = {k: v for k, v in user_info.items() if k not in _NON_PERSISTED_KEYS}
+        device_fingerprint = hashlib.sha256(user_agent.encode()).hexdigest()[:16] if user_agent else None
+        self.db.save_refresh_token(
+            token_hash=token_hash,
+            user_email=user_info.get('email'),
+            user_id=user_info.get('sub'),
+            expires_at=datetime.fromtimestamp(expiry, timezone.utc),
+            client_ip=client_ip,
+            user_agent=user_agent,
+            device_fingerprint=device_fingerprint,
+            parent_token_hash=parent_token_hash,
+            family_id=user_info.get('family_id'),
+            user_info=stored_info
+        )
+
+    def _load_from_db(self, token_hash: str) -> bool:
+        """Read-through: populate the cache from cids.refresh_tokens on a miss."""
+        row = self.db.get_refresh_token(token_hash)
+        if not row:
+            return False
+        family_id = row.get('family_id')
+        if not row.get('is_active'):
+            # A retired token is being replayed; kill the whole family
+            if family_id:
+                self._revoke_family(family_id)
+            return False
+        expires_at = row.get('expires_at')
+        expiry = expires_at.timestamp() if isinstance(expires_at, datetime) else 0.0
+        if time.time() > expiry:
+            return False
+        user_info = dict(row.get('user_info') or {})
+        user_info.setdefault('sub', row.get('user_id'))
+        user_info.setdefault('user_id', row.get('user_id'))
+        user_info.setdefault('email', row.get('user_email'))
+        if family_id:
+            user_info['family_id'] = family_id
+            self.token_families[family_id] = token_hash
+        self._index(token_hash, user_info, expiry)
+        logger.debug(f"Refresh token loaded from database for user {user_info.get('email')}")
+        return True
+
     def _cleanup_token(self, token_hash: str):
-        if token_hash in self.tokens:
-            user_info, _ = self.tokens[token_hash]
-            family_id = user_info.get('family_id')
-            del self.tokens[token_hash]
-            if family_id and self.token_families.get(family_id) == token_hash:
-                del self.token_families[family_id]
+        entry = self.tokens.pop(token_hash, None)
+        if entry is None:
+            return
+        user_info, _ = entry
+        sub = user_info.get('sub')
+        if sub in self.user_tokens:
+            self.user_tokens[sub].discard(token_hash)
+            if not self.user_tokens[sub]:
+                del self.user_tokens[sub]
+        family_id = user_info.get('family_id')
+        if family_id in self.family_tokens:
+            self.family_tokens[family_id].discard(token_hash)
+            if not self.family_tokens[family_id]:
+                del self.family_tokens[family_id]
+        if family_id and self.token_families.get(family_id) == token_hash:
+            del self.token_families[family_id]
 
     def _revoke_family(self, family_id: str):
-        tokens_to_remove = [h for h, (info, _) in self.tokens.items() if info.get('family_id') == family_id]
-        for token_hash in tokens_to_remove:
-            del self.tokens[token_hash]
-        if family_id in self.token_families:
-            del self.token_families[family_id]
+        for token_hash in list(self.family_tokens.get(family_id, ())):
+            self._cleanup_token(token_hash)
+        self.token_families.pop(family_id, None)
+        self.db.deactivate_refresh_token_family(family_id)
+        logger.warning(f"Refresh token family {family_id[:8]}... revoked (token reuse detected)")
 
 
 refresh_token_store = RefreshTokenStore()
-
@@ -63,3 +63,12 @@ def compile_filter(policy: Dict[str, Any], user_attrs: Dict[str, Any]) -> Dict[s
                 compiled[resource][field] = condition
     return compiled
 
+
+
+def merge_rls_filters(target: Dict[str, Dict[str, List[Dict]]], role_rls: Dict[str, Dict[str, List[Dict]]]) -> Dict[str, Dict[str, List[Dict]]]:
+    """Merge one role's RLS filters ({resource: {field: [filters]}}) into ``target`` in place"""
+    for resource, fields in role_rls.items():
+        resource_filters = target.setdefault(resource, {})
+        for field, filters in fields.items():
+            resource_filters.setdefault(field, []).extend(filters)
+    return target
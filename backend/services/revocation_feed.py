@@ -0,0 +1,88 @@
+"""Revocation delta feed for resource servers that validate JWTs locally.
+
+Serves newly revoked access-token ``jti``s from ``cids.revoked_tokens`` in
+``(revoked_at, token_id)`` order behind an opaque cursor. Revocations made in
+this process wake up long-poll and SSE waiters immediately; revocations from
+other workers are picked up on the next poll.
+"""
+import asyncio
+import base64
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.database import db_service
+
+logger = logging.getLogger(__name__)
+
+# Rows younger than this are held back so commits that land out of
+# revoked_at order are not skipped by a cursor that already moved past them.
+# This only holds because revoked_at is the wall-clock insert time
+# (clock_timestamp(), see database/migrate_revocation_feed.sql), not the
+# start of a possibly long-open transaction
+SETTLE_SECONDS = 1.0
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(revoked_at: datetime, token_id: str) -> str:
+    raw = f"{revoked_at.isoformat()}|{token_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[datetime, str]:
+    if not cursor:
+        return _EPOCH, ''
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        revoked_at, token_id = raw.split('|', 1)
+        return datetime.fromisoformat(revoked_at), token_id
+    except Exception:
+        raise ValueError("Invalid revocation cursor")
+
+
+class RevocationFeed:
+    def __init__(self, db=None):
+        self.db = db if db is not None else db_service
+        self._changed: Optional[asyncio.Event] = None
+
+    def _event(self) -> asyncio.Event:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def notify(self):
+        """Wake up waiters after a revocation was written in this process."""
+        event = self._event()
+        event.set()
+        # Re-arm for the next revocation; current waiters have already been released
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._event().wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        await asyncio.sleep(SETTLE_SECONDS)
+        return True
+
+    def fetch(self, since: Optional[str], limit: int = 1000) -> Dict[str, Any]:
+        """Return revocations after ``since`` and the cursor to resume from."""
+        after_ts, after_id = decode_cursor(since)
+        rows = self.db.get_revocations_since(after_ts, after_id, limit, settle_seconds=SETTLE_SECONDS)
+        revocations: List[Dict[str, Any]] = []
+        for row in rows:
+            expires_at = row.get('expires_at')
+            revocations.append({
+                'jti': row['token_id'],
+                'exp': int(expires_at.timestamp()) if expires_at else None,
+            })
+        cursor = encode_cursor(rows[-1]['revoked_at'], rows[-1]['token_id']) if rows else since
+        return {
+            'revocations': revocations,
+            'cursor': cursor,
+            'has_more': len(rows) >= limit,
+        }
+
+
+revocation_feed = RevocationFeed()
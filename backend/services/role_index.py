@@ -0,0 +1,81 @@
+"""Inverted index from AD group to the app roles it grants.
+
+``RolesManager.get_user_roles`` runs on every IAM-claims build. Instead of
+reading every app's roles and scanning their groups, it looks each of the
+user's groups up in a dict built from ``cids.app_role_mappings`` joined with
+``cids.role_metadata`` (active roles only), so resolving roles costs one dict
+lookup per group name or id the user has.
+
+Mappings store a group name or an Azure group object id in ``ad_group_name``;
+both forms of each user group are looked up. Writers of role mappings and
+role status call ``invalidate()``; ``ROLE_INDEX_TTL`` (seconds) bounds
+staleness when another worker made the change.
+"""
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from libs.snapshot_cache import SnapshotCache
+from services.database import db_service
+
+logger = logging.getLogger(__name__)
+
+# group name or id -> ((client_id, role_name), ...)
+GroupRoles = Dict[str, Tuple[Tuple[str, str], ...]]
+
+
+def build_group_index(rows: Iterable[Dict]) -> GroupRoles:
+    # dict as an insertion-ordered set of (client_id, role_name)
+    index: Dict[str, Dict[Tuple[str, str], None]] = {}
+    for row in rows:
+        group = row.get('ad_group_name')
+        if group:
+            index.setdefault(group, {})[(row['client_id'], row['role_name'])] = None
+    return {group: tuple(grants) for group, grants in index.items()}
+
+
+def group_keys(user_groups: Iterable[Union[str, Dict]]) -> List[str]:
+    """Names and ids of the user's groups, as plain strings or Graph group dicts."""
+    keys: List[str] = []
+    for group in user_groups or []:
+        if isinstance(group, dict):
+            for key in (group.get('id'), group.get('displayName'), group.get('name')):
+                if key:
+                    keys.append(str(key))
+        elif group:
+            keys.append(str(group))
+    return keys
+
+
+class GroupRoleIndex(SnapshotCache):
+    cache_name = "group_role_index"
+
+    def __init__(self, ttl_seconds: Optional[float] = None, db=None):
+        super().__init__(ttl_seconds if ttl_seconds is not None else float(os.getenv('ROLE_INDEX_TTL', '300')))
+        self.db = db if db is not None else db_service
+
+    def _load(self) -> Optional[GroupRoles]:
+        rows = self.db.get_group_role_rows()
+        if rows is None:
+            return None
+        index = build_group_index(rows)
+        logger.debug(f"Built group role index: {len(index)} groups from {len(rows)} mappings")
+        return index
+
+    def index(self) -> GroupRoles:
+        """Current index; empty when the first build fails."""
+        return self.current() or {}
+
+    def roles_for_groups(self, user_groups: Iterable[Union[str, Dict]]) -> Dict[str, List[str]]:
+        """{client_id: [role_name, ...]} granted by any of the user's groups."""
+        index = self.index()
+        user_roles: Dict[str, List[str]] = {}
+        for key in group_keys(user_groups):
+            for client_id, role_name in index.get(key, ()):
+                roles = user_roles.setdefault(client_id, [])
+                if role_name not in roles:
+                    roles.append(role_name)
+        return user_roles
+
+
+group_role_index = GroupRoleIndex()
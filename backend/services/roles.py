@@ -1,5 +1,5 @@
 """Roles and mappings management for CIDS (migrated to database)"""
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 from pydantic import BaseModel, Field
 import json
@@ -7,6 +7,8 @@ import logging
 
 from utils.paths import data_path
 from services.database import db_service
+from services.app_registry import app_registry
+from services.role_index import group_role_index
 
 logger = logging.getLogger(__name__)
 
@@ -168,7 +170,7 @@ class RolesManager:
             # Validate all mappings first
             for mapping in update.mappings:
                 # Check if app exists
-                app = self.db.get_app_by_id(mapping.app_client_id)
+                app = app_registry.get(mapping.app_client_id)
                 if not app:
                     raise ValueError(f"App {mapping.app_client_id} not found")
                 
@@ -198,29 +200,10 @@ class RolesManager:
             logger.error(f"Failed to upsert role mappings: {e}")
             raise
 
-    def get_user_roles(self, user_groups: List[str], tenant_id: Optional[str] = None) -> Dict[str, List[str]]:
-        """Get roles for a user based on their AD groups from database"""
-        user_roles: Dict[str, List[str]] = {}
-        
+    def get_user_roles(self, user_groups: List[Union[str, Dict]], tenant_id: Optional[str] = None) -> Dict[str, List[str]]:
+        """Get roles for a user based on their AD groups (names, ids or Graph group dicts)"""
         try:
-            # Get all apps
-            apps = self.db.get_all_registered_apps()
-            
-            for app in apps:
-                app_id = app['client_id']
-                # Get roles for this app
-                roles = self.db.get_roles_by_client(app_id)
-                
-                for role in roles:
-                    # Check if user's AD groups match this role's ad_groups
-                    role_groups = role.get('ad_groups', [])
-                    if any(group in user_groups for group in role_groups):
-                        if app_id not in user_roles:
-                            user_roles[app_id] = []
-                        if role['role_name'] not in user_roles[app_id]:
-                            user_roles[app_id].append(role['role_name'])
-            
-            return user_roles
+            return group_role_index.roles_for_groups(user_groups)
         except Exception as e:
             logger.error(f"Failed to get user roles: {e}")
             return {}
@@ -229,9 +212,7 @@ class RolesManager:
         """Get all role mappings from database"""
         try:
             mappings = []
-            apps = self.db.get_all_registered_apps()
-            
-            for app in apps:
+            for app in app_registry.all():
                 roles = self.db.get_roles_by_client(app['client_id'])
                 for role in roles:
                     for ad_group in role.get('ad_groups', []):
@@ -1,6 +1,12 @@
-"""Token activity logging (migrated, in-memory)"""
-from typing import Dict, List, Optional, Any
+"""Token activity logging (migrated, in-memory)
+
+Recent events are kept per token in bounded ring buffers for the admin views;
+the full history goes to disk through the buffered token activity sink.
+"""
+from typing import Deque, Dict, List, Optional, Any
+from collections import OrderedDict, deque
 from datetime import datetime
+import os
 import uuid
 from enum import Enum
 import logging
@@ -22,11 +28,13 @@ class TokenAction(Enum):
 
 
 class TokenActivityLogger:
-    def __init__(self):
-        self.activity_logs: Dict[str, List[Dict[str, Any]]] = {}
+    def __init__(self, max_per_token: Optional[int] = None, max_tokens: Optional[int] = None):
+        self.max_per_token = max_per_token or int(os.getenv('TOKEN_ACTIVITY_MAX_PER_TOKEN', '100'))
+        self.max_tokens = max_tokens or int(os.getenv('TOKEN_ACTIVITY_MAX_TOKENS', '10000'))
+        # Least recently active tokens are evicted first once max_tokens is reached
+        self.activity_logs: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
 
     def log_activity(self, token_id: str, action: TokenAction, performed_by: Optional[Dict[str, Any]] = None, details: Optional[Dict[str, Any]] = None, ip_address: Optional[str] = None, user_agent: Optional[str] = None) -> str:
-        from libs.logging_config import get_logging_config
         from services.token_activity_persist import append_token_activity
 
         log_id = str(uuid.uuid4())
@@ -42,23 +50,26 @@ class TokenActivityLogger:
             'ip_address': ip_address,
             'user_agent': user_agent,
         }
-        if token_id not in self.activity_logs:
-            self.activity_logs[token_id] = []
-        self.activity_logs[token_id].append(log_entry)
-
-        # Persist to disk if enabled
-        cfg = get_logging_config()
-        if cfg.get('token_activity', {}).get('enabled', True):
-            append_token_activity(log_entry)
+        ring = self.activity_logs.get(token_id)
+        if ring is None:
+            ring = self.activity_logs[token_id] = deque(maxlen=self.max_per_token)
+            while len(self.activity_logs) > self.max_tokens:
+                self.activity_logs.popitem(last=False)
+        else:
+            self.activity_logs.move_to_end(token_id)
+        ring.append(log_entry)
+
+        # Persist to disk if enabled (the sink checks the config)
+        append_token_activity(log_entry)
 
         logger.debug(f"Logged activity for token {token_id}: {action.value}")
         return log_id
 
     def get_token_activities(self, token_id: str) -> List[Dict[str, Any]]:
-        return self.activity_logs.get(token_id, [])
+        return list(self.activity_logs.get(token_id, ()))
 
     def get_all_activities(self) -> Dict[str, List[Dict[str, Any]]]:
-        return self.activity_logs.copy()
+        return {token_id: list(ring) for token_id, ring in self.activity_logs.items()}
 
     def clear_token_activities(self, token_id: str):
         if token_id in self.activity_logs:
@@ -75,4 +86,3 @@ class TokenActivityLogger:
 
 
 token_activity_logger = TokenActivityLogger()
-
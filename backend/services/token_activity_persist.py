@@ -1,32 +1,160 @@
-"""Disk persistence for token activity logs as JSONL to align with universal format."""
+"""Disk persistence for token activity logs as JSONL to align with universal format.
+
+Events are buffered in memory and written by a background flusher through one
+open handle per UTC day. The flush interval, fsync policy and retention come
+from the ``token_activity`` logging config:
+
+- ``flush_interval_seconds``: how often buffered events are written (default 1.0)
+- ``max_batch``: buffered events that trigger an early flush (default 500)
+- ``fsync_interval_seconds``: 0 fsyncs after every flush, null never fsyncs (default 30)
+- ``retention_days``: daily files older than this are deleted on day change
+"""
 from __future__ import annotations
 
+import atexit
 import json
-from datetime import datetime
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, IO, List, Optional, Tuple
 
-from libs.logging_config import get_logging_config
+from libs.jsonl_reader import daily_files
+from libs import logging_config
 from utils.paths import logs_path
 
+logger = logging.getLogger(__name__)
+
+FILE_PREFIX = "token_activity_"
+
+
+class TokenActivitySink:
+    def __init__(self):
+        self._buffer: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._file: Optional[IO[str]] = None
+        self._file_path: Optional[Path] = None
+        self._last_fsync = time.monotonic()
+        self._snapshot = None
+        self._load_settings()
+
+    def _load_settings(self):
+        snapshot = logging_config.SNAPSHOT
+        if snapshot is self._snapshot:
+            return
+        self._snapshot = snapshot
+        cfg = snapshot.section("token_activity")
+        self.persist = bool(cfg.get("enabled", True) and cfg.get("persist_to_disk", True))
+        self.dir_path = Path(cfg.get("path", str(logs_path("token_activity"))))
+        self.retention_days = int(cfg.get("retention_days", 60))
+        self.flush_interval = float(cfg.get("flush_interval_seconds", 1.0))
+        self.max_batch = int(cfg.get("max_batch", 500))
+        fsync_interval = cfg.get("fsync_interval_seconds", 30)
+        self.fsync_interval = None if fsync_interval is None else float(fsync_interval)
+
+    def append(self, event: Dict[str, Any]) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            # The flusher also reloads settings, so it runs even while persistence is off
+            self._start()
+        if not self.persist:
+            return
+        day = str(event.get("timestamp", ""))[:10] or datetime.utcnow().date().isoformat()
+        line = json.dumps(event) + "\n"
+        with self._lock:
+            self._buffer.append((day, line))
+            pending = len(self._buffer)
+        if pending >= self.max_batch:
+            self._wakeup.set()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="token-activity-writer", daemon=True)
+            self._thread.start()
 
-def _current_file() -> Path:
-    cfg = get_logging_config()
-    dir_path = Path(cfg.get("token_activity", {}).get("path", str(logs_path("token_activity"))))
-    dir_path.mkdir(parents=True, exist_ok=True)
-    today = datetime.utcnow().date().isoformat()
-    return dir_path / f"token_activity_{today}.jsonl"
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                # Pick up a new config snapshot once per flush instead of once per event
+                self._load_settings()
+            except Exception as e:
+                logger.error(f"Token activity flush failed: {e}")
+
+    def _open_for(self, day: str) -> IO[str]:
+        path = self.dir_path / f"{FILE_PREFIX}{day}.jsonl"
+        if self._file is not None and self._file_path == path:
+            return self._file
+        if self._file is not None:
+            self._file.close()
+        self.dir_path.mkdir(parents=True, exist_ok=True)
+        self._file = path.open("a")
+        self._file_path = path
+        self._enforce_retention()
+        return self._file
+
+    def _enforce_retention(self):
+        if self.retention_days <= 0:
+            return
+        cutoff = datetime.utcnow().date() - timedelta(days=self.retention_days)
+        for p in daily_files(self.dir_path, FILE_PREFIX, end=cutoff - timedelta(days=1)):
+            try:
+                p.unlink()
+            except OSError as e:
+                logger.warning(f"Could not remove expired token activity file {p}: {e}")
+
+    def flush(self) -> None:
+        """Write buffered events to the file of the day they happened."""
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+        if not pending and self._file is None:
+            return
+        by_day: Dict[str, List[str]] = {}
+        for day, line in pending:
+            by_day.setdefault(day, []).append(line)
+        with self._write_lock:
+            f = self._file
+            # Oldest day first so the handle ends up on the newest file
+            for day in sorted(by_day):
+                f = self._open_for(day)
+                f.write("".join(by_day[day]))
+                f.flush()
+            now = time.monotonic()
+            if f is not None and self.fsync_interval is not None and now - self._last_fsync >= self.fsync_interval:
+                os.fsync(f.fileno())
+                self._last_fsync = now
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Token activity flush on close failed: {e}")
+        with self._write_lock:
+            if self._file is not None:
+                try:
+                    os.fsync(self._file.fileno())
+                except OSError:
+                    pass
+                self._file.close()
+                self._file = None
+                self._file_path = None
+
+
+token_activity_sink = TokenActivitySink()
+atexit.register(token_activity_sink.close)
 
 
 def append_token_activity(event: Dict[str, Any]) -> None:
-    cfg = get_logging_config()
-    if not cfg.get("token_activity", {}).get("persist_to_disk", True):
-        return
     try:
-        f = _current_file()
-        with f.open("a") as fh:
-            fh.write(json.dumps(event) + "\n")
+        token_activity_sink.append(event)
     except Exception:
         # swallow errors to avoid impacting request path
         pass
-
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script that fails when the sample app's copies of the client libraries drift from backend/libs
+"""
+import sys
+from pathlib import Path
+
+# Add the parent directory to the Python path so we can import backend modules
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+SAMPLE_APP = parent_dir.parent / 'test-Apps' / 'sample-app' / 'backend' / 'app'
+
+# Modules vendored into the sample app, which is deployed without the CIDS backend
+COPIED_MODULES = ['jwks_client.py', 'revocation_client.py']
+
+
+def without_copy_note(source):
+    """Drop the 'Copy of ... (keep in sync).' paragraph the copies start their docstring with"""
+    lines = source.split('\n')
+    if len(lines) > 2 and lines[1].startswith('Copy of ') and lines[2] == '':
+        del lines[1:3]
+    return '\n'.join(lines)
+
+
+def test_copies_match():
+    """Test that each copy equals its backend/libs original apart from the copy note"""
+    print("🧪 Testing sample app library copies...")
+    for name in COPIED_MODULES:
+        original = (parent_dir / 'libs' / name).read_text()
+        copy = (SAMPLE_APP / name).read_text()
+        assert copy != without_copy_note(copy), f"{name}: copy note missing"
+        assert without_copy_note(copy) == original, f"{name}: sample app copy differs from backend/libs/{name}"
+        print(f"✅ {name} in sync")
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Starting Client Library Copy Tests\n")
+
+    tests = [
+        test_copies_match,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            result = test()
+            if result:
+                passed += 1
+                print(f"✅ {test.__name__} passed")
+            else:
+                failed += 1
+                print(f"❌ {test.__name__} failed")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed with exception: {e}")
+
+    print(f"\n📊 Test Results: {passed} passed, {failed} failed")
+
+    if failed == 0:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("💥 Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
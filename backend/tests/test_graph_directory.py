@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test script for the Graph app token cache and group directory, run against a local mock Graph service
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the parent directory to the Python path so we can import backend modules
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+from services.graph_directory import GraphAppTokenProvider, GroupDirectory
+
+
+class MockGraphHandler(BaseHTTPRequestHandler):
+    """Token endpoint plus /groups/delta with one full round and one change round"""
+    token_requests = 0
+    delta_round = 0
+
+    def _send_json(self, body, status=200):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        MockGraphHandler.token_requests += 1
+        self._send_json({'access_token': f'app-token-{MockGraphHandler.token_requests}', 'expires_in': 3600})
+
+    def do_GET(self):
+        base = f"http://127.0.0.1:{self.server.server_port}/v1.0"
+        if 'deltatoken=1' in self.path:
+            # Second round: one rename, one removal, one new group
+            self._send_json({
+                'value': [
+                    {'id': 'g-1', 'displayName': 'Finance Approvers'},
+                    {'id': 'g-2', '@removed': {'reason': 'deleted'}},
+                    {'id': 'g-4', 'displayName': 'HR Managers', 'description': 'HR'},
+                ],
+                '@odata.deltaLink': f"{base}/groups/delta?deltatoken=2",
+            })
+        elif 'skiptoken=1' in self.path:
+            self._send_json({
+                'value': [{'id': 'g-3', 'displayName': 'IT Admins', 'description': 'IT'}],
+                '@odata.deltaLink': f"{base}/groups/delta?deltatoken=1",
+            })
+        else:
+            self._send_json({
+                'value': [
+                    {'id': 'g-1', 'displayName': 'Finance Users', 'description': 'Finance'},
+                    {'id': 'g-2', 'displayName': 'HR Staff', 'description': 'HR'},
+                ],
+                '@odata.nextLink': f"{base}/groups/delta?skiptoken=1",
+            })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_graph():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockGraphHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.setdefault('AZURE_TENANT_ID', 'tenant')
+    os.environ.setdefault('AZURE_CLIENT_ID', 'client')
+    os.environ.setdefault('AZURE_CLIENT_SECRET', 'secret')
+    return server
+
+
+async def test_app_token_cached():
+    """Test that the app token is fetched once and reused"""
+    print("🧪 Testing app token cache...")
+    server = start_mock_graph()
+    provider = GraphAppTokenProvider(authority_base_url=f"http://127.0.0.1:{server.server_port}")
+    MockGraphHandler.token_requests = 0
+    try:
+        tokens = await asyncio.gather(*[provider.get_token() for _ in range(5)])
+        assert len(set(tokens)) == 1
+        assert MockGraphHandler.token_requests == 1
+        print("✅ Concurrent callers share one token request")
+
+        provider.invalidate()
+        await provider.get_token()
+        assert MockGraphHandler.token_requests == 2
+        print("✅ Invalidated token is renewed")
+    finally:
+        await provider.close()
+        server.shutdown()
+    return True
+
+
+async def test_directory_delta_sync_and_search():
+    """Test full sync, delta sync and prefix search"""
+    print("\n🧪 Testing group directory sync and search...")
+    server = start_mock_graph()
+    base = f"http://127.0.0.1:{server.server_port}"
+    provider = GraphAppTokenProvider(authority_base_url=base)
+    directory = GroupDirectory(provider, graph_base_url=f"{base}/v1.0", sync_interval_seconds=3600)
+    try:
+        assert await directory.ensure_synced()
+        assert set(directory.groups) == {'g-1', 'g-2', 'g-3'}
+        print("✅ Full sync follows nextLink pages")
+
+        assert [g['id'] for g in directory.search('fin')] == ['g-1']
+        assert [g['id'] for g in directory.search('admins')] == ['g-3']
+        assert [g['id'] for g in directory.search(None)] == ['g-1', 'g-2', 'g-3']
+        print("✅ Prefix search on names and words")
+
+        assert await directory.sync()
+        assert set(directory.groups) == {'g-1', 'g-3', 'g-4'}
+        assert directory.groups['g-1']['displayName'] == 'Finance Approvers'
+        assert directory.groups['g-1']['description'] == 'Finance'
+        assert [g['id'] for g in directory.search('hr')] == ['g-4']
+        assert directory.search('users') == []
+        print("✅ Delta sync applies renames, removals and additions")
+    finally:
+        await directory.close()
+        await provider.close()
+        server.shutdown()
+    return True
+
+
+async def main():
+    """Run all tests"""
+    print("🚀 Starting Graph Directory Tests\n")
+
+    tests = [
+        test_app_token_cached,
+        test_directory_delta_sync_and_search,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            result = await test()
+            if result:
+                passed += 1
+                print(f"✅ {test.__name__} passed")
+            else:
+                failed += 1
+                print(f"❌ {test.__name__} failed")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed with exception: {e}")
+
+    print(f"\n📊 Test Results: {passed} passed, {failed} failed")
+
+    if failed == 0:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("💥 Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main())
+    sys.exit(exit_code)
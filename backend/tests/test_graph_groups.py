@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test script for the Graph group membership cache, run against a local stand-in Graph server
+"""
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the parent directory to the Python path so we can import backend modules
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+from services.graph_groups import GraphGroupsCache
+
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    """Serves /me/memberOf in pages of two groups, following @odata.nextLink"""
+    groups = [{'id': f'g-{i}', 'displayName': f'Group {i}'} for i in range(5)]
+    request_count = 0
+
+    def do_GET(self):
+        FakeGraphHandler.request_count += 1
+        if self.headers.get('Authorization') != 'Bearer good-token':
+            self.send_response(401)
+            self.end_headers()
+            return
+        page = 0
+        if 'page=' in self.path:
+            page = int(self.path.split('page=')[1])
+        body = {'value': self.groups[page * 2:page * 2 + 2]}
+        if page * 2 + 2 < len(self.groups):
+            body['@odata.nextLink'] = f"http://127.0.0.1:{self.server.server_port}/v1.0/me/memberOf?page={page + 1}"
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_graph():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGraphHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def test_pagination():
+    """Test that every @odata.nextLink page is followed"""
+    print("🧪 Testing Graph pagination...")
+    server = start_fake_graph()
+    cache = GraphGroupsCache(base_url=f"http://127.0.0.1:{server.server_port}/v1.0", ttl_seconds=60)
+    try:
+        groups = await cache.get_user_groups('user-1', 'good-token')
+        assert [g['id'] for g in groups] == [f'g-{i}' for i in range(5)]
+        print("✅ All pages fetched")
+    finally:
+        await cache.close()
+        server.shutdown()
+    return True
+
+
+async def test_cache_and_single_flight():
+    """Test TTL caching and deduplication of concurrent lookups"""
+    print("\n🧪 Testing cache and single-flight...")
+    server = start_fake_graph()
+    cache = GraphGroupsCache(base_url=f"http://127.0.0.1:{server.server_port}/v1.0", ttl_seconds=60)
+    FakeGraphHandler.request_count = 0
+    try:
+        results = await asyncio.gather(*[cache.get_user_groups('user-2', 'good-token') for _ in range(10)])
+        assert all(len(r) == 5 for r in results)
+        assert FakeGraphHandler.request_count == 3  # one lookup, three pages
+        print("✅ Concurrent lookups share one Graph call")
+
+        await cache.get_user_groups('user-2', 'good-token')
+        assert FakeGraphHandler.request_count == 3
+        print("✅ Cached result served without Graph call")
+
+        cache.invalidate('user-2')
+        await cache.get_user_groups('user-2', 'good-token')
+        assert FakeGraphHandler.request_count == 6
+        print("✅ Invalidation forces a new lookup")
+    finally:
+        await cache.close()
+        server.shutdown()
+    return True
+
+
+async def test_failure_not_cached():
+    """Test that Graph failures return None and are not cached"""
+    print("\n🧪 Testing failure handling...")
+    server = start_fake_graph()
+    cache = GraphGroupsCache(base_url=f"http://127.0.0.1:{server.server_port}/v1.0", ttl_seconds=60)
+    try:
+        assert await cache.get_user_groups('user-3', 'bad-token') is None
+        groups = await cache.get_user_groups('user-3', 'good-token')
+        assert len(groups) == 5
+        print("✅ Failed lookup returns None and is retried")
+    finally:
+        await cache.close()
+        server.shutdown()
+    return True
+
+
+async def main():
+    """Run all tests"""
+    print("🚀 Starting Graph Group Cache Tests\n")
+
+    tests = [
+        test_pagination,
+        test_cache_and_single_flight,
+        test_failure_not_cached,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            result = await test()
+            if result:
+                passed += 1
+                print(f"✅ {test.__name__} passed")
+            else:
+                failed += 1
+                print(f"❌ {test.__name__} failed")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed with exception: {e}")
+
+    print(f"\n📊 Test Results: {passed} passed, {failed} failed")
+
+    if failed == 0:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("💥 Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main())
+    sys.exit(exit_code)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Test script for the refresh token store, run against an in-memory stand-in for cids.refresh_tokens
+"""
+import sys
+from datetime import timezone
+from pathlib import Path
+
+# Add the parent directory to the Python path so we can import backend modules
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+from services.refresh_tokens import RefreshTokenStore
+
+
+class FakeRefreshTokenDB:
+    """Keeps refresh token rows in a dict, with the same methods RefreshTokenStore calls on db_service"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def save_refresh_token(self, token_hash, user_email, user_id, expires_at, client_ip=None,
+                           user_agent=None, device_fingerprint=None, parent_token_hash=None,
+                           family_id=None, user_info=None):
+        # TIMESTAMPTZ cannot hold a naive value unambiguously; the store must send UTC-aware datetimes
+        assert expires_at.tzinfo is not None, "expires_at must be timezone-aware"
+        self.rows.setdefault(token_hash, {
+            'token_hash': token_hash, 'user_email': user_email, 'user_id': user_id,
+            'expires_at': expires_at.astimezone(timezone.utc), 'family_id': family_id,
+            'parent_token_hash': parent_token_hash, 'user_info': user_info, 'is_active': True,
+            'use_count': 0,
+        })
+        return True
+
+    def get_refresh_token(self, token_hash):
+        row = self.rows.get(token_hash)
+        return dict(row) if row else None
+
+    def update_refresh_token_usage(self, token_hash):
+        if token_hash in self.rows:
+            self.rows[token_hash]['use_count'] += 1
+        return True
+
+    def deactivate_refresh_token(self, token_hash):
+        if token_hash in self.rows:
+            self.rows[token_hash]['is_active'] = False
+        return True
+
+    def deactivate_refresh_token_family(self, family_id):
+        for row in self.rows.values():
+            if row['family_id'] == family_id:
+                row['is_active'] = False
+        return True
+
+    def deactivate_user_refresh_tokens(self, user_id):
+        count = 0
+        for row in self.rows.values():
+            if row['user_id'] == user_id and row['is_active']:
+                row['is_active'] = False
+                count += 1
+        return count
+
+
+def user_info():
+    return {'sub': 'user-1', 'email': 'user1@example.com', 'name': 'User One',
+            'azure_access_token': 'secret-azure-token'}
+
+
+def test_rotation_and_persistence():
+    """Test that rotation retires the old row and persists the new one"""
+    print("🧪 Testing rotation...")
+    db = FakeRefreshTokenDB()
+    store = RefreshTokenStore(db=db)
+    token = store.create_refresh_token(user_info())
+    old_hash = store._hash_token(token)
+    assert 'azure_access_token' not in db.rows[old_hash]['user_info']
+    print("✅ Azure access token not written to the database")
+
+    info, new_token = store.validate_and_rotate(token)
+    assert info['email'] == 'user1@example.com' and new_token
+    assert db.rows[old_hash]['is_active'] is False
+    assert db.rows[old_hash]['use_count'] == 1
+    new_row = db.rows[store._hash_token(new_token)]
+    assert new_row['parent_token_hash'] == old_hash
+    assert new_row['family_id'] == db.rows[old_hash]['family_id']
+    print("✅ Old token retired, new token in the same family")
+    return True
+
+
+def test_expiry_is_utc():
+    """Test that expires_at round-trips through the database as the same instant"""
+    print("\n🧪 Testing expiry time zone...")
+    db = FakeRefreshTokenDB()
+    store = RefreshTokenStore(db=db)
+    token = store.create_refresh_token(user_info())
+    token_hash = store._hash_token(token)
+    _, expiry = store.tokens[token_hash]
+    assert abs(db.rows[token_hash]['expires_at'].timestamp() - expiry) < 1e-3
+
+    # Restart: the restored expiry matches the one issued
+    restored = RefreshTokenStore(db=db)
+    assert restored._load_from_db(token_hash)
+    assert abs(restored.tokens[token_hash][1] - expiry) < 1e-3
+    print("✅ Restored expiry equals issued expiry")
+    return True
+
+
+def test_validate_then_rotate_with_updates():
+    """Test that validate() does not rotate and updates land in the new token"""
+    print("\n🧪 Testing validate and rotation updates...")
+    db = FakeRefreshTokenDB()
+    store = RefreshTokenStore(db=db)
+    token = store.create_refresh_token(user_info())
+    info = store.validate(token)
+    assert info['email'] == 'user1@example.com'
+    assert db.rows[store._hash_token(token)]['is_active'] is True
+    print("✅ validate() leaves the token current")
+
+    info, new_token = store.validate_and_rotate(token, updates={'groups': ['Sales']})
+    assert info['groups'] == ['Sales']
+    assert db.rows[store._hash_token(new_token)]['user_info']['groups'] == ['Sales']
+    assert store.validate(token) is None
+    print("✅ Updates persisted with the new token; old token no longer valid")
+    return True
+
+
+def test_restore_from_database():
+    """Test that a token issued before a restart still rotates"""
+    print("\n🧪 Testing read-through after restart...")
+    db = FakeRefreshTokenDB()
+    token = RefreshTokenStore(db=db).create_refresh_token(user_info())
+
+    restarted = RefreshTokenStore(db=db)
+    assert not restarted.tokens
+    info, new_token = restarted.validate_and_rotate(token)
+    assert info['sub'] == 'user-1' and new_token
+    assert restarted.user_tokens['user-1'] == {restarted._hash_token(new_token)}
+    print("✅ Token loaded from the database and rotated")
+    return True
+
+
+def test_replay_revokes_family():
+    """Test that replaying a retired token revokes every token in its family"""
+    print("\n🧪 Testing reuse detection...")
+    db = FakeRefreshTokenDB()
+    store = RefreshTokenStore(db=db)
+    token = store.create_refresh_token(user_info())
+    _, new_token = store.validate_and_rotate(token)
+
+    assert store.validate_and_rotate(token) == (None, None)
+    assert all(not row['is_active'] for row in db.rows.values())
+    assert store.validate_and_rotate(new_token) == (None, None)
+    print("✅ Replay of a retired token revoked the current one in memory")
+
+    # Same after a restart, where the retired token is only known to the database
+    db = FakeRefreshTokenDB()
+    token = RefreshTokenStore(db=db).create_refresh_token(user_info())
+    _, new_token = RefreshTokenStore(db=db).validate_and_rotate(token)
+    restarted = RefreshTokenStore(db=db)
+    assert restarted.validate_and_rotate(token) == (None, None)
+    assert restarted.validate_and_rotate(new_token) == (None, None)
+    print("✅ Replay revokes the family from the database as well")
+    return True
+
+
+def test_revoke_on_logout():
+    """Test revoke_token (used by logout) and per-user revocation"""
+    print("\n🧪 Testing revocation...")
+    db = FakeRefreshTokenDB()
+    store = RefreshTokenStore(db=db)
+    token = store.create_refresh_token(user_info())
+    assert store.revoke_token(token)
+    assert db.rows[store._hash_token(token)]['is_active'] is False
+    assert RefreshTokenStore(db=db).validate_and_rotate(token) == (None, None)
+    print("✅ Revoked token rejected, also after a restart")
+
+    tokens = [store.create_refresh_token(user_info()) for _ in range(3)]
+    assert store.revoke_all_user_tokens('user-1') == 3
+    assert 'user-1' not in store.user_tokens
+    assert all(store.validate_and_rotate(t) == (None, None) for t in tokens)
+    print("✅ All of a user's tokens revoked")
+    return True
+
+
+def test_cleanup_expired():
+    """Test that expired tokens are dropped from memory and indexes"""
+    print("\n🧪 Testing expiry cleanup...")
+    store = RefreshTokenStore(db=FakeRefreshTokenDB())
+    store.create_refresh_token(user_info(), lifetime_days=-1)
+    live = store.create_refresh_token(user_info())
+    assert store.cleanup_expired() == 1
+    assert set(store.tokens) == {store._hash_token(live)}
+    assert store.user_tokens['user-1'] == {store._hash_token(live)}
+    print("✅ Only the expired token removed")
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Starting Refresh Token Store Tests\n")
+
+    tests = [
+        test_rotation_and_persistence,
+        test_expiry_is_utc,
+        test_validate_then_rotate_with_updates,
+        test_restore_from_database,
+        test_replay_revokes_family,
+        test_revoke_on_logout,
+        test_cleanup_expired,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            result = test()
+            if result:
+                passed += 1
+                print(f"✅ {test.__name__} passed")
+            else:
+                failed += 1
+                print(f"❌ {test.__name__} failed")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed with exception: {e}")
+
+    print(f"\n📊 Test Results: {passed} passed, {failed} failed")
+
+    if failed == 0:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("💥 Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script for the group-to-role index, run against an in-memory stand-in for app_role_mappings
+"""
+import sys
+from pathlib import Path
+
+# Add the parent directory to the Python path so we can import backend modules
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+from services.role_index import GroupRoleIndex, build_group_index, group_keys
+
+
+def mapping(group, client_id, role_name):
+    return {'ad_group_name': group, 'client_id': client_id, 'role_name': role_name}
+
+
+class FakeMappingsDB:
+    """Returns the rows get_group_role_rows would, or None to simulate a failed read"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def get_group_role_rows(self):
+        self.calls += 1
+        return None if self.rows is None else list(self.rows)
+
+
+ROWS = [
+    mapping('Sales', 'app-a', 'viewer'),
+    mapping('Sales', 'app-b', 'viewer'),
+    mapping('0f3c6a1e-group-id', 'app-a', 'editor'),
+    mapping('Ops', 'app-a', 'viewer'),
+    mapping('Sales', 'app-a', 'viewer'),  # duplicate row
+    mapping('', 'app-a', 'admin'),        # no group, never matched
+]
+
+
+def test_build_group_index():
+    """Test that rows are grouped by group key and de-duplicated in order"""
+    print("🧪 Testing index build...")
+    index = build_group_index(ROWS)
+    assert index['Sales'] == (('app-a', 'viewer'), ('app-b', 'viewer'))
+    assert index['0f3c6a1e-group-id'] == (('app-a', 'editor'),)
+    assert '' not in index
+    print("✅ Duplicate mappings collapsed, empty group names skipped")
+    return True
+
+
+def test_group_keys():
+    """Test that string groups and Graph group dicts yield names and ids"""
+    print("\n🧪 Testing group keys...")
+    keys = group_keys(['Sales', {'id': '0f3c6a1e-group-id', 'displayName': 'Engineering'}, {'name': 'Ops'}, '', None])
+    assert keys == ['Sales', '0f3c6a1e-group-id', 'Engineering', 'Ops']
+    assert group_keys(None) == []
+    print("✅ Strings, ids and display names all used as keys")
+    return True
+
+
+def test_roles_for_groups():
+    """Test resolution by name, by id, and de-duplication across groups"""
+    print("\n🧪 Testing role resolution...")
+    index = GroupRoleIndex(ttl_seconds=60, db=FakeMappingsDB(ROWS))
+
+    assert index.roles_for_groups(['Sales']) == {'app-a': ['viewer'], 'app-b': ['viewer']}
+    print("✅ Group matched by name")
+
+    assert index.roles_for_groups([{'id': '0f3c6a1e-group-id', 'displayName': 'Engineering'}]) == {'app-a': ['editor']}
+    print("✅ Group matched by object id")
+
+    # Sales and Ops both grant app-a/viewer; it is listed once
+    roles = index.roles_for_groups(['Sales', 'Ops', {'id': '0f3c6a1e-group-id', 'displayName': 'Sales'}])
+    assert roles == {'app-a': ['viewer', 'editor'], 'app-b': ['viewer']}
+    print("✅ Roles granted by several groups listed once")
+
+    assert index.roles_for_groups(['Unmapped']) == {}
+    assert index.roles_for_groups([]) == {}
+    print("✅ Unmapped groups grant nothing")
+    return True
+
+
+def test_cache_and_invalidate():
+    """Test that the index is built once and rebuilt after invalidate()"""
+    print("\n🧪 Testing cache and invalidation...")
+    db = FakeMappingsDB(ROWS)
+    index = GroupRoleIndex(ttl_seconds=60, db=db)
+    for _ in range(5):
+        index.roles_for_groups(['Sales'])
+    assert db.calls == 1
+    print("✅ Index built once for repeated lookups")
+
+    db.rows = ROWS + [mapping('Sales', 'app-c', 'auditor')]
+    index.invalidate()
+    assert index.roles_for_groups(['Sales'])['app-c'] == ['auditor']
+    assert db.calls == 2
+    print("✅ invalidate() picks up new mappings")
+    return True
+
+
+def test_failed_rebuild_keeps_previous_index():
+    """Test that a failed rebuild serves the previous index instead of granting nothing"""
+    print("\n🧪 Testing failed rebuild...")
+    db = FakeMappingsDB(ROWS)
+    index = GroupRoleIndex(ttl_seconds=60, db=db)
+    before = index.roles_for_groups(['Sales'])
+
+    db.rows = None
+    index.invalidate()
+    assert index.roles_for_groups(['Sales']) == before
+    print("✅ Previous index served while the database is unavailable")
+
+    db.rows = [mapping('Sales', 'app-a', 'editor')]
+    assert index.roles_for_groups(['Sales']) == {'app-a': ['editor']}
+    print("✅ Index rebuilt once the database is back")
+
+    empty = GroupRoleIndex(ttl_seconds=60, db=FakeMappingsDB(None))
+    assert empty.roles_for_groups(['Sales']) == {}
+    print("✅ No roles when the very first build fails")
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Starting Group Role Index Tests\n")
+
+    tests = [
+        test_build_group_index,
+        test_group_keys,
+        test_roles_for_groups,
+        test_cache_and_invalidate,
+        test_failed_rebuild_keeps_previous_index,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            result = test()
+            if result:
+                passed += 1
+                print(f"✅ {test.__name__} passed")
+            else:
+                failed += 1
+                print(f"❌ {test.__name__} failed")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed with exception: {e}")
+
+    print(f"\n📊 Test Results: {passed} passed, {failed} failed")
+
+    if failed == 0:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("💥 Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
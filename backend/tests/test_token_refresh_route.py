@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test script for the refresh_token grant of POST /auth/token, with the database, Graph and token signing stubbed out
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add the parent directory to the Python path so we can import backend modules
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+from fastapi import HTTPException
+
+from api import main as api_main
+from services.refresh_tokens import RefreshTokenStore
+from test_refresh_tokens import FakeRefreshTokenDB
+
+
+class FakeRevocationDB:
+    """Records db_service.revoke_token calls made by the route"""
+
+    def __init__(self):
+        self.revoked = []
+
+    def revoke_token(self, token_id, **kwargs):
+        self.revoked.append(token_id)
+        return True
+
+
+class FakeGroupsCache:
+    def __init__(self, groups):
+        self.groups = groups
+
+    async def get_user_groups(self, user_sub, access_token):
+        return self.groups
+
+
+class FakeActivityLogger:
+    def log_activity(self, **kwargs):
+        return 'log-id'
+
+
+class FakeClient:
+    host = '10.0.0.1'
+
+
+class FakeRequest:
+    client = FakeClient()
+    headers = {'User-Agent': 'test-agent'}
+
+
+def setup(groups=None):
+    """Point the route at in-memory stand-ins; returns (store, refresh DB, revocation DB)"""
+    refresh_db = FakeRefreshTokenDB()
+    store = RefreshTokenStore(db=refresh_db)
+    revocation_db = FakeRevocationDB()
+    api_main.refresh_token_store = store
+    api_main.db_service = revocation_db
+    api_main.graph_groups_cache = FakeGroupsCache(groups)
+    api_main.token_activity_logger = FakeActivityLogger()
+    api_main.generate_token_with_iam_claims = lambda user_info, **kwargs: 'access-token'
+    return store, refresh_db, revocation_db
+
+
+def refresh(token):
+    request = api_main.TokenRequest(grant_type='refresh_token', refresh_token=token)
+    response = asyncio.run(api_main.token_endpoint(request, FakeRequest()))
+    return json.loads(response.body)
+
+
+def user_info():
+    return {'sub': 'user-1', 'email': 'user1@example.com', 'groups': ['Old'],
+            'azure_access_token': 'secret-azure-token'}
+
+
+def test_replay_revokes_family():
+    """Test that replaying a rotated refresh token revokes every token in its family"""
+    print("🧪 Testing replay through the route...")
+    store, refresh_db, revocation_db = setup()
+    first = store.create_refresh_token(user_info())
+    second = refresh(first)['refresh_token']
+
+    try:
+        refresh(first)
+        assert False, "replayed token accepted"
+    except HTTPException as e:
+        assert e.status_code == 401
+    assert all(not row['is_active'] for row in refresh_db.rows.values())
+    print("✅ Replay rejected and every row in the family deactivated")
+
+    try:
+        refresh(second)
+        assert False, "token from a revoked family accepted"
+    except HTTPException as e:
+        assert e.status_code == 401
+    print("✅ Latest token of the family no longer refreshes")
+    return True
+
+
+def test_groups_refreshed_before_rotation():
+    """Test that fresh Graph groups are stored with the new refresh token"""
+    print("\n🧪 Testing group refresh...")
+    store, refresh_db, _ = setup(groups=[{'id': 'g-1', 'displayName': 'New'}])
+    token = store.create_refresh_token(user_info())
+    new_token = refresh(token)['refresh_token']
+    new_row = refresh_db.rows[store._hash_token(new_token)]
+    assert new_row['user_info']['groups'] == [{'id': 'g-1', 'displayName': 'New'}]
+    print("✅ New refresh token persisted with the fresh groups")
+    return True
+
+
+def test_unknown_token_rejected():
+    """Test that an unknown refresh token is rejected and recorded"""
+    print("\n🧪 Testing unknown token...")
+    store, _, revocation_db = setup()
+    try:
+        refresh('not-a-real-token')
+        assert False, "unknown token accepted"
+    except HTTPException as e:
+        assert e.status_code == 401
+    assert revocation_db.revoked == [store._hash_token('not-a-real-token')]
+    print("✅ Unknown token rejected and recorded as an invalid attempt")
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("🚀 Starting Token Refresh Route Tests\n")
+
+    tests = [
+        test_replay_revokes_family,
+        test_groups_refreshed_before_rotation,
+        test_unknown_token_rejected,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            result = test()
+            if result:
+                passed += 1
+                print(f"✅ {test.__name__} passed")
+            else:
+                failed += 1
+                print(f"❌ {test.__name__} failed")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed with exception: {e}")
+
+    print(f"\n📊 Test Results: {passed} passed, {failed} failed")
+
+    if failed == 0:
+        print("🎉 All tests passed!")
+        return 0
+    else:
+        print("💥 Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
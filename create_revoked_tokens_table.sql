@@ -4,7 +4,7 @@
 CREATE TABLE IF NOT EXISTS cids.revoked_tokens (
     token_id VARCHAR(255) PRIMARY KEY,
     token_type VARCHAR(50) NOT NULL DEFAULT 'access', -- 'access' or 'refresh'
-    revoked_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    revoked_at TIMESTAMP WITH TIME ZONE DEFAULT clock_timestamp(), -- insert time, not transaction start; the revocation feed pages on it
     revoked_by VARCHAR(255), -- email of user who revoked it
     revoked_reason VARCHAR(100), -- 'logout', 'admin_revoked', 'rotation', 'security_breach'
     user_email VARCHAR(255),
@@ -37,6 +37,8 @@ CREATE TABLE IF NOT EXISTS cids.refresh_tokens (
     device_fingerprint VARCHAR(255),
     is_active BOOLEAN DEFAULT TRUE,
     rotation_count INTEGER DEFAULT 0,
+    family_id VARCHAR(64), -- Rotation family (reuse detection)
+    user_info JSONB, -- User claims for read-through after restart
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -44,6 +46,8 @@ CREATE TABLE IF NOT EXISTS cids.refresh_tokens (
 CREATE INDEX idx_refresh_tokens_user_email ON cids.refresh_tokens(user_email);
 CREATE INDEX idx_refresh_tokens_is_active ON cids.refresh_tokens(is_active);
 CREATE INDEX idx_refresh_tokens_expires_at ON cids.refresh_tokens(expires_at);
+CREATE INDEX idx_refresh_tokens_family_id ON cids.refresh_tokens(family_id);
+CREATE INDEX idx_refresh_tokens_user_id ON cids.refresh_tokens(user_id);
 
 -- Add comments for documentation
 COMMENT ON TABLE cids.revoked_tokens IS 'Stores all revoked tokens for security compliance';
@@ -1,22 +1,52 @@
 import os
+import time
 from typing import Optional, Dict, Any
 
 import httpx
 from fastapi import HTTPException
 
+from .jwks_client import JWKSClient, JWKSValidationError
+from .revocation_client import RevocationFeedClient
+
+# Local JWT checks are only trusted while the revocation feed has answered
+# this recently (its long poll answers at least every wait_seconds)
+REVOCATION_FEED_MAX_AGE = 60
+
 
 class CIDSClient:
-    def __init__(self, base_url: Optional[str] = None, verify_ssl: Optional[bool] = None):
+    def __init__(self, base_url: Optional[str] = None, verify_ssl: Optional[bool] = None, api_key: Optional[str] = None):
         self.base_url = (base_url or os.getenv("CID_BASE_URL") or "http://127.0.0.1:8000").rstrip("/")
         if verify_ssl is None:
             env = os.getenv("CID_VERIFY_SSL")
             verify_ssl = False if (env is not None and env.lower() in ("0", "false", "no")) else True
         self.verify_ssl = verify_ssl
+        # With an API key, revoked JWTs come from CID's revocation feed into a local set
+        api_key = api_key or os.getenv("CID_API_KEY")
+        self.revocations = RevocationFeedClient(self.base_url, api_key, verify_ssl=self.verify_ssl) if api_key else None
+        # JWTs are verified locally against CID's JWKS
+        self.jwks = JWKSClient(
+            self.base_url,
+            verify_ssl=self.verify_ssl,
+            is_revoked=self.revocations.is_revoked if self.revocations else None,
+        )
+
+    def _revocations_current(self) -> bool:
+        if self.revocations is None:
+            return False
+        self.revocations.ensure_task()
+        return time.time() - self.revocations.last_sync < REVOCATION_FEED_MAX_AGE
 
     async def validate(self, token: str) -> Dict[str, Any]:
         if not token:
             raise HTTPException(status_code=401, detail="No token provided")
 
+        if not token.startswith("cids_ak_") and self._revocations_current():
+            try:
+                claims = await self.jwks.avalidate(token)
+            except JWKSValidationError as e:
+                raise HTTPException(status_code=401, detail=str(e))
+            return {"auth_type": "jwt", "valid": True, "claims": claims}
+
         try:
             async with httpx.AsyncClient(verify=self.verify_ssl, timeout=10.0) as client:
                 if token.startswith("cids_ak_"):
@@ -41,7 +71,8 @@ class CIDSClient:
                         "valid": True,
                     }
                 else:
-                    # JWT validation: POST /auth/validate with token in body
+                    # No API key for the revocation feed, or the feed is behind:
+                    # POST /auth/validate, where CID checks revocation itself
                     resp = await client.post(
                         f"{self.base_url}/auth/validate",
                         json={"token": token},
@@ -56,4 +87,3 @@ class CIDSClient:
             raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Token validation error: {e}")
-
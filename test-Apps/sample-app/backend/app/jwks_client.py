@@ -0,0 +1,208 @@
+"""
+Copy of backend/libs/jwks_client.py from CIDS (keep in sync).
+
+JWKS-based offline JWT validation for CIDS resource servers.
+
+Keys come from ``/.well-known/jwks.json``. The key set is cached according to
+the response's ``Cache-Control: max-age`` and revalidated with ``ETag``. A token
+signed with an unknown ``kid`` triggers a (rate-limited) refetch, so key
+rotation is picked up without restarts. Tokens are verified locally; revocation
+is delegated to an optional ``is_revoked(jti)`` callable so a locally
+maintained revocation set can be plugged in.
+"""
+import base64
+import json
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from authlib.jose import JsonWebKey, jwt
+
+logger = logging.getLogger(__name__)
+
+CIDS_ISSUER = 'internal-auth-service'
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+class JWKSValidationError(Exception):
+    pass
+
+
+class _SignatureError(JWKSValidationError):
+    pass
+
+
+class JWKSClient:
+    def __init__(self, cids_url: str, verify_ssl: bool = True, audiences: Optional[List[str]] = None,
+                 issuer: str = CIDS_ISSUER, default_max_age: int = 300, min_refetch_interval: int = 30,
+                 leeway: int = 0, timeout: float = 10.0, is_revoked: Optional[Callable[[str], bool]] = None):
+        self.jwks_url = f"{cids_url.rstrip('/')}/.well-known/jwks.json"
+        self.verify_ssl = verify_ssl
+        self.audiences = audiences
+        self.issuer = issuer
+        self.default_max_age = default_max_age
+        self.min_refetch_interval = min_refetch_interval
+        self.leeway = leeway
+        self.timeout = timeout
+        self.is_revoked = is_revoked
+        self.jwks: Dict[str, Any] = {'keys': []}
+        self.keys: Dict[str, Any] = {}
+        self._etag: Optional[str] = None
+        self._expires_at: float = 0.0
+        self._last_fetch: float = 0.0
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    # ---- key set management ----
+
+    def _request_headers(self) -> Dict[str, str]:
+        return {'If-None-Match': self._etag} if self._etag and self.keys else {}
+
+    def _apply_response(self, response: httpx.Response):
+        now = time.monotonic()
+        self._last_fetch = now
+        max_age = self.default_max_age
+        cache_control = response.headers.get('Cache-Control', '')
+        if 'no-store' in cache_control or 'no-cache' in cache_control:
+            max_age = 0
+        else:
+            match = _MAX_AGE.search(cache_control)
+            if match:
+                max_age = int(match.group(1))
+        self._expires_at = now + max_age
+
+        if response.status_code == 304:
+            return
+        response.raise_for_status()
+        jwks = response.json()
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            try:
+                keys[jwk.get('kid', '')] = JsonWebKey.import_key(jwk)
+            except Exception as e:
+                logger.warning(f"Skipping unusable JWK {jwk.get('kid')}: {e}")
+        self.jwks = jwks
+        self.keys = keys
+        self._etag = response.headers.get('ETag')
+        logger.info(f"Loaded {len(keys)} signing keys from {self.jwks_url}")
+
+    def _should_fetch(self, kid: Optional[str]) -> bool:
+        now = time.monotonic()
+        if not self.keys or now >= self._expires_at:
+            return True
+        # Unknown kid: the key was probably rotated, refetch but not more than once per interval
+        return kid is not None and kid not in self.keys and self._may_refetch()
+
+    def _may_refetch(self) -> bool:
+        return time.monotonic() - self._last_fetch >= self.min_refetch_interval
+
+    def _fetch_failed(self, error: Exception):
+        logger.error(f"Failed to fetch JWKS from {self.jwks_url}: {error}")
+        if not self.keys:
+            raise JWKSValidationError(f"Failed to fetch JWKS from CIDS: {error}")
+        # Keep serving the keys we have; retry after the refetch interval
+        self._last_fetch = time.monotonic()
+        self._expires_at = self._last_fetch + self.min_refetch_interval
+
+    def refresh(self):
+        if self._client is None:
+            self._client = httpx.Client(verify=self.verify_ssl, timeout=self.timeout)
+        try:
+            self._apply_response(self._client.get(self.jwks_url, headers=self._request_headers()))
+        except Exception as e:
+            self._fetch_failed(e)
+
+    async def arefresh(self):
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(verify=self.verify_ssl, timeout=self.timeout)
+        try:
+            self._apply_response(await self._async_client.get(self.jwks_url, headers=self._request_headers()))
+        except Exception as e:
+            self._fetch_failed(e)
+
+    # ---- validation ----
+
+    @staticmethod
+    def _token_kid(token: str) -> Optional[str]:
+        try:
+            header_segment = token.split('.', 1)[0]
+            header_segment += '=' * (-len(header_segment) % 4)
+            return json.loads(base64.urlsafe_b64decode(header_segment)).get('kid')
+        except Exception:
+            raise JWKSValidationError("Malformed token")
+
+    def _verify(self, token: str, kid: Optional[str]) -> Dict[str, Any]:
+        key = self.keys.get(kid) if kid is not None else None
+        if key is None:
+            if kid is None and len(self.keys) == 1:
+                key = next(iter(self.keys.values()))
+            else:
+                raise JWKSValidationError(f"Unknown signing key: {kid}")
+        try:
+            claims = jwt.decode(token, key)
+        except Exception as e:
+            raise _SignatureError(f"Invalid token signature: {e}")
+
+        now = time.time()
+        exp = claims.get('exp')
+        nbf = claims.get('nbf')
+        if exp and exp < now - self.leeway:
+            raise JWKSValidationError("Token has expired")
+        if nbf and nbf > now + self.leeway:
+            raise JWKSValidationError("Token not yet valid")
+        if self.issuer and claims.get('iss') != self.issuer:
+            raise JWKSValidationError("Invalid token issuer")
+
+        aud = claims.get('aud')
+        token_audiences = aud if isinstance(aud, list) else ([aud] if isinstance(aud, str) else [])
+        if self.audiences:
+            valid_audience = any(a in self.audiences for a in token_audiences)
+        else:
+            valid_audience = any(a == 'internal-services' or a.startswith('app_') for a in token_audiences)
+        if not valid_audience:
+            raise JWKSValidationError("Invalid token audience")
+
+        jti = claims.get('jti') or claims.get('token_id')
+        if self.is_revoked and jti and self.is_revoked(jti):
+            raise JWKSValidationError("Token has been revoked")
+        return dict(claims)
+
+    def validate(self, token: str) -> Dict[str, Any]:
+        """Verify a JWT locally and return its claims (raises JWKSValidationError)."""
+        kid = self._token_kid(token)
+        if self._should_fetch(kid):
+            self.refresh()
+        try:
+            return self._verify(token, kid)
+        except _SignatureError:
+            # CIDS regenerates keys on restart without changing the kid
+            if not self._may_refetch():
+                raise
+            self.refresh()
+            return self._verify(token, kid)
+
+    async def avalidate(self, token: str) -> Dict[str, Any]:
+        """Async variant of validate() for FastAPI services."""
+        kid = self._token_kid(token)
+        if self._should_fetch(kid):
+            await self.arefresh()
+        try:
+            return self._verify(token, kid)
+        except _SignatureError:
+            if not self._may_refetch():
+                raise
+            await self.arefresh()
+            return self._verify(token, kid)
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
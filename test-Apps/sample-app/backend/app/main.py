@@ -22,11 +22,14 @@ app.add_middleware(
 )
 
 
+# One client per process so the JWKS cache is shared across requests
+cids = CIDSClient()
+
+
 async def get_identity(authorization: Optional[str] = Header(None)):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing Authorization header")
     token = authorization.split(" ", 1)[1]
-    cids = CIDSClient()
     return await cids.validate(token)
 
 
@@ -0,0 +1,126 @@
+"""
+Copy of backend/libs/revocation_client.py from CIDS (keep in sync).
+
+Local revocation set for CIDS resource servers, fed by ``/auth/revocations``.
+
+The client long-polls the CIDS revocation delta feed and keeps a compact
+``jti -> exp`` map; entries are dropped once the token would have expired
+anyway. ``is_revoked(jti)`` is a dict lookup, so it can be passed straight to
+``JWKSClient(is_revoked=...)`` and revocation checks cost no network I/O.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationFeedClient:
+    def __init__(self, cids_url: str, api_key: str, verify_ssl: bool = True, wait_seconds: int = 25,
+                 retry_seconds: float = 5.0, default_ttl_seconds: int = 3600, batch_size: int = 1000):
+        self.feed_url = f"{cids_url.rstrip('/')}/auth/revocations"
+        self.api_key = api_key
+        self.verify_ssl = verify_ssl
+        self.wait_seconds = wait_seconds
+        self.retry_seconds = retry_seconds
+        self.default_ttl_seconds = default_ttl_seconds
+        self.batch_size = batch_size
+        self.revoked: Dict[str, float] = {}
+        self.cursor: Optional[str] = None
+        self.last_sync: float = 0.0
+        self._next_prune: float = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    def is_revoked(self, jti: str) -> bool:
+        exp = self.revoked.get(jti)
+        return exp is not None and exp > time.time()
+
+    # ---- feed handling ----
+
+    def _params(self, wait: int) -> Dict[str, object]:
+        params: Dict[str, object] = {'limit': self.batch_size, 'wait': wait}
+        if self.cursor:
+            params['since'] = self.cursor
+        return params
+
+    def _headers(self) -> Dict[str, str]:
+        return {'Authorization': f'Bearer {self.api_key}'}
+
+    def _apply(self, data: Dict) -> bool:
+        now = time.time()
+        for item in data.get('revocations', []):
+            exp = item.get('exp') or (now + self.default_ttl_seconds)
+            if exp > now:
+                self.revoked[item['jti']] = exp
+        self.cursor = data.get('cursor') or self.cursor
+        self.last_sync = now
+        if now >= self._next_prune:
+            self.revoked = {jti: exp for jti, exp in self.revoked.items() if exp > now}
+            self._next_prune = now + 60
+        return bool(data.get('has_more'))
+
+    def poll(self, wait: int = 0):
+        """Pull everything after the current cursor (blocking)."""
+        with httpx.Client(verify=self.verify_ssl, timeout=wait + 10) as client:
+            while True:
+                response = client.get(self.feed_url, params=self._params(wait), headers=self._headers())
+                response.raise_for_status()
+                if not self._apply(response.json()):
+                    break
+                wait = 0
+
+    async def apoll(self, client: httpx.AsyncClient, wait: int = 0):
+        """Async variant of poll() using the caller's client."""
+        while True:
+            response = await client.get(self.feed_url, params=self._params(wait), headers=self._headers(), timeout=wait + 10)
+            response.raise_for_status()
+            if not self._apply(response.json()):
+                break
+            wait = 0
+
+    # ---- background followers ----
+
+    def start_thread(self):
+        """Follow the feed from a daemon thread (for sync frameworks)."""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.poll(wait=self.wait_seconds)
+                except Exception as e:
+                    logger.warning(f"Revocation feed poll failed: {e}")
+                    self._stop.wait(self.retry_seconds)
+
+        self._thread = threading.Thread(target=run, name="cids-revocation-feed", daemon=True)
+        self._thread.start()
+
+    def ensure_task(self):
+        """Follow the feed from an asyncio task on the running loop (for FastAPI)."""
+        if self._task and not self._task.done():
+            return
+
+        async def run():
+            async with httpx.AsyncClient(verify=self.verify_ssl) as client:
+                while not self._stop.is_set():
+                    try:
+                        await self.apoll(client, wait=self.wait_seconds)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        logger.warning(f"Revocation feed poll failed: {e}")
+                        await asyncio.sleep(self.retry_seconds)
+
+        self._task = asyncio.get_running_loop().create_task(run())
+
+    def stop(self):
+        self._stop.set()
+        if self._task and not self._task.done():
+            self._task.cancel()